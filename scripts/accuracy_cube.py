@@ -0,0 +1,245 @@
+from pathlib import Path
+from datetime import timedelta
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import history_store
+import compute_accuracy
+import metrics
+
+# =====================
+# Paths
+# =====================
+OUTCOMES_PATH = compute_accuracy.OUTCOMES_PATH
+CUBE_PATH = history_store.DATA_DIR / "store" / "accuracy_cube.parquet"
+
+# A prediction for day D counts as correct at horizon h if the player's
+# first price move in the predicted direction lands on D+1 .. D+h
+HORIZONS = [1, 2, 3]
+
+SEGMENTS = [
+    "direction",
+    "alert_level",
+    "ownership_bucket",
+    "market_bias",
+    "confidence_decile",
+]
+
+PREDICTION_COLUMNS = [
+    "date",
+    "player_id",
+    "direction",
+    "alert_level",
+    "confidence",
+    "ownership_bucket",
+    "market_bias",
+]
+
+CUBE_COLUMNS = ["date_pred", "horizon", *SEGMENTS, "predicted", "correct"]
+
+# Confidence is on a 0-5 scale; tenths of it keep the bins fixed as
+# history grows, unlike quantile deciles
+CONFIDENCE_MAX = 5.0
+
+# Outcome keys pack (player_id, day number) into one int64
+DAY_BITS = 20
+
+SIGN = {"rise": 1, "fall": -1}
+
+
+# =====================
+# Inputs
+# =====================
+def day_numbers(dates) -> np.ndarray:
+    return (
+        pd.to_datetime(dates, errors="coerce")
+        .to_numpy(dtype="datetime64[D]")
+        .astype(np.int64)
+    )
+
+
+def outcome_index(actuals: pd.DataFrame):
+    """Sorted (player_id, day) keys and the matching +1 / -1 move."""
+    actuals = actuals[actuals["actual_change"].isin(SIGN.keys())]
+    keys = (
+        actuals["player_id"].to_numpy(dtype=np.int64) << DAY_BITS
+    ) | day_numbers(actuals["date"])
+    moves = actuals["actual_change"].map(SIGN).to_numpy(dtype=np.int8)
+
+    keys, first = np.unique(keys[::-1], return_index=True)  # last row wins
+    return keys, moves[::-1][first]
+
+
+# =====================
+# Cube
+# =====================
+def build_cube(preds: pd.DataFrame, actuals: pd.DataFrame, last_day) -> pd.DataFrame:
+    """Predicted / correct counts per day, horizon and segment.
+
+    Every horizon is looked up at once on a (predictions x horizons)
+    key array, and the cube is one groupby over the stacked result.
+    """
+    preds = preds[preds["direction"].isin(SIGN.keys())]
+    if preds.empty or actuals.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    days = day_numbers(preds["date"])
+    sign = preds["direction"].map(SIGN).to_numpy(dtype=np.int8)
+    horizons = np.array(HORIZONS, dtype=np.int64)
+
+    # ---------------------
+    # Outcome on each of D+1 .. D+max for every prediction
+    # ---------------------
+    keys, moves = outcome_index(actuals)
+    wanted = (
+        (preds["player_id"].to_numpy(dtype=np.int64) << DAY_BITS)
+        | days
+    )[:, None] + np.arange(1, horizons.max() + 1)
+
+    if len(keys):
+        pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        move = np.where(keys[pos] == wanted, moves[pos], 0)
+    else:
+        move = np.zeros(wanted.shape, dtype=np.int8)
+
+    hit = np.logical_or.accumulate(move == sign[:, None], axis=1)
+    hit = hit[:, horizons - 1]
+
+    last = np.datetime64(last_day, "D").astype(np.int64)
+    resolved = days[:, None] + horizons <= last
+
+    # ---------------------
+    # Stack: one row per (prediction, resolved horizon)
+    # ---------------------
+    row, col = np.nonzero(resolved)
+    if not len(row):
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    confidence = preds["confidence"].fillna(0).to_numpy(dtype=float)
+    decile = np.clip(
+        (confidence / CONFIDENCE_MAX * 10).astype(int) + 1, 1, 10
+    ).astype(np.int8)
+
+    stacked = pd.DataFrame({
+        "date_pred": pd.to_datetime(preds["date"]).dt.strftime("%Y-%m-%d").to_numpy()[row],
+        "horizon": horizons[col].astype(np.int8),
+        "direction": preds["direction"].astype(object).to_numpy()[row],
+        "alert_level": preds["alert_level"].astype(object).fillna("unknown").to_numpy()[row],
+        "ownership_bucket": preds["ownership_bucket"].astype(object).fillna("unknown").to_numpy()[row],
+        "market_bias": preds["market_bias"].astype(object).fillna("unknown").to_numpy()[row],
+        "confidence_decile": decile[row],
+        "correct": hit[row, col].astype(np.int32),
+    })
+
+    cube = (
+        stacked
+        .groupby(["date_pred", "horizon", *SEGMENTS], sort=True)["correct"]
+        .agg(predicted="size", correct="sum")
+        .reset_index()
+    )
+
+    for column in ["direction", "alert_level", "ownership_bucket", "market_bias"]:
+        cube[column] = cube[column].astype("category")
+    cube["predicted"] = cube["predicted"].astype(np.int32)
+    cube["correct"] = cube["correct"].astype(np.int32)
+
+    return cube[CUBE_COLUMNS]
+
+
+def load_inputs():
+    preds = history_store.read_all(PREDICTION_COLUMNS)
+    for column in PREDICTION_COLUMNS:
+        if column not in preds.columns:
+            preds[column] = pd.NA
+    actuals = compute_accuracy.load_outcomes()
+    return preds, actuals
+
+
+def save_cube(cube: pd.DataFrame) -> Path:
+    CUBE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CUBE_PATH.with_suffix(".tmp")
+    cube.to_parquet(tmp, index=False, compression="zstd")
+    tmp.replace(CUBE_PATH)
+    return CUBE_PATH
+
+
+# =====================
+# Slicing
+# =====================
+def load_cube(columns=None) -> pd.DataFrame:
+    if not CUBE_PATH.exists():
+        return pd.DataFrame(columns=columns or CUBE_COLUMNS)
+    return pd.read_parquet(CUBE_PATH, columns=columns)
+
+
+def rollup(cube: pd.DataFrame, by, days: int = None, **filters) -> pd.DataFrame:
+    """Accuracy summed over everything not in by, e.g.
+
+    rollup(cube, ["horizon"], days=7, alert_level="imminent")
+    """
+    if days is not None and not cube.empty:
+        start = pd.to_datetime(cube["date_pred"].max()) - timedelta(days=days - 1)
+        cube = cube[pd.to_datetime(cube["date_pred"]) >= start]
+
+    for column, value in filters.items():
+        cube = cube[cube[column] == value]
+
+    out = (
+        cube
+        .groupby(list(by), observed=True)[["predicted", "correct"]]
+        .sum()
+        .reset_index()
+    )
+    out["accuracy"] = (out["correct"] / out["predicted"]).round(3)
+    return out
+
+
+# =====================
+# Main
+# =====================
+@metrics.timed("accuracy_cube")
+def build():
+    preds, actuals = load_inputs()
+    metrics.rows(rows_in=len(preds) + len(actuals))
+
+    cube = build_cube(preds, actuals, compute_accuracy.last_outcome_day())
+    metrics.rows(rows_out=len(cube))
+
+    if cube.empty:
+        print("ℹ️ No resolved predictions for the accuracy cube yet")
+        return
+
+    print(f"🧊 Accuracy cube: {len(cube)} cells → {save_cube(cube)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy by horizon and segment"
+    )
+    parser.add_argument("command", nargs="?", default="build",
+                        choices=["build", "show"])
+    parser.add_argument("--by", default="horizon",
+                        help="comma-separated dimensions to show")
+    parser.add_argument("--days", type=int,
+                        help="only the most recent N prediction days")
+    parser.add_argument("--alert-level",
+                        help="only this alert level (e.g. imminent)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build()
+        return
+
+    cube = load_cube()
+    if cube.empty:
+        print(f"ℹ️ No accuracy cube yet in {CUBE_PATH}")
+        return
+
+    filters = {"alert_level": args.alert_level} if args.alert_level else {}
+    print(rollup(cube, args.by.split(","), args.days, **filters).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from pathlib import Path
+from datetime import date, datetime, timedelta
+import sys
+
+import numpy as np
+import pandas as pd
+
+import telegram_queue
+
+# =====================
+# Paths
+# =====================
+LEDGER_PATH = Path("data/store/alert_ledger.parquet")
+
+KEY = ["chat_id", "player_id", "direction", "date"]
+COLUMNS = [*KEY, "alert_level", "confidence", "sent_at"]
+
+# =====================
+# Hysteresis
+# =====================
+# Once a chat has had a (player, direction) alert today it is only sent
+# again on escalation, or when confidence has moved this far from the
+# value last sent
+LEVEL_RANK = {"warming": 1, "imminent": 2}
+CONFIDENCE_MARGIN = 0.5
+
+# Days of sent alerts kept, for the CLI
+KEEP_DAYS = 14
+
+
+# =====================
+# Persistence
+# =====================
+def load() -> pd.DataFrame:
+    if not LEDGER_PATH.exists():
+        return pd.DataFrame(columns=COLUMNS)
+    ledger = pd.read_parquet(LEDGER_PATH)
+    if "chat_id" not in ledger.columns:
+        # From before alerts went to more than the owner chat
+        ledger.insert(0, "chat_id", int(telegram_queue.CHAT_ID or 0))
+    return ledger
+
+
+def save(ledger: pd.DataFrame) -> Path:
+    LEDGER_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = LEDGER_PATH.with_suffix(".tmp")
+    ledger[COLUMNS].to_parquet(tmp, index=False)
+    tmp.replace(LEDGER_PATH)
+    return LEDGER_PATH
+
+
+# =====================
+# Diff against the ledger
+# =====================
+def diff(alerts: pd.DataFrame, ledger: pd.DataFrame, today: str) -> pd.DataFrame:
+    """The (chat, player) alerts worth sending, with why: "new",
+    "escalated" or "confidence"; last_confidence is what that chat was
+    sent before, if anything.
+
+    One left merge on (chat_id, player_id, direction, date) against the
+    ledger; the rest is column arithmetic.
+    """
+    alerts = alerts.assign(
+        date=today,
+        chat_id=alerts["chat_id"].astype("int64"),
+        direction=alerts["direction"].astype(str),
+    )
+    sent = ledger[ledger["date"] == today][KEY + ["alert_level", "confidence"]].astype(
+        {"chat_id": "int64", "player_id": alerts["player_id"].dtype, "direction": str}
+    )
+
+    merged = alerts.merge(
+        sent, on=KEY, how="left", suffixes=("", "_sent"), indicator=True
+    )
+
+    new = (merged["_merge"] == "left_only").to_numpy()
+    rank = merged["alert_level"].astype(str).map(LEVEL_RANK).fillna(0).to_numpy()
+    rank_sent = merged["alert_level_sent"].astype(object).map(LEVEL_RANK).fillna(0).to_numpy()
+    moved = (
+        (merged["confidence"] - merged["confidence_sent"]).abs()
+        .ge(CONFIDENCE_MARGIN).to_numpy()
+    )
+
+    reason = np.select(
+        [new, rank > rank_sent, moved],
+        ["new", "escalated", "confidence"],
+        default="",
+    )
+
+    out = merged.assign(reason=reason, last_confidence=merged["confidence_sent"])
+    return out[out["reason"] != ""].drop(
+        columns=["alert_level_sent", "confidence_sent", "_merge"]
+    )
+
+
+def record(ledger: pd.DataFrame, sent: pd.DataFrame, today: str,
+           now: datetime = None) -> pd.DataFrame:
+    """ledger with the sent alerts as the latest state of their keys,
+    and days older than KEEP_DAYS dropped."""
+    now = now or datetime.utcnow()
+    rows = sent.assign(
+        date=today,
+        direction=sent["direction"].astype(str),
+        alert_level=sent["alert_level"].astype(str),
+        sent_at=now.isoformat(timespec="seconds"),
+    )[COLUMNS]
+
+    cutoff = (date.fromisoformat(today) - timedelta(days=KEEP_DAYS)).isoformat()
+    frames = [df for df in (ledger[COLUMNS], rows) if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    out = (
+        pd.concat(frames, ignore_index=True)
+        .astype({"chat_id": "int64", "player_id": "int32", "confidence": "float32"})
+        .drop_duplicates(KEY, keep="last")
+    )
+    return out[out["date"] >= cutoff].reset_index(drop=True)
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    ledger = load()
+    if ledger.empty:
+        print(f"ℹ️ No alerts sent yet ({LEDGER_PATH})")
+        return
+
+    day = sys.argv[1] if len(sys.argv) > 1 else ledger["date"].max()
+    rows = ledger[ledger["date"] == day].sort_values("sent_at")
+    print(f"📒 {len(rows)} alerts on record for {day}")
+    print(rows.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,660 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import snapshot_store
+import timeseries
+import update_protection
+import compute_deltas
+import compute_prediction
+import compute_accuracy
+import rolling_state
+import threshold_resolver
+import metrics
+
+# =====================
+# Paths
+# =====================
+PRICE_CHANGES_PATH = compute_accuracy.OUTCOMES_PATH
+REPLAY_DIR = snapshot_store.DATA_DIR / "store" / "replay"
+
+# Bump when build_replay() changes what it packs, to invalidate the cache
+REPLAY_VERSION = 2
+
+# Raw columns a replayed snapshot needs; everything derived is recomputed
+REPLAY_COLUMNS = [
+    "player_id",
+    "web_name",
+    "ownership",
+    "transfers_in_event",
+    "transfers_out_event",
+    "price",
+    "status",
+]
+
+BIASES = ["neutral", "bullish", "bearish"]
+SIGN = {"rise": 1, "fall": -1}
+
+# Slots of the run axis: the day's run before last, and its last run
+EARLIER, LAST = 0, 1
+
+# Set once per worker process by the pool initializer
+_replay = None
+
+
+# =====================
+# Replay: parameter-independent features
+# =====================
+def replay_features(stamps=None) -> list:
+    """(day, runs) where runs are the (features, protection) the pipeline
+    saw at each day's last two snapshots.
+
+    Deltas, protection locks and velocity / trend don't depend on the
+    prediction parameters, so every stored snapshot is replayed through
+    the pipeline's own functions once, in memory; nothing is written back.
+    """
+    stamps = snapshot_store.list_snapshots() if stamps is None else stamps
+
+    series = timeseries.TransferSeries()
+    prot = pd.DataFrame(columns=["player_id", "lock_until"])
+    days = []
+    prev = None
+
+    for i, ts in enumerate(stamps):
+        curr = snapshot_store.read_snapshot(ts, REPLAY_COLUMNS)
+
+        # The first snapshot has nothing to diff against, as in the pipeline
+        if prev is not None:
+            prot = update_protection.update_protection(
+                prev, curr, ts.date(), prot
+            )
+            merged = compute_deltas.compute_deltas(curr, prev, prot, ts.date())
+
+            if merged is not None:
+                series.push(ts, merged.set_index("player_id")["net_transfers_delta"])
+
+                # The day's last run is what the history store keeps; the
+                # one before it is what that run's rolling window saw
+                later = sum(s.date() == ts.date() for s in stamps[i + 1:i + 3])
+                if later < 2:
+                    features = series.features().set_index("player_id")
+                    for col in ["net_transfers_window", "velocity", "trend_score"]:
+                        merged[col] = merged["player_id"].map(features[col]).fillna(0)
+                    run = (merged[compute_prediction.SNAPSHOT_COLUMNS], prot.copy())
+
+                    day = ts.date().isoformat()
+                    if days and days[-1][0] == day:
+                        days[-1][1].append(run)
+                    else:
+                        days.append((day, [run]))
+
+        prev = curr
+
+    return days
+
+
+# =====================
+# (run × day × player) matrices
+# =====================
+@dataclass
+class Replay:
+    days: np.ndarray        # day numbers (days since epoch), ascending
+    players: np.ndarray     # player_id of each column
+    pressure: np.ndarray    # (2, days, players) transfer_pressure
+    velocity: np.ndarray
+    trend: np.ndarray
+    zeroed: np.ndarray      # injured, suspended or recovery-locked
+    present: np.ndarray     # player was in that run's snapshot
+    bias: np.ndarray        # index into BIASES, per day
+    outcome: np.ndarray     # (days, players) +1 / -1 / 0 price move on D+1
+    closed: np.ndarray      # D+1 outcome is in, per day
+    source: Path = None     # cache directory when the arrays are memory-mapped
+
+
+# Everything but closed, which moves with the clock, is cached
+REPLAY_ARRAYS = [
+    "days", "players", "pressure", "velocity", "trend",
+    "zeroed", "present", "bias", "outcome",
+]
+
+
+def day_number(day) -> int:
+    return int(np.datetime64(pd.to_datetime(day).date(), "D").astype(np.int64))
+
+
+def build_replay(days: list, price_changes: pd.DataFrame, last_day) -> Replay:
+    """Pack replayed days into dense matrices, once per backtest.
+
+    Every column is computed with the same pandas expressions predict()
+    uses, so the vectorized replay starts from identical numbers.
+    """
+    players = np.unique(np.concatenate([
+        f["player_id"].to_numpy() for _, runs in days for f, _ in runs
+    ]))
+    shape = (2, len(days), len(players))
+
+    replay = Replay(
+        days=np.array([day_number(day) for day, _ in days], dtype=np.int64),
+        players=players,
+        pressure=np.full(shape, np.nan),
+        velocity=np.full(shape, np.nan),
+        trend=np.full(shape, np.nan),
+        zeroed=np.zeros(shape, dtype=bool),
+        present=np.zeros(shape, dtype=bool),
+        bias=np.zeros(len(days), dtype=np.int8),
+        outcome=np.zeros(shape[1:], dtype=np.int8),
+        closed=np.zeros(len(days), dtype=bool),
+    )
+
+    change_days = (
+        pd.to_datetime(price_changes["date"], errors="coerce")
+        .to_numpy(dtype="datetime64[D]")
+        .astype(np.int64)
+    )
+    change_cols = np.searchsorted(players, price_changes["player_id"].to_numpy())
+    change_cols = np.minimum(change_cols, len(players) - 1)
+    known_player = players[change_cols] == price_changes["player_id"].to_numpy()
+    moves = price_changes["actual_change"].map(SIGN).fillna(0).to_numpy(dtype=np.int8)
+
+    for i, (day, runs) in enumerate(days):
+        slots = [LAST] if len(runs) == 1 else [EARLIER, LAST]
+        for slot, (f, prot) in zip(slots, runs):
+            col = np.searchsorted(players, f["player_id"].to_numpy())
+
+            locked = prot.loc[
+                prot["lock_until"] >= pd.to_datetime(day).date(), "player_id"
+            ] if not prot.empty else []
+
+            replay.pressure[slot, i, col] = (
+                f["net_transfers_window"] / f["ownership"].clip(lower=0.1)
+            ).to_numpy(dtype=float)
+            replay.velocity[slot, i, col] = f["velocity"].to_numpy(dtype=float)
+            replay.trend[slot, i, col] = f["trend_score"].to_numpy(dtype=float)
+            replay.zeroed[slot, i, col] = (
+                f["status"].isin(["i", "s"]) | f["player_id"].isin(locked)
+            ).to_numpy()
+            replay.present[slot, i, col] = True
+
+        # Last row per (player, day) wins
+        hit = (change_days == replay.days[i] + 1) & known_player
+        replay.outcome[i, change_cols[hit]] = moves[hit]
+
+    replay.bias = market_bias_by_day(replay.days, change_days, moves)
+    replay.closed = closed_days(replay.days, last_day)
+    return replay
+
+
+def closed_days(days: np.ndarray, last_day) -> np.ndarray:
+    return days + 1 <= day_number(last_day)
+
+
+def market_bias_by_day(days, change_days, moves) -> np.ndarray:
+    """detect_market_bias() over the price changes known by each day."""
+    order = np.argsort(change_days, kind="stable")
+    known = np.searchsorted(change_days[order], days, side="right")
+
+    rises = np.concatenate([[0], np.cumsum(moves[order] == 1)])[known]
+    falls = np.concatenate([[0], np.cumsum(moves[order] == -1)])[known]
+    total = np.maximum(rises + falls, 1)
+
+    bias = np.full(len(days), BIASES.index("neutral"), dtype=np.int8)
+    bias[falls / total >= 0.65] = BIASES.index("bearish")
+    bias[rises / total >= 0.65] = BIASES.index("bullish")
+    return bias
+
+
+# =====================
+# Replay cache: memory-mapped matrices
+# =====================
+def replay_key() -> str:
+    """Changes whenever a snapshot or price change is added or rewritten."""
+    digest = hashlib.sha1(f"replay-v{REPLAY_VERSION}".encode())
+    for path in [snapshot_store.MANIFEST_PATH, PRICE_CHANGES_PATH]:
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def save_replay(replay: Replay, key: str) -> Path:
+    """Write the matrices as .npy files; older keys are dropped."""
+    target = REPLAY_DIR / key
+    tmp = REPLAY_DIR / f"{key}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    for name in REPLAY_ARRAYS:
+        np.save(tmp / f"{name}.npy", getattr(replay, name))
+
+    for old in REPLAY_DIR.iterdir():
+        if old != tmp:
+            shutil.rmtree(old, ignore_errors=True)
+    tmp.rename(target)
+
+    replay.source = target
+    return target
+
+
+def open_replay(source: Path, closed: np.ndarray = None, last_day=None) -> Replay:
+    """A Replay over read-only memory maps of a cached one.
+
+    Every process that opens the same files shares their pages through
+    the OS page cache, so a pool of workers holds one copy of the
+    matrices however many processes read them.
+    """
+    arrays = {
+        name: np.load(source / f"{name}.npy", mmap_mode="r")
+        for name in REPLAY_ARRAYS
+    }
+    if closed is None:
+        closed = closed_days(np.asarray(arrays["days"]), last_day)
+    return Replay(**arrays, closed=closed, source=source)
+
+
+# =====================
+# Vectorized predict()
+# =====================
+def raw_scores(replay: Replay, p: dict) -> np.ndarray:
+    raw = (
+        p["pressure_weight"] * replay.pressure
+        + p["velocity_weight"] * replay.velocity
+        + p["trend_weight"] * replay.trend
+    )
+    return np.where(replay.zeroed, 0.0, raw)
+
+
+def rolling_scores(replay: Replay, raw: np.ndarray, p: dict) -> np.ndarray:
+    """compute_rolling_score() for every day at once.
+
+    The window holds each earlier day's last run (days_ago >= 1) plus,
+    when the day had one, its previous run (days_ago = 0).
+    """
+    # Stored raw scores are float32 (schema.PREDICTION_DTYPES)
+    stored = np.where(replay.present, np.nan_to_num(raw).astype(np.float32), 0.0)
+
+    # Calendar-dense, so a lag of L rows is L days even across gaps
+    span = replay.days[-1] - replay.days[0] + 1
+    calendar = np.zeros((span, raw.shape[2]))
+    calendar[replay.days - replay.days[0]] = stored[LAST]
+
+    rolling = np.zeros_like(calendar)
+    if p["rolling_days"] is None:
+        # No cutoff: carried forward a day at a time, as rolling_state does
+        for t in range(1, span):
+            rolling[t] = p["decay"] * (rolling[t - 1] + calendar[t - 1])
+    else:
+        for lag in range(1, min(int(p["rolling_days"]), span - 1) + 1):
+            rolling[lag:] += p["decay"] ** lag * calendar[:-lag]
+
+    return rolling[replay.days - replay.days[0]] + stored[EARLIER]
+
+
+def top_k_thresholds(score: np.ndarray):
+    """threshold_resolver's top-k rule, row by row, from one sort.
+
+    With NaNs sorted last, the k-th largest positive and the k-th
+    smallest negative sit at fixed offsets once the signs are counted.
+    """
+    k_max = threshold_resolver.MAX_ALERTS_PER_SIDE
+    k_min = threshold_resolver.MIN_ALERTS_PER_SIDE
+
+    ordered = np.sort(score, axis=1)
+    n_fin = np.isfinite(score).sum(axis=1)
+    n_pos = (score > 0).sum(axis=1)
+    n_neg = (score < 0).sum(axis=1)
+    rows = np.arange(len(score))
+
+    k_rise = np.minimum(k_max, n_pos)
+    k_fall = np.minimum(k_max, n_neg)
+    rise = np.where(
+        n_pos >= k_min, ordered[rows, np.maximum(n_fin - k_rise, 0)], np.inf
+    )
+    fall = np.where(
+        n_neg >= k_min, ordered[rows, np.maximum(k_fall - 1, 0)], -np.inf
+    )
+    return rise, fall
+
+
+def tuned_thresholds(score: np.ndarray, rise_cut: float, fall_cut: float):
+    """threshold_resolver.tuned_cutoffs, row by row, from one sort: the
+    fixed cutoffs, bounded by the MAX_ALERTS_PER_SIDE-th largest positive
+    and smallest negative score."""
+    k = threshold_resolver.MAX_ALERTS_PER_SIDE
+
+    ordered = np.sort(score, axis=1)
+    n_fin = np.isfinite(score).sum(axis=1)
+    n_pos = (score > 0).sum(axis=1)
+    n_neg = (score < 0).sum(axis=1)
+    rows = np.arange(len(score))
+
+    rise = np.full(len(score), rise_cut if rise_cut > 0 else np.inf)
+    fall = np.full(len(score), fall_cut if fall_cut < 0 else -np.inf)
+    rise = np.where(
+        n_pos > k, np.maximum(rise, ordered[rows, np.maximum(n_fin - k, 0)]), rise
+    )
+    fall = np.where(n_neg > k, np.minimum(fall, ordered[rows, k - 1]), fall)
+    return rise, fall
+
+
+def thresholds(score: np.ndarray, tuned: dict):
+    """Per-day rise and fall cutoffs by whichever rule
+    threshold_resolver.resolve() would apply with this tuned config."""
+    if threshold_resolver.usable(tuned):
+        return top_k_thresholds(score)
+    return tuned_thresholds(score, tuned["rise_cutoff"], tuned["fall_cutoff"])
+
+
+def threshold_policy() -> str:
+    """The threshold rule predict_batch() applies, for reports."""
+    tuned = threshold_resolver.load()
+    reason = threshold_resolver.usable(tuned)
+    if reason:
+        return f"top_k ({reason})"
+    return f"tuned cutoffs {tuned['rise_cutoff']:g}/{tuned['fall_cutoff']:g}"
+
+
+def row_quantile(values: np.ndarray, q: float) -> np.ndarray:
+    """np.nanquantile(values, q, axis=1), from one sort instead of a
+    partition per row; NaN for rows with nothing finite."""
+    ordered = np.sort(values, axis=1)
+    last = np.maximum(np.isfinite(values).sum(axis=1) - 1, 0)
+    rows = np.arange(len(values))
+
+    pos = q * last
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, last)
+    a, b = ordered[rows, lo], ordered[rows, hi]
+
+    # numpy's own lerp, which switches ends halfway for symmetry
+    t = pos - lo
+    out = np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+    return np.where(np.isfinite(values).any(axis=1), out, np.nan)
+
+
+def predict_batch(replay: Replay, params: dict, tuned: dict = None):
+    """Direction (+1 / -1 / 0) and imminent flags of every day's last run.
+
+    Thresholds follow the live rule: the tuned cutoffs in thresholds.json
+    when they are usable, else top-k.
+    """
+    p = {**compute_prediction.resolve_params(), **params}
+    tuned = threshold_resolver.load() if tuned is None else tuned
+
+    raw = raw_scores(replay, p)
+    score = (
+        p["today_weight"] * raw[LAST]
+        + p["rolling_weight"] * rolling_scores(replay, raw, p)
+    )
+
+    # ---------------------
+    # Market dampening
+    # ---------------------
+    bias = replay.bias[:, None]
+    factor = np.where(
+        bias == BIASES.index("bullish"),
+        np.where(score < 0, p["bias_dampening"], 1.0),
+        np.where(
+            bias == BIASES.index("bearish"),
+            np.where(score > 0, p["bias_dampening"], 1.0),
+            p["neutral_dampening"],
+        ),
+    )
+    score = np.where(replay.zeroed[LAST], 0.0, score * factor)
+    score = np.where(replay.present[LAST], score, np.nan)
+
+    # ---------------------
+    # Thresholds, direction, confidence
+    # ---------------------
+    rise, fall = thresholds(score, tuned)
+    direction = np.where(score >= rise[:, None], 1, 0)
+    direction = np.where(score <= fall[:, None], -1, direction).astype(np.int8)
+
+    active = np.where(score != 0, np.abs(score), np.nan)
+    with np.errstate(all="ignore"):
+        scale = row_quantile(active, 0.95)
+    scale = np.where(scale > 0, scale, 1.0)[:, None]
+    confidence = np.round(np.clip(np.abs(score) / scale * 5, 0, 5), 2)
+
+    imminent = (direction != 0) & (confidence >= p["confidence_imminent"])
+    return direction, imminent
+
+
+def day_counts(replay: Replay, params: dict, tuned: dict = None):
+    """Scored and correct imminent predictions per day, D -> D+1 the way
+    compute_accuracy scores them (zero on days not yet closed)."""
+    direction, imminent = predict_batch(replay, params, tuned)
+
+    scored = imminent & replay.closed[:, None]
+    correct = scored & (direction == replay.outcome)
+    return scored.sum(axis=1), correct.sum(axis=1), direction
+
+
+def evaluate(replay: Replay, params: dict) -> dict:
+    """Score one parameter set over every closed day."""
+    t0 = time.perf_counter()
+    scored, correct, direction = day_counts(replay, params)
+    predicted = int(scored.sum())
+    correct = int(correct.sum())
+
+    return {
+        "params": params,
+        "days": int(replay.closed.sum()),
+        "alerts": int((direction != 0).sum()),
+        "predicted": predicted,
+        "correct": correct,
+        "accuracy": round(correct / predicted, 4) if predicted else None,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+# =====================
+# Reference replay through predict() itself
+# =====================
+def replay_predictions(days: list, price_changes: pd.DataFrame, params: dict,
+                       tuned: dict = None) -> pd.DataFrame:
+    """Every day's predictions from compute_prediction.predict(), with the
+    rolling state kept in memory. Slow; used to check predict_batch()."""
+    p = {**compute_prediction.resolve_params(), **params}
+    state = rolling_state.RollingState(
+        p["decay"], max(rolling_state.RING_DAYS, (p["rolling_days"] or 0) + 1)
+    )
+    out = []
+
+    changes_by_date = pd.to_datetime(price_changes["date"]).dt.date.astype(str)
+
+    for day, runs in days:
+        known = price_changes[changes_by_date <= day]
+
+        # An earlier run's scores are in the state for the day's last run,
+        # which then replaces them, as in the pipeline
+        for features, prot in runs:
+            predictions = compute_prediction.predict(
+                features, state, known, prot, day, tuned=tuned, params=p
+            )
+            state.push(day, predictions.set_index("player_id")["raw_score"])
+
+        out.append(predictions)
+
+    return pd.concat(out, ignore_index=True)
+
+
+def check(days: list, replay: Replay, price_changes: pd.DataFrame, params: dict) -> int:
+    """Predictions where predict_batch() and predict() disagree."""
+    tuned = threshold_resolver.load()
+    with redirect_stdout(io.StringIO()):
+        reference = replay_predictions(days, price_changes, params, tuned)
+    direction, imminent = predict_batch(replay, params, tuned)
+
+    row = np.searchsorted(replay.days, reference["date"].map(day_number).to_numpy())
+    col = np.searchsorted(replay.players, reference["player_id"].to_numpy())
+    expected_direction = reference["direction"].map(SIGN).fillna(0).to_numpy()
+    expected_imminent = (reference["alert_level"] == "imminent").to_numpy()
+
+    return int((
+        (direction[row, col] != expected_direction)
+        | (imminent[row, col] != expected_imminent)
+    ).sum())
+
+
+# =====================
+# Parallel sweep
+# =====================
+def init_worker(replay, closed=None):
+    """Attach a worker to the replay: the cache directory when there is
+    one (memory-mapped, nothing copied), else the pickled matrices."""
+    global _replay
+    _replay = replay if isinstance(replay, Replay) else open_replay(replay, closed)
+
+
+def worker_args(replay: Replay) -> tuple:
+    if replay.source is not None:
+        return (replay.source, replay.closed)
+    return (replay,)
+
+
+def evaluate_in_worker(params: dict) -> dict:
+    return evaluate(_replay, params)
+
+
+def sweep(replay: Replay, param_sets: list, workers: int = None) -> list:
+    """Evaluate every parameter set, across a process pool when useful.
+
+    Workers memory-map a cached replay, or are sent it once otherwise;
+    never per task.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(param_sets))
+    if workers <= 1:
+        return [evaluate(replay, p) for p in param_sets]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=worker_args(replay),
+    ) as pool:
+        return list(pool.map(evaluate_in_worker, param_sets, chunksize=16))
+
+
+def parse_grid(specs: list) -> list:
+    """["decay=0.8,0.85", "today_weight=0.6,0.7"] -> every combination."""
+    grid = {}
+    for spec in specs or []:
+        key, values = spec.split("=", 1)
+        if key not in compute_prediction.DEFAULT_PARAMS:
+            raise SystemExit(f"❌ Unknown parameter: {key}")
+        kind = type(compute_prediction.DEFAULT_PARAMS[key])
+        grid[key] = [kind(v) for v in values.split(",")]
+
+    if not grid:
+        return [{}]
+    return [dict(zip(grid, combo)) for combo in itertools.product(*grid.values())]
+
+
+# =====================
+# Main
+# =====================
+def load_replay(cached: bool = True):
+    """(days, replay, price_changes), or None when there is nothing to score.
+
+    A replay of the same snapshots and price changes is reopened from
+    REPLAY_DIR; days is then None, as the per-run frames aren't kept.
+    """
+    price_changes = compute_accuracy.load_outcomes()
+    if price_changes.empty:
+        print("ℹ️ No price changes to score against")
+        return None
+
+    key = replay_key()
+    last_day = compute_accuracy.last_outcome_day()
+    if cached and (REPLAY_DIR / key).exists():
+        replay = open_replay(REPLAY_DIR / key, last_day=last_day)
+        print(f"🗄️ Replay cache {key}: {len(replay.days)} days")
+        return None, replay, price_changes
+
+    t0 = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        days = replay_features()
+    if not days:
+        print("ℹ️ Not enough snapshots to replay")
+        return None
+
+    replay = build_replay(days, price_changes, last_day)
+    print(
+        f"🔁 Replayed {len(days)} days of snapshots "
+        f"in {time.perf_counter() - t0:.1f}s"
+    )
+    save_replay(replay, key)
+    return days, replay, price_changes
+
+
+@metrics.timed("backtest")
+def run(param_sets: list, workers: int = None, verify: bool = False) -> list:
+    # --check needs the per-run frames, so it always replays afresh
+    loaded = load_replay(cached=not verify)
+    if loaded is None:
+        return []
+    days, replay, price_changes = loaded
+    metrics.rows(rows_in=replay.present.sum() + len(price_changes))
+    print(f"🎯 Thresholds: {threshold_policy()}")
+
+    if verify:
+        mismatches = check(days, replay, price_changes, param_sets[0])
+        print(f"🔍 Vectorized vs predict(): {mismatches} mismatched predictions")
+
+    t0 = time.perf_counter()
+    results = sweep(replay, param_sets, workers)
+    print(
+        f"🧪 Evaluated {len(results)} parameter sets "
+        f"in {time.perf_counter() - t0:.1f}s"
+    )
+    metrics.rows(rows_out=len(results))
+
+    return sorted(
+        results,
+        key=lambda r: (r["accuracy"] is not None, r["accuracy"] or 0, r["predicted"]),
+        reverse=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay stored snapshots through the predictor and score it"
+    )
+    parser.add_argument(
+        "--grid", action="append", metavar="PARAM=V1,V2",
+        help=f"values to sweep over the live config; one of {', '.join(compute_prediction.DEFAULT_PARAMS)}",
+    )
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--check", action="store_true",
+                        help="also replay the first set through predict() and compare")
+    parser.add_argument("--top", type=int, default=10, help="rows to print")
+    parser.add_argument("--json", type=Path, help="write all results as JSON")
+    args = parser.parse_args()
+
+    results = run(parse_grid(args.grid), args.workers, args.check)
+    if not results:
+        return
+
+    table = pd.DataFrame([
+        {**r["params"], **{k: v for k, v in r.items() if k != "params"}}
+        for r in results
+    ])
+    print(table.head(args.top).to_string(index=False))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"📝 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+from pathlib import Path
+from datetime import datetime, timedelta
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+import snapshot
+import fpl_fetch
+import snapshot_store
+import history_store
+import price_ledger
+import timeseries
+import record_price_changes
+import tune_threshold
+import update_protection
+import compute_deltas
+import compute_velocity
+import compute_trends
+import compute_prediction
+import compute_accuracy
+import telegram_queue
+import pipeline
+import metrics
+
+# =====================
+# Defaults
+# =====================
+PLAYERS = 800
+TEAMS = 20
+SEASON_GW = 38
+# History sizes in seasons. 100 seasons would be ~106k snapshots: the
+# generator holds every snapshot × player array in memory (~4 GB at
+# 800 players) and writes one file per snapshot, so it stops at 10
+SCALES = [1, 10]
+SNAPSHOTS_PER_DAY = 4           # fpl.yml cadence; try up to 24
+
+TELEGRAM_CHATS = 100
+TELEGRAM_LATENCY = 0.02         # seconds per stub sendMessage, like a real round trip
+
+
+# =====================
+# Synthetic season
+# =====================
+def synthetic_players(rng, players: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "player_id": np.arange(1, players + 1),
+        "first_name": [f"Player{i}" for i in range(1, players + 1)],
+        "second_name": [f"Surname{i}" for i in range(1, players + 1)],
+        "web_name": [f"P{i}" for i in range(1, players + 1)],
+        "team": rng.integers(1, TEAMS + 1, players),
+        "price": np.round(rng.uniform(4.0, 14.0, players), 1),
+        "ownership": np.round(rng.lognormal(0.5, 1.2, players).clip(0, 80), 1),
+        "form": np.round(rng.uniform(0, 10, players), 1),
+        "minutes": rng.integers(0, 3420, players),
+        "demand": rng.normal(0, 400, players),
+    })
+
+
+def bootstrap_payload(players: pd.DataFrame, tin, tout, prices, status) -> dict:
+    """bootstrap-static shaped payload for snapshot.build_snapshot()."""
+    elements = [
+        {
+            "id": int(pid),
+            "first_name": first,
+            "second_name": second,
+            "web_name": web,
+            "team": int(team),
+            "now_cost": int(round(price * 10)),
+            "selected_by_percent": str(own),
+            "transfers_in_event": int(i),
+            "transfers_out_event": int(o),
+            "form": str(form),
+            "minutes": int(mins),
+            "status": st,
+        }
+        for pid, first, second, web, team, price, own, i, o, form, mins, st in zip(
+            players["player_id"], players["first_name"], players["second_name"],
+            players["web_name"], players["team"], prices, players["ownership"],
+            tin, tout, players["form"], players["minutes"], status,
+        )
+    ]
+    teams = [{"id": t, "name": f"Team {t}"} for t in range(1, TEAMS + 1)]
+    return {"teams": teams, "elements": elements}
+
+
+def generate_history(gameweeks: int, per_day: int, players: int, seed: int = 0):
+    """Write a synthetic history into ./data and return the next run's payload."""
+    rng = np.random.default_rng(seed)
+    base = synthetic_players(rng, players)
+
+    days = gameweeks * 7
+    n = days * per_day
+    step = timedelta(hours=24 / per_day)
+    end = datetime.utcnow().replace(microsecond=0) - step
+    stamps = [end - step * (n - 1 - i) for i in range(n)]
+
+    # ---------------------
+    # Transfer flows and prices (snapshot × player)
+    # ---------------------
+    flow_in = rng.poisson(
+        np.clip(base["demand"].to_numpy(), 0, None) + 200, (n, players)
+    )
+    flow_out = rng.poisson(
+        np.clip(-base["demand"].to_numpy(), 0, None) + 200, (n, players)
+    )
+    gameweek = np.arange(n) // (7 * per_day)
+
+    tin = np.zeros((n, players), dtype=np.int64)
+    tout = np.zeros((n, players), dtype=np.int64)
+    for gw in np.unique(gameweek):
+        rows = gameweek == gw
+        tin[rows] = np.cumsum(flow_in[rows], axis=0)
+        tout[rows] = np.cumsum(flow_out[rows], axis=0)
+
+    net = (flow_in - flow_out).astype(np.float32)
+
+    prices = np.empty((n, players))
+    prices[0] = base["price"].to_numpy()
+    for i in range(1, n):
+        prices[i] = prices[i - 1]
+        if i % per_day == 0:
+            daily = net[i - per_day:i].sum(axis=0)
+            prices[i] += np.where(daily > 1500, 0.1, 0) - np.where(daily < -1500, 0.1, 0)
+    prices = np.round(prices, 1)
+
+    status = np.where(rng.random(players) < 0.05, "i", "a")
+
+    # ---------------------
+    # Snapshot store (+ manifest written once)
+    # ---------------------
+    template = snapshot.build_snapshot(
+        bootstrap_payload(base, tin[0], tout[0], prices[0], status),
+        stamps[0].date().isoformat(),
+    )
+
+    entries = []
+    prev = prev_df = None
+    chain = 0
+    for i, ts in enumerate(stamps):
+        df = template.copy()
+        df["price"] = prices[i]
+        df["transfers_in_event"] = tin[i]
+        df["transfers_out_event"] = tout[i]
+        df["snapshot_date"] = ts.date().isoformat()
+        df["net_transfers_delta"] = net[i]
+        df["price_change"] = prices[i] - prices[i - 1] if i else 0.0
+        df = snapshot_store.enforce_dtypes(df)
+
+        # Same keyframe / delta layout write_snapshot() produces
+        if snapshot_store.keyframe_due(ts, prev, chain):
+            prev = prev_df = None
+        entry = snapshot_store.manifest_entry(df, ts)
+        entry["stored_rows"] = snapshot_store.write_frame(df, ts, prev, prev_df)
+        entry["base"] = snapshot_store.snapshot_name(prev) if prev else ""
+        entries.append(entry)
+
+        chain = chain + 1 if prev else 0
+        prev, prev_df = ts, df
+
+    snapshot_store.save_manifest(
+        pd.DataFrame(entries, columns=snapshot_store.MANIFEST_COLUMNS)
+    )
+
+    # ---------------------
+    # Transfer series
+    # ---------------------
+    series = timeseries.TransferSeries()
+    ids = base["player_id"].to_numpy()
+    for i, ts in enumerate(stamps):
+        series.push(ts, pd.Series(net[i], index=ids))
+    series.save()
+
+    # ---------------------
+    # Price ledger + price_changes.csv
+    # ---------------------
+    last = price_ledger.empty_last_prices()
+    for i in [0] + [i for i in range(1, n) if (prices[i] != prices[i - 1]).any()]:
+        curr = pd.DataFrame({"player_id": ids, "price": prices[i]})
+        ledger_rows, last = price_ledger.detect_changes(curr, last, stamps[i])
+        price_ledger.append_entries(ledger_rows)
+        changes = price_ledger.to_price_changes(ledger_rows)
+        if not changes.empty:
+            record_price_changes.append_price_changes(changes)
+    price_ledger.save_last_prices(last)
+
+    # ---------------------
+    # Prediction history, one partition per day
+    # ---------------------
+    for d in range(days):
+        rows = slice(d * per_day, (d + 1) * per_day)
+        score = net[rows].sum(axis=0) / np.clip(base["ownership"], 0.1, None)
+        order = np.argsort(score)
+        direction = np.full(players, "none", dtype=object)
+        direction[order[-25:]] = "rise"
+        direction[order[:25]] = "fall"
+        confidence = np.round(np.clip(np.abs(score) / np.abs(score).max() * 5, 0, 5), 2)
+
+        part = pd.DataFrame({
+            "player_id": ids,
+            "web_name": base["web_name"],
+            "direction": direction,
+            "alert_level": np.where(
+                (direction != "none") & (confidence >= 4), "imminent", "none"
+            ),
+            "confidence": confidence,
+            "raw_score": score,
+            "prediction_score": score * 0.7,
+            "velocity": net[rows].mean(axis=0),
+            "net_transfers_delta": net[rows][-1],
+            "transfer_pressure": score,
+            "ownership": base["ownership"],
+            "ownership_bucket": "0-2%",
+            "market_bias": "neutral",
+            "rise_threshold": np.sort(score)[-25],
+            "fall_threshold": np.sort(score)[24],
+        })
+        history_store.write_partition(part, stamps[d * per_day].date())
+
+    # ---------------------
+    # Next run's payload
+    # ---------------------
+    i = n - 1
+    return bootstrap_payload(
+        base,
+        tin[i] + flow_in[i],
+        tout[i] + flow_out[i],
+        prices[i],
+        status,
+    ), n, days
+
+
+# =====================
+# Stages under test
+# =====================
+def stage_snapshot(payload):
+    fetch = snapshot.fetch_bootstrap
+    snapshot.fetch_bootstrap = lambda: fpl_fetch.Payload(payload, "benchmark", True)
+    try:
+        snapshot.main()
+    finally:
+        snapshot.fetch_bootstrap = fetch
+
+
+def stage_pipeline(payload):
+    """pipeline.run(), as CI runs it, timed as one stage."""
+    fetch = snapshot.fetch_bootstrap
+    snapshot.fetch_bootstrap = lambda: fpl_fetch.Payload(payload, "benchmark", True)
+    try:
+        with metrics.track("pipeline"):
+            artifacts = pipeline.run()
+            metrics.rows(rows_in=metrics.count_rows(artifacts.values()))
+    finally:
+        snapshot.fetch_bootstrap = fetch
+
+
+STAGES = [
+    ("snapshot", stage_snapshot),
+    ("record_price_changes", lambda payload: record_price_changes.main()),
+    ("update_protection", lambda payload: update_protection.main()),
+    ("compute_deltas", lambda payload: compute_deltas.main()),
+    ("compute_velocity", lambda payload: compute_velocity.main()),
+    ("compute_trends", lambda payload: compute_trends.main()),
+    ("compute_prediction", lambda payload: compute_prediction.main()),
+    ("tune_threshold", lambda payload: tune_threshold.main()),
+    ("compute_accuracy", lambda payload: compute_accuracy.main([])),
+]
+
+
+def reset_caches():
+    snapshot_store._manifest = None
+    snapshot_store._frames.clear()
+
+
+def run_scale(seasons: float, per_day: int, players: int) -> list:
+    gameweeks = max(1, round(seasons * SEASON_GW))
+    root = Path(tempfile.mkdtemp(prefix="fpl-bench-"))
+    cwd = os.getcwd()
+    os.chdir(root)
+    reset_caches()
+
+    try:
+        t0 = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            payload, n_snapshots, days = generate_history(gameweeks, per_day, players)
+        gen_s = time.perf_counter() - t0
+
+        # The pipeline gets the same starting history the scripts do
+        pipeline_root = root / "pipeline"
+        shutil.copytree(root / "data", pipeline_root / "data")
+
+        print(
+            f"\n⏱️ {seasons:g} season(s), {gameweeks} GW history: {n_snapshots} snapshots, "
+            f"{days} days (generated in {gen_s:.1f}s)"
+        )
+
+        results = []
+        for name, stage in STAGES + [("pipeline", stage_pipeline)]:
+            if name == "pipeline":
+                os.chdir(pipeline_root)
+                reset_caches()
+            # Each main() is instrumented; metrics.last is its record
+            with redirect_stdout(io.StringIO()):
+                stage(payload)
+
+            record = dict(metrics.last)
+            wall = record["wall_s"]
+            rows = record["rows_in"] or record["rows_out"] or 0
+            record.update({
+                "scale_seasons": seasons,
+                "scale_gw": gameweeks,
+                "snapshots": n_snapshots,
+                "rows_per_s": round(rows / wall) if wall > 0 else None,
+            })
+            results.append(record)
+
+            print(
+                f"   {name:<22} {wall * 1000:9.1f} ms"
+                f"  {record['rows_per_s'] or 0:>12,} rows/s"
+                f"  {record['peak_rss_mb']:8.1f} MB"
+                f"  {(record['bytes_read'] or 0) / 2**20:8.1f} MB read"
+            )
+
+        return results
+    finally:
+        os.chdir(cwd)
+        reset_caches()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# =====================
+# Telegram outbound
+# =====================
+class TelegramStub:
+    """Local sendMessage endpoint with a fixed latency; when limited, it
+    answers 429 + retry_after past Telegram's global and per-chat rates."""
+
+    def __init__(self, limited: bool):
+        self.limited = limited
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.delivered = 0
+        self.rejected = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; with Nagle on,
+            # keep-alive clients would wait on a delayed ACK for each reply
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(TELEGRAM_LATENCY)
+                if stub.allow(str(body["chat_id"])):
+                    code, out = 200, {"ok": True, "result": {"message_id": 1}}
+                else:
+                    code, out = 429, {"ok": False, "error_code": 429,
+                                      "parameters": {"retry_after": 1}}
+                data = json.dumps(out).encode()
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _take(self, key: str, rate: float, burst: int) -> bool:
+        tokens, stamp = self.buckets.get(key, (burst, time.monotonic()))
+        now = time.monotonic()
+        tokens = min(burst, tokens + (now - stamp) * rate)
+        ok = tokens >= 1
+        self.buckets[key] = (tokens - 1 if ok else tokens, now)
+        return ok
+
+    def allow(self, chat_id: str) -> bool:
+        with self.lock:
+            ok = not self.limited or (
+                self._take("*", telegram_queue.GLOBAL_RATE, telegram_queue.GLOBAL_BURST)
+                and self._take(chat_id, telegram_queue.CHAT_RATE, telegram_queue.CHAT_BURST)
+            )
+            if ok:
+                self.delivered += 1
+            else:
+                self.rejected += 1
+            return ok
+
+
+def send_unpooled(base: str, messages: list):
+    """The old way: one requests.post per message, no session, no retry."""
+    for chat_id, text in messages:
+        requests.post(
+            f"{base}/botbench/sendMessage",
+            json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"},
+            timeout=15,
+        )
+
+
+def send_queued(base: str, messages: list, limited: bool):
+    rate = telegram_queue.GLOBAL_RATE if limited else float("inf")
+    chat_rate = telegram_queue.CHAT_RATE if limited else float("inf")
+    box = telegram_queue.Outbox("bench", base, rate=rate, chat_rate=chat_rate)
+    for chat_id, text in messages:
+        box.send(chat_id, text)
+    box.flush()
+
+
+def run_telegram(n: int) -> list:
+    messages = [
+        (str(i % TELEGRAM_CHATS), f"📈 *Player {i}*\nConfidence: {i % 5}.00")
+        for i in range(n)
+    ]
+
+    print(f"\n📨 Telegram outbound: {n} messages to {TELEGRAM_CHATS} chats, "
+          f"{TELEGRAM_LATENCY * 1000:.0f} ms stub latency")
+
+    results = []
+    for limited in (False, True):
+        for name, send in [
+            ("unpooled", lambda base: send_unpooled(base, messages)),
+            ("outbox", lambda base: send_queued(base, messages, limited)),
+        ]:
+            stub = TelegramStub(limited)
+            t0 = time.perf_counter()
+            send(stub.base)
+            wall = time.perf_counter() - t0
+            stub.server.shutdown()
+
+            record = {
+                "stage": f"telegram_{name}",
+                "stub": "rate_limited" if limited else "unlimited",
+                "messages": n,
+                "delivered": stub.delivered,
+                "rejected_429": stub.rejected,
+                "wall_s": round(wall, 3),
+                "msgs_per_s": round(stub.delivered / wall, 1),
+            }
+            results.append(record)
+            print(
+                f"   {name:<9} {record['stub']:<13} {wall:7.2f} s"
+                f"  {record['msgs_per_s']:8.1f} msg/s"
+                f"  {stub.delivered:>5} delivered  {stub.rejected:>5} × 429"
+            )
+
+    return results
+
+
+# =====================
+# Main
+# =====================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FPL pipeline stages")
+    parser.add_argument(
+        "--scales",
+        default=",".join(str(s) for s in SCALES),
+        help=(
+            f"history sizes in {SEASON_GW}-gameweek seasons, comma separated "
+            "(fractions allowed); 100 seasons needs ~4 GB for the generator's "
+            "arrays and ~106k snapshot files, so the default stops at 10"
+        ),
+    )
+    parser.add_argument("--per-day", type=int, default=SNAPSHOTS_PER_DAY)
+    parser.add_argument("--players", type=int, default=PLAYERS)
+    parser.add_argument("--json", type=Path, help="write results as JSON")
+    parser.add_argument("--telegram", type=int, metavar="N",
+                        help="instead, send N messages through a local Telegram stub")
+    args = parser.parse_args()
+
+    results = []
+    if args.telegram:
+        results.extend(run_telegram(args.telegram))
+    else:
+        for scale in [float(s) for s in args.scales.split(",")]:
+            results.extend(run_scale(scale, args.per_day, args.players))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"\n📝 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
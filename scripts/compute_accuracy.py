@@ -1,13 +1,28 @@
 from pathlib import Path
 import pandas as pd
-from datetime import timedelta
+import numpy as np
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+import argparse
+import io
+import json
+
+import history_store
+import snapshot_store
+import schema
+import metrics
 
 # =====================
 # Paths
 # =====================
-PREDICTIONS_PATH = Path("data/predictions_history.csv")
 OUTCOMES_PATH = Path("data/price_changes.csv")
 OUT_PATH = Path("data/accuracy.csv")
+STATE_PATH = Path("data/accuracy_state.json")
+
+# Day D's prediction resolves at the D+1 price update (~01:30 UK); give it
+# the same 30 minutes the scheduler keeps polling for
+UK = ZoneInfo("Europe/London")
+OUTCOME_CLOSES = time(2, 0)
 
 
 def safe_read_csv(path: Path) -> pd.DataFrame:
@@ -19,14 +34,119 @@ def safe_read_csv(path: Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def main():
-    preds = safe_read_csv(PREDICTIONS_PATH)
-    actuals = safe_read_csv(OUTCOMES_PATH)
+def load_outcomes() -> pd.DataFrame:
+    return schema.enforce(safe_read_csv(OUTCOMES_PATH), schema.PRICE_CHANGE_DTYPES)
 
-    if preds.empty or actuals.empty:
-        print("ℹ️ Not enough data to compute accuracy")
-        return
 
+PREDICTION_COLUMNS = [
+    "player_id",
+    "date",
+    "direction",
+    "alert_level",
+    "confidence",
+]
+
+ACCURACY_COLUMNS = ["date_pred", "predicted", "correct", "accuracy"]
+
+
+# =====================
+# Watermark
+# =====================
+def load_state() -> dict:
+    if not STATE_PATH.exists():
+        return {}
+    return json.loads(STATE_PATH.read_text())
+
+
+def save_state(state: dict):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(STATE_PATH)
+
+
+def outcome_day(ts: datetime):
+    """Latest day whose price update had happened by ts (aware)."""
+    local = ts.astimezone(UK)
+    if local.time() < OUTCOME_CLOSES:
+        return local.date() - timedelta(days=1)
+    return local.date()
+
+
+def last_outcome_day(now: datetime = None):
+    """Latest day whose price update has happened and been recorded.
+
+    The clock alone isn't enough: price changes are only written when a
+    snapshot is taken, so the day must also be closed as of the newest
+    stored snapshot. Until then its outcomes may still be missing.
+    """
+    day = outcome_day(now or datetime.now(timezone.utc))
+    snapshots = snapshot_store.latest()
+    if snapshots:
+        # Snapshot timestamps are naive UTC
+        day = min(day, outcome_day(snapshots[-1].replace(tzinfo=timezone.utc)))
+    return day
+
+
+def closed_days(after: str = None, now: datetime = None) -> list:
+    """Prediction days after the watermark whose D+1 outcome is in."""
+    last_closed = (last_outcome_day(now) - timedelta(days=1)).isoformat()
+    return [
+        d for d in history_store.list_dates()
+        if (after is None or d > after) and d <= last_closed
+    ]
+
+
+# =====================
+# Outcomes
+# =====================
+def read_outcomes(offset: int = 0):
+    """price_changes.csv rows from a byte offset on, plus each row's end offset.
+
+    The file is only ever appended to in date order, so the next run can
+    start where the outcome days it has consumed end.
+    """
+    with open(OUTCOMES_PATH, "rb") as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        body = f.read()
+
+    lines = body.splitlines(keepends=True)
+    # A row still being appended is picked up next time
+    if lines and not lines[-1].endswith(b"\n"):
+        lines = lines[:-1]
+
+    ends = start + np.cumsum([len(line) for line in lines], dtype=np.int64)
+    keep = np.array([bool(line.strip()) for line in lines], dtype=bool)
+
+    kept = [line for line, k in zip(lines, keep) if k]
+    if not kept:
+        return pd.DataFrame(columns=["player_id", "date", "actual_change"]), ends[keep]
+
+    actuals = pd.read_csv(io.BytesIO(header + b"".join(kept)))
+    return schema.enforce(actuals, schema.PRICE_CHANGE_DTYPES), ends[keep]
+
+
+def consumed_offset(actuals: pd.DataFrame, ends, through: str, offset: int) -> int:
+    """Byte offset of the first outcome row dated after the through day."""
+    if actuals.empty:
+        return offset
+
+    dates = pd.to_datetime(actuals["date"], errors="coerce").dt.date.astype(str)
+    later = np.flatnonzero((dates > through).to_numpy())
+    if not len(later):
+        return int(ends[-1])
+    if later[0] == 0:
+        return offset
+    return int(ends[later[0] - 1])
+
+
+# =====================
+# Scoring
+# =====================
+def score(preds: pd.DataFrame, actuals: pd.DataFrame):
+    """Daily D -> D+1 accuracy of imminent predictions, or None."""
     # ---------------------
     # Required columns
     # ---------------------
@@ -34,12 +154,12 @@ def main():
     act_cols = {"player_id", "date", "actual_change"}
 
     if not pred_cols.issubset(preds.columns):
-        print("⚠️ predictions_history.csv missing required columns")
-        return
+        print("⚠️ prediction history missing required columns")
+        return None
 
     if not act_cols.issubset(actuals.columns):
         print("⚠️ price_changes.csv missing required columns")
-        return
+        return None
 
     # ---------------------
     # Date parsing
@@ -59,8 +179,7 @@ def main():
     ]
 
     if preds.empty:
-        print("ℹ️ No imminent predictions to score")
-        return
+        return pd.DataFrame(columns=ACCURACY_COLUMNS)
 
     # ---------------------
     # One prediction per player per day
@@ -111,13 +230,72 @@ def main():
         accuracy["correct"] / accuracy["predicted"]
     ).round(3)
 
+    return accuracy.sort_values("date_pred")[ACCURACY_COLUMNS]
+
+
+# =====================
+# Main
+# =====================
+@metrics.timed("compute_accuracy")
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score D -> D+1 accuracy of imminent predictions"
+    )
+    parser.add_argument("--full", action="store_true",
+                        help="rescore every closed day and rewrite accuracy.csv")
+    args = parser.parse_args(argv)
+
+    if not OUTCOMES_PATH.exists() or OUTCOMES_PATH.stat().st_size == 0:
+        print("ℹ️ Not enough data to compute accuracy")
+        return
+
+    state = load_state()
+    watermark = state.get("scored_through")
+    offset = state.get("outcomes_offset", 0)
+
+    # No watermark, or price_changes.csv was rewritten: start over
+    full = (
+        args.full
+        or watermark is None
+        or not OUT_PATH.exists()
+        or offset > OUTCOMES_PATH.stat().st_size
+    )
+    if full:
+        watermark, offset = None, 0
+
+    days = closed_days(watermark)
+    if not days:
+        print(f"ℹ️ No newly resolved prediction days (scored through {watermark})")
+        return
+
+    preds = history_store.read_days(days, PREDICTION_COLUMNS)
+    actuals, ends = read_outcomes(offset)
+    metrics.rows(rows_in=len(preds) + len(actuals))
+
+    accuracy = score(preds, actuals.copy())
+    if accuracy is None:
+        return
+
     # ---------------------
     # Save
     # ---------------------
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    accuracy.to_csv(OUT_PATH, index=False)
+    if full:
+        accuracy.to_csv(OUT_PATH, index=False)
+    else:
+        accuracy.to_csv(OUT_PATH, mode="a", header=False, index=False)
+    metrics.rows(rows_out=len(accuracy))
+
+    through = days[-1]
+    outcome_day = (pd.to_datetime(through).date() + timedelta(days=1)).isoformat()
+    save_state({
+        "scored_through": through,
+        "outcomes_offset": consumed_offset(actuals, ends, outcome_day, offset),
+        "updated": datetime.utcnow().isoformat(timespec="seconds"),
+    })
 
-    print("📈 Accuracy report updated (D → D+1 strict)")
+    mode = "full recompute" if full else f"{len(days)} new days"
+    print(f"📈 Accuracy report updated (D → D+1 strict, {mode})")
     print(accuracy.tail())
 
 
@@ -1,10 +1,21 @@
 from pathlib import Path
 import pandas as pd
-from datetime import datetime
 
-SNAPSHOT_DIR = Path("data/snapshots")
+import snapshot_store
+import schema
+import metrics
+
 PROTECTION_PATH = Path("data/protection_status.csv")
 
+DELTA_INPUT_COLUMNS = [
+    "player_id",
+    "transfers_in_event",
+    "transfers_out_event",
+    "price",
+    "status",
+]
+DELTA_OUTPUT_COLUMNS = ["player_id", "net_transfers_delta", "price_change"]
+
 
 def safe_read_csv(path: Path) -> pd.DataFrame:
     if not path.exists() or path.stat().st_size == 0:
@@ -12,40 +23,20 @@ def safe_read_csv(path: Path) -> pd.DataFrame:
     return pd.read_csv(path)
 
 
-def main():
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
-    if len(snapshots) < 2:
-        print("ℹ️ Not enough snapshots for deltas")
-        return
-
-    prev_path = snapshots[-2]
-    curr_path = snapshots[-1]
-
-    prev = safe_read_csv(prev_path)
-    curr = safe_read_csv(curr_path)
-
-    required = {
-        "player_id",
-        "transfers_in_event",
-        "transfers_out_event",
-        "price",
-        "status",
-    }
+def compute_deltas(
+    curr: pd.DataFrame,
+    prev: pd.DataFrame,
+    prot: pd.DataFrame,
+    today,
+):
+    required = set(DELTA_INPUT_COLUMNS)
 
     if not required.issubset(prev.columns) or not required.issubset(curr.columns):
         print("⚠️ Missing required columns for delta computation")
-        return
+        return None
 
     merged = curr.merge(
-        prev[
-            [
-                "player_id",
-                "transfers_in_event",
-                "transfers_out_event",
-                "price",
-                "status",
-            ]
-        ],
+        prev[DELTA_INPUT_COLUMNS],
         on="player_id",
         suffixes=("", "_prev"),
         how="left",
@@ -72,18 +63,7 @@ def main():
     # =====================================================
     # 🟢 PROTECTION B — POST-RECOVERY LOCK
     # =====================================================
-    if PROTECTION_PATH.exists():
-        prot = pd.read_csv(PROTECTION_PATH)
-        prot["lock_until"] = pd.to_datetime(
-            prot["lock_until"], errors="coerce"
-        ).dt.date
-
-        today = pd.to_datetime(
-            curr_path.stem.replace("snapshot_", ""),
-            format="%Y-%m-%d_%H-%M-%S",
-            errors="coerce",
-        ).date()
-
+    if not prot.empty:
         locked_ids = prot.loc[
             prot["lock_until"] >= today,
             "player_id",
@@ -112,7 +92,40 @@ def main():
         errors="ignore",
     )
 
-    merged.to_csv(curr_path, index=False)
+    return merged
+
+
+def load_protection() -> pd.DataFrame:
+    prot = schema.enforce(safe_read_csv(PROTECTION_PATH), schema.PROTECTION_DTYPES)
+    if not prot.empty:
+        prot["lock_until"] = pd.to_datetime(
+            prot["lock_until"], errors="coerce"
+        ).dt.date
+    return prot
+
+
+@metrics.timed("compute_deltas")
+def main():
+    snapshots = snapshot_store.latest(2)
+    if len(snapshots) < 2:
+        print("ℹ️ Not enough snapshots for deltas")
+        return
+
+    prev_ts = snapshots[-2]
+    curr_ts = snapshots[-1]
+
+    curr = snapshot_store.read_snapshot(curr_ts, DELTA_INPUT_COLUMNS)
+    prev = snapshot_store.read_snapshot(prev_ts, DELTA_INPUT_COLUMNS)
+    metrics.rows(rows_in=len(curr) + len(prev))
+
+    merged = compute_deltas(curr, prev, load_protection(), curr_ts.date())
+
+    if merged is None:
+        return
+
+    metrics.rows(rows_out=len(merged))
+
+    snapshot_store.update_snapshot(curr_ts, merged[DELTA_OUTPUT_COLUMNS])
     print("✅ Deltas updated with full protection enforcement")
 
 
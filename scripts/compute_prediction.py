@@ -1,22 +1,26 @@
 from pathlib import Path
 import pandas as pd
+import json
 from datetime import datetime, timedelta
-import numpy as np
+
+import snapshot_store
+import history_store
+import rolling_state
+import schema
+import threshold_resolver
+import metrics
 
 # =====================
 # Paths
 # =====================
-SNAPSHOT_DIR = Path("data/snapshots")
 PROTECTION_PATH = Path("data/protection_status.csv")
 OUT_PATH = Path("data/predictions.csv")
-HISTORY_PATH = Path("data/predictions_history.csv")
 PRICE_CHANGES_PATH = Path("data/price_changes.csv")
+PARAMS_PATH = Path("data/prediction_params.json")
 
 # =====================
 # Tunables
 # =====================
-MIN_ALERTS_PER_SIDE = 5
-MAX_ALERTS_PER_SIDE = 25
 CONFIDENCE_IMMINENT = 4.0
 
 ROLLING_DAYS = 7
@@ -24,28 +28,43 @@ TODAY_WEIGHT = 0.65
 ROLLING_WEIGHT = 0.35
 DECAY = 0.85  # per day decay
 
+# Everything predict() lets a caller vary (the backtester sweeps these)
+DEFAULT_PARAMS = {
+    "pressure_weight": 0.55,
+    "velocity_weight": 0.30,
+    "trend_weight": 0.15,
+    "today_weight": TODAY_WEIGHT,
+    "rolling_weight": ROLLING_WEIGHT,
+    "decay": DECAY,
+    "rolling_days": ROLLING_DAYS,
+    "confidence_imminent": CONFIDENCE_IMMINENT,
+    "bias_dampening": 0.4,
+    "neutral_dampening": 0.7,
+}
+
+# (mtime_ns, parsed file), so the file is only re-read after tune_params
+# rewrites it
+_params_cache = {}
+
 # =====================
-# Canonical history schema
+# Snapshot columns used for prediction
 # =====================
-HISTORY_COLUMNS = [
-    "date",
+SNAPSHOT_COLUMNS = [
     "player_id",
     "web_name",
-    "direction",
-    "alert_level",
-    "confidence",
-    "raw_score",
-    "prediction_score",
-    "velocity",
-    "net_transfers_delta",
-    "transfer_pressure",
     "ownership",
-    "ownership_bucket",
-    "market_bias",
-    "rise_threshold",
-    "fall_threshold",
+    "net_transfers_delta",
+    "net_transfers_window",
+    "velocity",
+    "trend_score",
+    "status",
 ]
 
+# =====================
+# Canonical history schema
+# =====================
+HISTORY_COLUMNS = schema.PREDICTION_COLUMNS
+
 # =====================
 # Helpers
 # =====================
@@ -73,111 +92,145 @@ def detect_market_bias(price_changes: pd.DataFrame) -> str:
         return "bearish"
     return "neutral"
 
-def resolve_threshold(scores, side="rise"):
-    if scores.empty:
-        return np.inf if side == "rise" else -np.inf
-
-    scores = scores.sort_values(ascending=(side == "fall"))
-
-    top = scores[scores > 0] if side == "rise" else scores[scores < 0]
+def load_params(path: Path = PARAMS_PATH) -> dict:
+    """The versioned config tune_params writes, or {} when there is none."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
 
-    if len(top) < MIN_ALERTS_PER_SIDE:
-        return np.inf if side == "rise" else -np.inf
+    cached = _params_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
 
-    k = min(MAX_ALERTS_PER_SIDE, len(top))
-    return top.iloc[k - 1]
+    try:
+        config = json.loads(path.read_text())
+    except (OSError, ValueError):
+        config = {}
+
+    _params_cache[path] = (mtime, config)
+    return config
+
+def resolve_params(params: dict = None) -> dict:
+    """DEFAULT_PARAMS overlaid with params, or with the tuned config's
+    when none are given; unknown keys are ignored."""
+    if params is None:
+        params = load_params().get("params", {})
+    return {
+        **DEFAULT_PARAMS,
+        **{k: v for k, v in params.items() if k in DEFAULT_PARAMS},
+    }
 
 # =====================
 # Rolling signal
 # =====================
-def compute_rolling_score(history: pd.DataFrame, today: str) -> pd.Series:
+def compute_rolling_score(
+    history: pd.DataFrame,
+    today: str,
+    decay: float = DECAY,
+    rolling_days: int = ROLLING_DAYS,
+) -> pd.Series:
     if history.empty:
         return pd.Series(dtype=float)
 
-    history["date"] = pd.to_datetime(history["date"])
-    cutoff = pd.to_datetime(today) - timedelta(days=ROLLING_DAYS)
+    recent = history[history["raw_score"].notna()]
 
-    recent = history[
-        (history["date"] >= cutoff)
-        & (history["raw_score"].notna())
-    ].copy()
+    # rolling_days=None keeps every day, decaying
+    if rolling_days is not None:
+        cutoff = pd.to_datetime(today) - timedelta(days=rolling_days)
+        recent = recent[pd.to_datetime(recent["date"]) >= cutoff]
+    recent = recent.copy()
 
     if recent.empty:
         return pd.Series(dtype=float)
 
+    recent["date"] = pd.to_datetime(recent["date"])
     recent["days_ago"] = (pd.to_datetime(today) - recent["date"]).dt.days
-    recent["decay_weight"] = DECAY ** recent["days_ago"]
+    recent["decay_weight"] = decay ** recent["days_ago"]
     recent["weighted_score"] = recent["raw_score"] * recent["decay_weight"]
 
     return recent.groupby("player_id")["weighted_score"].sum()
 
+def load_protection() -> pd.DataFrame:
+    if not PROTECTION_PATH.exists():
+        return pd.DataFrame(columns=["player_id", "lock_until"])
+    prot = schema.enforce(pd.read_csv(PROTECTION_PATH), schema.PROTECTION_DTYPES)
+    prot["lock_until"] = pd.to_datetime(prot["lock_until"]).dt.date
+    return prot
+
 # =====================
-# Main
+# Prediction
 # =====================
-def main():
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
-    if not snapshots:
-        print("ℹ️ No snapshots found")
-        return
-
-    df = safe_read_csv(snapshots[-1])
-
-    required = {
-        "player_id",
-        "web_name",
-        "ownership",
-        "net_transfers_delta",
-        "velocity",
-        "trend_score",
-        "status",
-    }
+def predict(
+    df: pd.DataFrame,
+    history: pd.DataFrame,
+    price_changes: pd.DataFrame,
+    prot: pd.DataFrame,
+    today: str,
+    tuned: dict = None,
+    params: dict = None,
+):
+    required = set(SNAPSHOT_COLUMNS)
     if not required.issubset(df.columns):
         print("⚠️ Snapshot missing required columns")
-        return
+        return None
 
-    today = datetime.utcnow().date().isoformat()
+    df = df.copy()
+
+    # Explicit params (the backtester's) win over the tuned config
+    p = resolve_params(params)
+    if params is None:
+        version = load_params().get("version", 0)
+        print(f"⚙️ Prediction params: {f'v{version}' if version else 'defaults'}")
+        metrics.note(params_version=version)
 
     # ---------------------
     # Market regime
     # ---------------------
-    price_changes = safe_read_csv(PRICE_CHANGES_PATH)
     market_bias = detect_market_bias(price_changes)
 
     # ---------------------
     # Raw signal
     # ---------------------
+    # Over timeseries.DELTA_HOURS, not since the previous snapshot, whose
+    # age depends on how often the pipeline runs
     df["transfer_pressure"] = (
-        df["net_transfers_delta"] / df["ownership"].clip(lower=0.1)
+        df["net_transfers_window"] / df["ownership"].clip(lower=0.1)
     )
 
     df["raw_score"] = (
-        0.55 * df["transfer_pressure"]
-        + 0.30 * df["velocity"]
-        + 0.15 * df["trend_score"]
+        p["pressure_weight"] * df["transfer_pressure"]
+        + p["velocity_weight"] * df["velocity"]
+        + p["trend_weight"] * df["trend_score"]
     )
 
     # ---------------------
     # Rolling memory
     # ---------------------
-    history = normalize_history_schema(safe_read_csv(HISTORY_PATH))
-    rolling_scores = compute_rolling_score(history, today)
+    # history is the carried-forward RollingState, or raw history rows
+    if isinstance(history, rolling_state.RollingState):
+        rolling_scores = history.score(today, p["decay"], p["rolling_days"])
+    else:
+        rolling_scores = compute_rolling_score(
+            normalize_history_schema(history), today, p["decay"], p["rolling_days"]
+        )
 
     df["rolling_score"] = df["player_id"].map(rolling_scores).fillna(0)
 
     df["prediction_score"] = (
-        TODAY_WEIGHT * df["raw_score"]
-        + ROLLING_WEIGHT * df["rolling_score"]
+        p["today_weight"] * df["raw_score"]
+        + p["rolling_weight"] * df["rolling_score"]
     )
 
     # ---------------------
     # Market dampening
     # ---------------------
     if market_bias == "bullish":
-        df.loc[df["prediction_score"] < 0, "prediction_score"] *= 0.4
+        df.loc[df["prediction_score"] < 0, "prediction_score"] *= p["bias_dampening"]
     elif market_bias == "bearish":
-        df.loc[df["prediction_score"] > 0, "prediction_score"] *= 0.4
+        df.loc[df["prediction_score"] > 0, "prediction_score"] *= p["bias_dampening"]
     else:
-        df["prediction_score"] *= 0.7
+        df["prediction_score"] *= p["neutral_dampening"]
 
     # ---------------------
     # Protections
@@ -185,11 +238,9 @@ def main():
     injured = df["status"].isin(["i", "s"])
     df.loc[injured, ["prediction_score", "raw_score"]] = 0
 
-    if PROTECTION_PATH.exists():
-        prot = pd.read_csv(PROTECTION_PATH)
-        prot["lock_until"] = pd.to_datetime(prot["lock_until"]).dt.date
+    if not prot.empty:
         locked = prot.loc[
-            prot["lock_until"] >= datetime.utcnow().date(),
+            prot["lock_until"] >= pd.to_datetime(today).date(),
             "player_id",
         ]
         df.loc[df["player_id"].isin(locked), ["prediction_score", "raw_score"]] = 0
@@ -199,8 +250,16 @@ def main():
     # ---------------------
     # Thresholds
     # ---------------------
-    rise_threshold = resolve_threshold(active["prediction_score"], "rise")
-    fall_threshold = resolve_threshold(active["prediction_score"], "fall")
+    # Tuned score cutoffs from thresholds.json, else the top-k rule
+    thresholds = threshold_resolver.resolve(active["prediction_score"], tuned)
+    rise_threshold = thresholds.rise
+    fall_threshold = thresholds.fall
+
+    print(
+        f"🎯 Thresholds ({thresholds.policy}: {thresholds.reason}): "
+        f"rise >= {rise_threshold:.4g}, fall <= {fall_threshold:.4g}"
+    )
+    metrics.note(threshold_policy=thresholds.policy)
 
     # ---------------------
     # Direction
@@ -224,7 +283,7 @@ def main():
     # ---------------------
     df["alert_level"] = "none"
     df.loc[
-        (df["direction"] != "none") & (df["confidence"] >= CONFIDENCE_IMMINENT),
+        (df["direction"] != "none") & (df["confidence"] >= p["confidence_imminent"]),
         "alert_level",
     ] = "imminent"
 
@@ -245,21 +304,48 @@ def main():
     df["rise_threshold"] = rise_threshold
     df["fall_threshold"] = fall_threshold
 
-    predictions = df[HISTORY_COLUMNS]
+    predictions = schema.enforce(df[HISTORY_COLUMNS], schema.PREDICTION_DTYPES)
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    predictions.to_csv(OUT_PATH, index=False)
+    print(f"🔮 Predictions today: {(predictions['direction'] != 'none').sum()}")
+    print(f"🚨 Imminent alerts: {(predictions['alert_level'] == 'imminent').sum()}")
+
+    return predictions
+
+# =====================
+# Main
+# =====================
+@metrics.timed("compute_prediction")
+def main():
+    snapshots = snapshot_store.latest()
+    if not snapshots:
+        print("ℹ️ No snapshots found")
+        return
 
-    combined = (
-        pd.concat([history, predictions], ignore_index=True)
-        .sort_values("date")
-        .drop_duplicates(subset=["date", "player_id"], keep="last")
+    today = datetime.utcnow().date().isoformat()
+
+    df = snapshot_store.read_snapshot(snapshots[-1], SNAPSHOT_COLUMNS)
+    state = rolling_state.load(resolve_params())
+    metrics.rows(rows_in=len(df) + len(state.ring))
+
+    predictions = predict(
+        df,
+        state,
+        schema.enforce(safe_read_csv(PRICE_CHANGES_PATH), schema.PRICE_CHANGE_DTYPES),
+        load_protection(),
+        today,
     )
 
-    combined.to_csv(HISTORY_PATH, index=False)
+    if predictions is None:
+        return
 
-    print(f"🔮 Predictions today: {(predictions['direction'] != 'none').sum()}")
-    print(f"🚨 Imminent alerts: {(predictions['alert_level'] == 'imminent').sum()}")
+    metrics.rows(rows_out=len(predictions))
+
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    predictions.to_csv(OUT_PATH, index=False)
+    partition = history_store.write_partition(predictions, today)
+
+    state.push(today, predictions.set_index("player_id")["raw_score"])
+    state.save(partition)
 
 if __name__ == "__main__":
     main()
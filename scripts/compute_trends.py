@@ -1,26 +1,46 @@
-from pathlib import Path
 import pandas as pd
 
-SNAPSHOT_DIR = Path("data/snapshots")
+import snapshot_store
+import timeseries
+import metrics
 
+def add_trend(df: pd.DataFrame, ts, series: timeseries.TransferSeries):
+    if "velocity" not in df.columns or "net_transfers_delta" not in df.columns:
+        print("⚠️ velocity missing")
+        return None
+
+    # Re-pushing the same snapshot is a no-op replace
+    series.push(ts, df.set_index("player_id")["net_transfers_delta"])
+    features = series.features().set_index("player_id")
+
+    df["trend_score"] = df["player_id"].map(features["trend_score"]).fillna(0)
+
+    return df
+
+
+@metrics.timed("compute_trends")
 def main():
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
+    snapshots = snapshot_store.latest()
     if not snapshots:
         print("ℹ️ No snapshots found")
         return
 
-    path = snapshots[-1]
-    df = pd.read_csv(path)
-
-    if "velocity" not in df.columns:
-        print("⚠️ velocity missing")
+    ts = snapshots[-1]
+    series = timeseries.load_series()
+    df = add_trend(
+        snapshot_store.read_snapshot(
+            ts, ["player_id", "net_transfers_delta", "velocity"]
+        ),
+        ts,
+        series,
+    )
+
+    if df is None:
         return
 
-    df["trend_score"] = df["velocity"].rolling(
-        window=5, min_periods=1
-    ).mean()
-
-    df.to_csv(path, index=False)
+    metrics.rows(len(df), len(df))
+    series.save()
+    snapshot_store.update_snapshot(ts, df[["player_id", "trend_score"]])
 
     print("✅ Trend score added to snapshot")
 
@@ -1,26 +1,48 @@
-from pathlib import Path
 import pandas as pd
 
-SNAPSHOT_DIR = Path("data/snapshots")
+import snapshot_store
+import timeseries
+import metrics
 
+def add_velocity(df: pd.DataFrame, ts, series: timeseries.TransferSeries):
+    if "net_transfers_delta" not in df.columns:
+        print("⚠️ net_transfers_delta missing")
+        return None
+
+    # Windows over each player's own history, not neighbouring rows; they
+    # span fixed hours, so the scheduler's denser snapshots keep the scale
+    series.push(ts, df.set_index("player_id")["net_transfers_delta"])
+    features = series.features().set_index("player_id")
+
+    for col in ["net_transfers_window", "velocity"]:
+        df[col] = df["player_id"].map(features[col]).fillna(0)
+
+    return df
+
+
+@metrics.timed("compute_velocity")
 def main():
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
+    snapshots = snapshot_store.latest()
     if not snapshots:
         print("ℹ️ No snapshots found")
         return
 
-    path = snapshots[-1]
-    df = pd.read_csv(path)
+    ts = snapshots[-1]
+    series = timeseries.load_series()
+    df = add_velocity(
+        snapshot_store.read_snapshot(ts, ["player_id", "net_transfers_delta"]),
+        ts,
+        series,
+    )
 
-    if "net_transfers_delta" not in df.columns:
-        print("⚠️ net_transfers_delta missing")
+    if df is None:
         return
 
-    df["velocity"] = df["net_transfers_delta"].rolling(
-        window=3, min_periods=1
-    ).mean()
-
-    df.to_csv(path, index=False)
+    metrics.rows(len(df), len(df))
+    series.save()
+    snapshot_store.update_snapshot(
+        ts, df[["player_id", "net_transfers_window", "velocity"]]
+    )
 
     print("✅ Velocity added to snapshot")
 
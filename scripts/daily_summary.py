@@ -1,73 +1,35 @@
-from pathlib import Path
-import pandas as pd
-import requests
 from datetime import date
-import os
 
-# =====================
-# Paths
-# =====================
-HISTORY_PATH = Path("data/predictions_history.csv")
-SNAPSHOT_PATH = Path("data/bootstrap_static.csv")  # latest snapshot
+import history_store
+import players
+import telegram_queue
 
 # =====================
 # Telegram
 # =====================
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
 def send_telegram(message: str):
-    if not BOT_TOKEN or not CHAT_ID:
-        print("⚠️ Telegram credentials missing")
-        return
-
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown",
-        "disable_web_page_preview": True,
-    }
-
-    try:
-        r = requests.post(url, json=payload, timeout=10)
-        if r.status_code != 200:
-            print("⚠️ Telegram send failed:", r.text)
-    except Exception as e:
-        print(f"⚠️ Telegram error: {e}")
+    telegram_queue.send(message, disable_web_page_preview=True)
 
 # =====================
 # Main
 # =====================
 def main():
-    if not HISTORY_PATH.exists():
-        print("⚠️ predictions_history.csv missing")
+    index = players.load()
+    if len(index) == 0:
+        print("⚠️ No player table yet")
         return
 
-    if not SNAPSHOT_PATH.exists():
-        print("⚠️ bootstrap_static.csv missing")
-        return
+    today = date.today().isoformat()
 
-    df = pd.read_csv(HISTORY_PATH)
+    # Only today's partition is needed
+    df = history_store.read_partition(today)
     if df.empty:
-        print("⚠️ predictions_history.csv empty")
+        print("⚠️ No prediction history for today")
         return
 
-    snapshot = pd.read_csv(SNAPSHOT_PATH)
-
-    # ---------------------
-    # Build VALID player universe (TODAY)
-    # ---------------------
-    valid_players = snapshot[
-        (snapshot["status"] == "a") &              # available
-        (snapshot["selected_by_percent"].astype(float) > 0)
-    ][["id", "web_name"]].rename(columns={"id": "player_id"})
-
     # ---------------------
     # Today only, imminent only
     # ---------------------
-    today = date.today().isoformat()
-
     today_preds = df[
         (df["date"] == today) &
         (df["alert_level"] == "imminent") &
@@ -81,11 +43,7 @@ def main():
     # ---------------------
     # Re-validate against TODAY snapshot
     # ---------------------
-    today_preds = today_preds.merge(
-        valid_players,
-        on="player_id",
-        how="inner"
-    )
+    today_preds = today_preds[today_preds["player_id"].isin(index.available())]
 
     if today_preds.empty:
         print("ℹ️ No valid FPL players after snapshot filtering")
@@ -120,7 +78,7 @@ def main():
     for _, row in today_preds.iterrows():
         arrow = "⬆️" if row["direction"] == "rise" else "⬇️"
         lines.append(
-            f"{arrow} *{row['web_name']}* — {row['confidence']:.2f}"
+            f"{arrow} *{index.web_name(row['player_id'])}* — {row['confidence']:.2f}"
         )
 
     message = "\n".join(lines)
@@ -0,0 +1,203 @@
+from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =====================
+# Endpoint
+# =====================
+# Overridable so the fetcher can be pointed at a local stub or mirror
+BASE_URL = os.environ.get(
+    "FPL_BASE_URL", "https://fantasy.premierleague.com/api/"
+)
+BOOTSTRAP = "bootstrap-static/"
+
+TIMEOUT = 30
+
+# =====================
+# Retries: 4 attempts, 1s / 2s / 4s apart, honouring Retry-After
+# =====================
+RETRIES = 3
+BACKOFF = 1.0
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# =====================
+# Raw payload cache
+# =====================
+# Payloads are gitignored and only state.json is committed, so a fresh
+# checkout's first 304 finds no payload and fetches it again in full
+CACHE_DIR = Path("data/cache")
+STATE_PATH = CACHE_DIR / "state.json"
+KEEP_PAYLOADS = 8
+
+_session = None
+
+
+@dataclass
+class Payload:
+    data: dict
+    content_hash: str
+    changed: bool
+    # Validators to persist once the payload has been processed
+    state: dict = field(default_factory=dict)
+
+
+# =====================
+# Session
+# =====================
+def session() -> requests.Session:
+    """Process-wide session: pooled keep-alive connections plus retries."""
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=RETRIES,
+            backoff_factor=BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+
+        _session = requests.Session()
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session.headers["Accept-Encoding"] = "gzip"
+    return _session
+
+
+# =====================
+# Cache
+# =====================
+def payload_path(content_hash: str) -> Path:
+    return CACHE_DIR / f"{content_hash}.json.gz"
+
+
+def load_state() -> dict:
+    if not STATE_PATH.exists():
+        return {}
+    return json.loads(STATE_PATH.read_text())
+
+
+def load_cached(content_hash: str) -> dict:
+    with gzip.open(payload_path(content_hash), "rb") as f:
+        return json.loads(f.read())
+
+
+def store_raw(content: bytes, content_hash: str):
+    path = payload_path(content_hash)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wb") as f:
+        f.write(content)
+    tmp.replace(path)
+
+
+def prune(keep: int = KEEP_PAYLOADS) -> int:
+    """Drop all but the newest cached payloads (and never the current one)."""
+    current = {s.get("content_hash") for s in load_state().values()}
+    paths = sorted(
+        CACHE_DIR.glob("*.json.gz"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    removed = 0
+    for path in paths[keep:]:
+        if path.name.split(".")[0] not in current:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+# =====================
+# Fetch
+# =====================
+def fetch(endpoint: str = BOOTSTRAP) -> Payload:
+    """Conditional GET of an FPL endpoint.
+
+    Sends the stored ETag / Last-Modified; a 304, or a 200 whose body
+    hashes to the last processed payload, comes back with changed=False
+    and the cached data.
+    """
+    known = load_state().get(endpoint, {})
+
+    headers = {}
+    if known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+    if known.get("last_modified"):
+        headers["If-Modified-Since"] = known["last_modified"]
+
+    url = BASE_URL + endpoint
+    r = session().get(url, headers=headers, timeout=TIMEOUT)
+
+    if r.status_code == 304:
+        cached = known.get("content_hash")
+        if cached and payload_path(cached).exists():
+            return Payload(load_cached(cached), cached, False, known)
+        # Cache was pruned or lost: ask again without validators
+        r = session().get(url, timeout=TIMEOUT)
+
+    r.raise_for_status()
+
+    content_hash = hashlib.sha1(r.content).hexdigest()
+    state = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "content_hash": content_hash,
+        "fetched_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+    store_raw(r.content, content_hash)
+    changed = content_hash != known.get("content_hash")
+    return Payload(json.loads(r.content), content_hash, changed, state)
+
+
+def commit(payload: Payload, endpoint: str = BOOTSTRAP):
+    """Remember a payload as processed; call once downstream has succeeded."""
+    state = load_state()
+    state[endpoint] = payload.state
+
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(STATE_PATH)
+
+    prune()
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+
+    if cmd == "info":
+        for endpoint, state in load_state().items():
+            print(f"🌐 {endpoint}: {state['content_hash']} ({state['fetched_at']})")
+            print(f"   etag={state.get('etag')} last_modified={state.get('last_modified')}")
+
+    elif cmd == "fetch":
+        payload = fetch()
+        status = "changed" if payload.changed else "unchanged"
+        print(f"🌐 bootstrap-static {status}: {payload.content_hash}")
+
+    elif cmd == "prune":
+        print(f"🧹 Removed {prune()} cached payloads")
+
+    else:
+        print("Usage: fpl_fetch.py [info | fetch | prune]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from pathlib import Path
+from datetime import date, timedelta
+import sys
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import schema
+
+# =====================
+# Paths
+# =====================
+DATA_DIR = Path("data")
+HISTORY_DIR = DATA_DIR / "store" / "predictions"
+LEGACY_PATH = DATA_DIR / "predictions_history.csv"
+EXPORT_PATH = DATA_DIR / "exports" / "predictions_history.csv"
+
+PARTITION_FILE = "predictions.parquet"
+
+
+# =====================
+# Helpers
+# =====================
+def partition_path(day: str) -> Path:
+    return HISTORY_DIR / f"date={day}" / PARTITION_FILE
+
+
+def as_day(value) -> str:
+    if isinstance(value, date):
+        return value.isoformat()
+    return pd.to_datetime(value).date().isoformat()
+
+
+def read_partition(day: str, columns=None) -> pd.DataFrame:
+    path = partition_path(as_day(day))
+    if not path.exists():
+        return pd.DataFrame(columns=columns)
+
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+
+    return schema.enforce(
+        pd.read_parquet(path, columns=columns), schema.PREDICTION_DTYPES
+    )
+
+
+# =====================
+# Store API
+# =====================
+def list_dates() -> list:
+    return sorted(
+        path.parent.name.replace("date=", "")
+        for path in HISTORY_DIR.glob(f"date=*/{PARTITION_FILE}")
+    )
+
+
+def write_partition(df: pd.DataFrame, day) -> Path:
+    """Write one day of predictions, replacing any earlier run for that day."""
+    day = as_day(day)
+    path = partition_path(day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = schema.enforce(df, schema.PREDICTION_DTYPES)
+    df["date"] = day
+
+    tmp = path.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return path
+
+
+def read_days(days, columns=None) -> pd.DataFrame:
+    frames = [read_partition(d, columns) for d in days]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    # Same dtypes in every frame, so categoricals survive the concat
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_since(start, columns=None) -> pd.DataFrame:
+    start = as_day(start)
+    return read_days([d for d in list_dates() if d >= start], columns)
+
+
+def read_last_days(n: int, today=None, columns=None) -> pd.DataFrame:
+    """Partitions dated within the last n days up to and including today."""
+    today = pd.to_datetime(today or date.today()).date()
+    return read_since(today - timedelta(days=n), columns)
+
+
+def read_all(columns=None) -> pd.DataFrame:
+    return read_days(list_dates(), columns)
+
+
+# =====================
+# Legacy CSV migration / export
+# =====================
+def migrate_legacy() -> int:
+    if not LEGACY_PATH.exists():
+        return 0
+
+    if LEGACY_PATH.stat().st_size > 0:
+        legacy = pd.read_csv(LEGACY_PATH)
+        legacy = legacy.drop_duplicates(subset=["date", "player_id"], keep="last")
+        for day, part in legacy.groupby("date", sort=True):
+            write_partition(part, day)
+        migrated = legacy["date"].nunique()
+    else:
+        migrated = 0
+
+    LEGACY_PATH.unlink()
+    return migrated
+
+
+def export_csv(out: Path = EXPORT_PATH) -> Path:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    read_all().to_csv(out, index=False)
+    return out
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if cmd == "migrate":
+        n = migrate_legacy()
+        print(f"📦 Migrated {n} days of prediction history into {HISTORY_DIR}")
+
+    elif cmd == "export":
+        print(f"📝 Exported {export_csv()}")
+
+    elif cmd == "list":
+        for day in list_dates():
+            print(day)
+
+    else:
+        print("Usage: history_store.py [list | migrate | export]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
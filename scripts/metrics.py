@@ -0,0 +1,258 @@
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+import argparse
+import functools
+import json
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+# =====================
+# Paths
+# =====================
+DATA_DIR = Path("data")
+RUN_LOG_PATH = DATA_DIR / "run_log.jsonl"
+
+# One id per process; the scheduled workflow's run id when there is one
+RUN_ID = os.environ.get("GITHUB_RUN_ID") or datetime.utcnow().strftime(
+    "%Y%m%dT%H%M%S"
+)
+
+PERCENTILES = [0.5, 0.9, 0.99]
+SUMMARY_COLUMNS = ["wall_s", "cpu_s", "peak_rss_mb"]
+
+# Records currently being measured (stages can nest: a pipeline stage
+# calling a script's main()), and the last one finished
+_active = []
+last = None
+
+
+# =====================
+# Process counters
+# =====================
+def reset_peak_rss():
+    # Linux: writing 5 resets VmHWM so each stage gets its own peak
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def io_bytes():
+    """(read, written) bytes for this process so far, or (None, None)."""
+    try:
+        counters = dict(
+            line.split(": ")
+            for line in Path("/proc/self/io").read_text().splitlines()
+        )
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+# =====================
+# File tracking
+# =====================
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+
+
+def _audit(event, args):
+    if event != "open" or not _active:
+        return
+
+    path, mode, flags = args
+    if not isinstance(path, (str, Path)):
+        return
+
+    path = os.path.abspath(path)
+    if not path.startswith(_active[-1]["_data_dir"]):
+        return
+
+    if mode is not None:
+        writing = any(c in mode for c in "wax+")
+    else:
+        writing = bool(flags & WRITE_FLAGS)
+
+    for record in _active:
+        record["_written" if writing else "_read"].add(path)
+
+
+sys.addaudithook(_audit)
+
+
+# =====================
+# Measuring a stage
+# =====================
+@contextmanager
+def track(stage: str, log: bool = True):
+    """Measure the enclosed block and append one record to the run log.
+
+    The yielded dict can be given rows_in / rows_out by the caller.
+    """
+    global last
+
+    record = {
+        "run_id": RUN_ID,
+        "stage": stage,
+        "started": datetime.utcnow().isoformat(timespec="seconds"),
+        "rows_in": None,
+        "rows_out": None,
+        "status": "ok",
+        "_data_dir": os.path.abspath(DATA_DIR),
+        "_read": set(),
+        "_written": set(),
+    }
+
+    # Nested stages share the outer peak rather than resetting it
+    if not _active:
+        reset_peak_rss()
+    _active.append(record)
+
+    read0, written0 = io_bytes()
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = "exit" if isinstance(e, SystemExit) else "error"
+        raise
+    finally:
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        read1, written1 = io_bytes()
+        _active.remove(record)
+
+        files_read = record.pop("_read")
+        files_written = record.pop("_written")
+        record.pop("_data_dir")
+
+        record.update({
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "bytes_read": None if read0 is None else read1 - read0,
+            "bytes_written": None if written0 is None else written1 - written0,
+            "files_read": len(files_read),
+            "files_written": len(files_written),
+            "files_touched": len(files_read | files_written),
+        })
+
+        last = record
+        if log:
+            append(record)
+
+
+def rows(rows_in=None, rows_out=None):
+    """Set row counts on the innermost stage being tracked."""
+    if not _active:
+        return
+    if rows_in is not None:
+        _active[-1]["rows_in"] = int(rows_in)
+    if rows_out is not None:
+        _active[-1]["rows_out"] = int(rows_out)
+
+
+def note(**fields):
+    """Attach extra fields to the innermost stage's record."""
+    if _active:
+        _active[-1].update(fields)
+
+
+def count_rows(values) -> int:
+    """Total rows across the DataFrames among values."""
+    return sum(len(v) for v in values if isinstance(v, pd.DataFrame))
+
+
+def timed(stage: str):
+    """Decorator form of track() for a script's main()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# =====================
+# Run log
+# =====================
+def append(record: dict):
+    RUN_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(RUN_LOG_PATH, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_log(runs: int = None) -> pd.DataFrame:
+    if not RUN_LOG_PATH.exists() or RUN_LOG_PATH.stat().st_size == 0:
+        return pd.DataFrame()
+
+    log = pd.read_json(RUN_LOG_PATH, lines=True, dtype={"run_id": str})
+    if runs is not None:
+        keep = log["run_id"].drop_duplicates().tail(runs)
+        log = log[log["run_id"].isin(keep)]
+    return log
+
+
+def summarize(log: pd.DataFrame) -> pd.DataFrame:
+    """Per-stage percentiles of time and memory, medians of volumes."""
+    grouped = log.groupby("stage", sort=False)
+
+    out = pd.DataFrame({"runs": grouped["run_id"].nunique()})
+    for column in SUMMARY_COLUMNS:
+        for q in PERCENTILES:
+            out[f"{column}_p{round(q * 100)}"] = grouped[column].quantile(q)
+
+    for column in ["rows_in", "rows_out", "bytes_read", "bytes_written",
+                   "files_touched"]:
+        out[f"{column}_p50"] = grouped[column].median()
+
+    return out.sort_values("wall_s_p50", ascending=False)
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline run metrics")
+    parser.add_argument("command", nargs="?", default="summary",
+                        choices=["summary", "tail"])
+    parser.add_argument("--runs", type=int, default=50,
+                        help="only the most recent N runs")
+    parser.add_argument("--stage", help="only this stage")
+    args = parser.parse_args()
+
+    log = load_log(args.runs)
+    if log.empty:
+        print(f"ℹ️ No metrics logged yet in {RUN_LOG_PATH}")
+        return
+
+    if args.stage:
+        log = log[log["stage"] == args.stage]
+
+    if args.command == "tail":
+        print(log.tail(20).to_string(index=False))
+        return
+
+    print(f"📊 {log['run_id'].nunique()} runs, {len(log)} stage records")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summarize(log).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from datetime import datetime
+import sys
+
+import pandas as pd
+
+import snapshot
+import snapshot_store
+import record_price_changes
+import price_ledger
+import tune_threshold
+import update_protection
+import compute_deltas
+import compute_velocity
+import compute_trends
+import compute_prediction
+import threshold_resolver
+import history_store
+import rolling_state
+import players
+import schema
+import timeseries
+import fpl_fetch
+import metrics
+
+# =====================
+# Paths
+# =====================
+LATEST_PATH = snapshot.LATEST_PATH
+PRICE_CHANGES_PATH = record_price_changes.OUT_PATH
+PROTECTION_PATH = update_protection.PROTECTION_PATH
+PREDICTIONS_PATH = compute_prediction.OUT_PATH
+
+# Run downstream stages even when the FPL payload has not changed
+FORCE = False
+
+
+# =====================
+# Stage declaration
+# =====================
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    inputs: tuple
+    outputs: tuple
+    run: Callable
+
+
+class Halt(Exception):
+    """Raised by a stage when there is nothing new for later stages."""
+
+
+def today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+def safe_read_csv(path: Path) -> pd.DataFrame:
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame()
+    return pd.read_csv(path)
+
+
+# =====================
+# Stage adapters
+# =====================
+# Each adapter receives its declared inputs as keyword arguments and
+# returns a dict of its declared outputs, or None when there is nothing
+# to hand downstream.
+def run_snapshot():
+    try:
+        payload = snapshot.fetch_bootstrap()
+    except Exception as e:
+        print(f"❌ FPL fetch failed: {e}")
+        sys.exit(1)
+
+    if not payload.changed and not FORCE:
+        raise Halt(f"bootstrap-static unchanged ({payload.content_hash[:10]})")
+
+    now = datetime.utcnow()
+    df = snapshot_store.enforce_dtypes(
+        snapshot.build_snapshot(payload.data, now.date().isoformat())
+    )
+
+    print(f"📸 Snapshot taken ({len(df)} players)")
+    return {
+        "snapshot": df,
+        "latest": df,
+        "players": players.build(df),
+        "snapshot_ts": now,
+        "payload": payload,
+    }
+
+
+def run_record_price_changes(snapshot, snapshot_ts, price_changes, last_prices):
+    entries, out, last = record_price_changes.record_changes(
+        snapshot, last_prices, snapshot_ts
+    )
+
+    outputs = {"ledger_entries": entries, "last_prices": last}
+
+    if out.empty:
+        print("ℹ️ No price changes detected")
+        return outputs
+
+    print(f"💾 Recorded {len(out)} real price changes")
+    outputs["new_price_changes"] = out
+    # price_changes stays in memory only; the file is appended to
+    outputs["price_changes"] = pd.concat([price_changes, out], ignore_index=True)
+    return outputs
+
+
+def run_tune_threshold(predictions_history, price_changes):
+    thresholds = tune_threshold.tune_thresholds(predictions_history, price_changes)
+    if thresholds is None:
+        return None
+    return {"thresholds": thresholds}
+
+
+def run_update_protection(previous_snapshot, snapshot, snapshot_ts, protection):
+    prot = update_protection.update_protection(
+        previous_snapshot, snapshot, snapshot_ts.date(), protection
+    )
+    return {"protection": prot}
+
+
+def run_compute_deltas(snapshot, previous_snapshot, protection, snapshot_ts):
+    merged = compute_deltas.compute_deltas(
+        snapshot, previous_snapshot, protection, snapshot_ts.date()
+    )
+    if merged is None:
+        return None
+    print("✅ Deltas computed with full protection enforcement")
+    return {"snapshot": merged}
+
+
+def run_compute_velocity(snapshot, snapshot_ts, transfer_series):
+    df = compute_velocity.add_velocity(
+        snapshot.copy(), snapshot_ts, transfer_series
+    )
+    if df is None:
+        return None
+    return {"snapshot": df, "transfer_series": transfer_series}
+
+
+def run_compute_trends(snapshot, snapshot_ts, transfer_series):
+    df = compute_trends.add_trend(snapshot.copy(), snapshot_ts, transfer_series)
+    if df is None:
+        return None
+    return {"snapshot": df, "transfer_series": transfer_series}
+
+
+def run_compute_prediction(snapshot, rolling_state, price_changes, protection,
+                           thresholds):
+    predictions = compute_prediction.predict(
+        snapshot,
+        rolling_state,
+        price_changes,
+        protection,
+        today(),
+        thresholds,
+    )
+    if predictions is None:
+        return None
+
+    # Saved after the partition, which it then records as in step
+    rolling_state.push(today(), predictions.set_index("player_id")["raw_score"])
+
+    return {
+        "predictions": predictions,
+        "history_partition": predictions,
+        "rolling_state": rolling_state,
+    }
+
+
+STAGES = [
+    Stage(
+        "snapshot",
+        inputs=(),
+        outputs=("snapshot", "latest", "players", "snapshot_ts", "payload"),
+        run=run_snapshot,
+    ),
+    Stage(
+        "record_price_changes",
+        inputs=("snapshot", "snapshot_ts", "price_changes", "last_prices"),
+        outputs=(
+            "price_changes",
+            "new_price_changes",
+            "ledger_entries",
+            "last_prices",
+        ),
+        run=run_record_price_changes,
+    ),
+    Stage(
+        "tune_threshold",
+        inputs=("predictions_history", "price_changes"),
+        outputs=("thresholds",),
+        run=run_tune_threshold,
+    ),
+    Stage(
+        "update_protection",
+        inputs=("previous_snapshot", "snapshot", "snapshot_ts", "protection"),
+        outputs=("protection",),
+        run=run_update_protection,
+    ),
+    Stage(
+        "compute_deltas",
+        inputs=("snapshot", "previous_snapshot", "protection", "snapshot_ts"),
+        outputs=("snapshot",),
+        run=run_compute_deltas,
+    ),
+    Stage(
+        "compute_velocity",
+        inputs=("snapshot", "snapshot_ts", "transfer_series"),
+        outputs=("snapshot", "transfer_series"),
+        run=run_compute_velocity,
+    ),
+    Stage(
+        "compute_trends",
+        inputs=("snapshot", "snapshot_ts", "transfer_series"),
+        outputs=("snapshot", "transfer_series"),
+        run=run_compute_trends,
+    ),
+    Stage(
+        "compute_prediction",
+        inputs=(
+            "snapshot",
+            "rolling_state",
+            "price_changes",
+            "protection",
+            "thresholds",
+        ),
+        outputs=("predictions", "history_partition", "rolling_state"),
+        run=run_compute_prediction,
+    ),
+]
+
+
+# =====================
+# Loaders (inputs not produced in this run)
+# =====================
+def load_previous_snapshot(artifacts):
+    stamps = snapshot_store.latest()
+    if not stamps:
+        return None
+    return snapshot_store.read_snapshot(
+        stamps[0], compute_deltas.DELTA_INPUT_COLUMNS
+    )
+
+
+LOADERS = {
+    "previous_snapshot": load_previous_snapshot,
+    "price_changes": lambda artifacts: schema.enforce(
+        safe_read_csv(PRICE_CHANGES_PATH), schema.PRICE_CHANGE_DTYPES
+    ),
+    "predictions_history": lambda artifacts: history_store.read_all(
+        tune_threshold.HISTORY_COLUMNS
+    ),
+    "rolling_state": lambda artifacts: rolling_state.load(
+        compute_prediction.resolve_params()
+    ),
+    "protection": lambda artifacts: compute_deltas.load_protection(),
+    # Freshly tuned thresholds win; otherwise the file ({} if none yet)
+    "thresholds": lambda artifacts: threshold_resolver.load(),
+    "transfer_series": lambda artifacts: timeseries.load_series(),
+    "last_prices": lambda artifacts: price_ledger.load_last_prices(),
+}
+
+
+# =====================
+# Writers (run once, at the end)
+# =====================
+def write_csv(path: Path):
+    def write(df, artifacts):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False)
+        return path
+    return write
+
+
+def write_snapshot(df, artifacts):
+    return snapshot_store.write_snapshot(df, artifacts["snapshot_ts"])
+
+
+def write_players(df, artifacts):
+    return players.save(df)
+
+
+def write_transfer_series(series, artifacts):
+    series.save()
+    return timeseries.MATRIX_PATH
+
+
+def write_new_price_changes(out, artifacts):
+    record_price_changes.append_price_changes(out)
+    return PRICE_CHANGES_PATH
+
+
+def write_ledger_entries(entries, artifacts):
+    price_ledger.append_entries(entries)
+    return price_ledger.LEDGER_PATH
+
+
+def write_last_prices(last, artifacts):
+    price_ledger.save_last_prices(last)
+    return price_ledger.LAST_PRICES_PATH
+
+
+def write_history_partition(predictions, artifacts):
+    return history_store.write_partition(predictions, today())
+
+
+def write_rolling_state(state, artifacts):
+    return state.save(history_store.partition_path(today()))
+
+
+def write_thresholds(thresholds, artifacts):
+    tune_threshold.save_thresholds(thresholds)
+    return tune_threshold.THRESHOLD_PATH
+
+
+def write_payload(payload, artifacts):
+    fpl_fetch.commit(payload)
+    return fpl_fetch.STATE_PATH
+
+
+WRITERS = {
+    "snapshot": write_snapshot,
+    "latest": write_csv(LATEST_PATH),
+    "players": write_players,
+    "new_price_changes": write_new_price_changes,
+    "ledger_entries": write_ledger_entries,
+    "last_prices": write_last_prices,
+    "thresholds": write_thresholds,
+    "transfer_series": write_transfer_series,
+    "protection": write_csv(PROTECTION_PATH),
+    "predictions": write_csv(PREDICTIONS_PATH),
+    "history_partition": write_history_partition,
+    "rolling_state": write_rolling_state,
+    # Last, so a failed run is retried on the same payload
+    "payload": write_payload,
+}
+
+
+# =====================
+# Runner
+# =====================
+def resolve(name: str, artifacts: dict) -> bool:
+    if name in artifacts:
+        return True
+    if name not in LOADERS:
+        return False
+
+    value = LOADERS[name](artifacts)
+    if value is None:
+        return False
+
+    artifacts[name] = value
+    return True
+
+
+def run(stages=STAGES) -> dict:
+    artifacts = {}
+    produced = set()
+
+    for stage in stages:
+        # Loading a stage's inputs is charged to that stage
+        with metrics.track(stage.name) as record:
+            missing = [name for name in stage.inputs if not resolve(name, artifacts)]
+            if missing:
+                print(f"⏭️ {stage.name}: skipped (missing {', '.join(missing)})")
+                record["status"] = "skipped"
+                continue
+
+            inputs = {name: artifacts[name] for name in stage.inputs}
+            try:
+                outputs = stage.run(**inputs)
+            except Halt as e:
+                print(f"⏸️ {stage.name}: {e}; nothing to do")
+                record["status"] = "halted"
+                break
+
+            metrics.rows(
+                metrics.count_rows(inputs.values()),
+                metrics.count_rows((outputs or {}).values()),
+            )
+
+        if not outputs:
+            continue
+
+        unexpected = set(outputs) - set(stage.outputs)
+        if unexpected:
+            raise RuntimeError(
+                f"❌ Stage {stage.name} produced undeclared outputs: {unexpected}"
+            )
+
+        artifacts.update(outputs)
+        produced.update(outputs)
+
+    written = []
+    with metrics.track("write"):
+        for name, write in WRITERS.items():
+            if name in produced:
+                written.append(write(artifacts[name], artifacts))
+        metrics.rows(rows_in=metrics.count_rows(
+            artifacts[name] for name in WRITERS if name in produced
+        ))
+
+    print(f"💾 Pipeline wrote {len(written)} artifacts")
+    for path in written:
+        print(f"   • {path}")
+
+    return artifacts
+
+
+def main():
+    global FORCE
+    FORCE = "--force" in sys.argv
+    run()
+
+
+if __name__ == "__main__":
+    main()
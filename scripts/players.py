@@ -0,0 +1,188 @@
+from pathlib import Path
+import difflib
+import re
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import snapshot_store
+import schema
+
+# =====================
+# Paths
+# =====================
+PLAYERS_PATH = snapshot_store.DATA_DIR / "store" / "players.parquet"
+
+# difflib ratio a misspelt name must reach to count as a match
+FUZZY_CUTOFF = 0.8
+FUZZY_MATCHES = 3
+
+COLUMNS = ["player_id", "web_name", "name", "team", "status", "ownership"]
+
+# Letters NFKD leaves whole
+TRANSLITERATE = str.maketrans({
+    "ø": "o", "đ": "d", "ł": "l", "ı": "i", "ß": "ss", "æ": "ae", "œ": "oe", "þ": "th",
+})
+
+# (mtime_ns, PlayerIndex), so long-running callers only rebuild the
+# index after the pipeline rewrites the table
+_cache = None
+
+
+# =====================
+# Name keys
+# =====================
+def fold(text) -> str:
+    """Lowercase, accent-free, punctuation-free form of a name:
+    "Mané" → "mane", "M.Salah" → "m salah"."""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text.translate(TRANSLITERATE)).split())
+
+
+# =====================
+# Dimension table
+# =====================
+def build(snapshot: pd.DataFrame) -> pd.DataFrame:
+    """One row per player from a snapshot, with folded name keys."""
+    df = snapshot[COLUMNS].drop_duplicates("player_id", keep="last")
+    df = df.assign(
+        key=df["web_name"].map(fold),
+        full_key=df["name"].map(fold),
+    )
+    return schema.enforce(
+        df.sort_values("player_id").reset_index(drop=True), schema.PLAYER_DTYPES
+    )
+
+
+def save(players: pd.DataFrame) -> Path:
+    PLAYERS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PLAYERS_PATH.with_suffix(".tmp")
+    players.to_parquet(tmp, index=False)
+    tmp.replace(PLAYERS_PATH)
+    return PLAYERS_PATH
+
+
+def from_latest_snapshot() -> pd.DataFrame:
+    stamps = snapshot_store.latest()
+    if not stamps:
+        return pd.DataFrame(columns=COLUMNS + ["key", "full_key"])
+    return build(snapshot_store.read_snapshot(stamps[0], COLUMNS))
+
+
+# =====================
+# Lookup index
+# =====================
+class PlayerIndex:
+    """Name → player_id lookups over the dimension table.
+
+    names maps each folded web_name and full name to its players,
+    tokens each word of them ("salah", "mane"); both are built once,
+    so a lookup is a dict hit and only a miss falls back to difflib.
+    Candidates come back most-owned first.
+    """
+
+    def __init__(self, players: pd.DataFrame):
+        self.players = players.set_index("player_id", drop=False)
+        by_ownership = players.sort_values(
+            ["ownership", "player_id"], ascending=[False, True]
+        )
+
+        self.names = {}
+        self.tokens = {}
+        for pid, key, full_key in zip(
+            by_ownership["player_id"].tolist(),
+            by_ownership["key"].tolist(),
+            by_ownership["full_key"].tolist(),
+        ):
+            for name in dict.fromkeys([key, full_key]):
+                self.names.setdefault(name, []).append(pid)
+                for token in name.split():
+                    if len(token) > 1:
+                        ids = self.tokens.setdefault(token, [])
+                        if pid not in ids:
+                            ids.append(pid)
+
+        self._keys = list(self.names) + list(self.tokens)
+
+    def __len__(self):
+        return len(self.players)
+
+    def lookup(self, query: str) -> list:
+        """Every player the query could mean, best match first."""
+        q = fold(query)
+        if not q:
+            return []
+        if q in self.names:
+            return list(self.names[q])
+        if q in self.tokens:
+            return list(self.tokens[q])
+
+        out = []
+        for key in difflib.get_close_matches(q, self._keys, FUZZY_MATCHES, FUZZY_CUTOFF):
+            for pid in self.names.get(key) or self.tokens[key]:
+                if pid not in out:
+                    out.append(pid)
+        return out
+
+    def resolve(self, query: str):
+        """The player_id the query most likely means, or None."""
+        ids = self.lookup(query)
+        return ids[0] if ids else None
+
+    def web_name(self, player_id: int) -> str:
+        if player_id in self.players.index:
+            return str(self.players.at[player_id, "web_name"])
+        return str(player_id)
+
+    def available(self) -> np.ndarray:
+        """player_ids fit to alert on: available and owned by someone."""
+        p = self.players
+        return p.loc[(p["status"] == "a") & (p["ownership"] > 0), "player_id"].to_numpy()
+
+
+def load() -> PlayerIndex:
+    """Index over the saved dimension table, or the newest stored
+    snapshot when the pipeline has not written one yet."""
+    global _cache
+
+    try:
+        mtime = PLAYERS_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return PlayerIndex(from_latest_snapshot())
+
+    if _cache is None or _cache[0] != mtime:
+        players = schema.enforce(pd.read_parquet(PLAYERS_PATH), schema.PLAYER_DTYPES)
+        _cache = (mtime, PlayerIndex(players))
+    return _cache[1]
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "build":
+        players = from_latest_snapshot()
+        if players.empty:
+            print("ℹ️ No stored snapshot to build the player table from")
+            return
+        print(f"👥 {len(players)} players → {save(players)}")
+        return
+
+    if command == "find" and len(sys.argv) > 2:
+        index = load()
+        for query in sys.argv[2:]:
+            ids = index.lookup(query)
+            names = ", ".join(f"{index.web_name(i)} ({i})" for i in ids) or "no match"
+            print(f"🔎 {query}: {names}")
+        return
+
+    print("Usage: players.py build | find <name> [<name> ...]")
+
+
+if __name__ == "__main__":
+    main()
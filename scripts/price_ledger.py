@@ -0,0 +1,179 @@
+from datetime import datetime
+import sys
+
+import numpy as np
+import pandas as pd
+
+import snapshot_store
+
+# =====================
+# Paths
+# =====================
+STORE_DIR = snapshot_store.DATA_DIR / "store"
+LEDGER_PATH = STORE_DIR / "price_ledger.csv"
+LAST_PRICES_PATH = STORE_DIR / "last_prices.parquet"
+
+LEDGER_COLUMNS = [
+    "player_id",
+    "timestamp",
+    "price",
+    "previous_price",
+    "change",
+]
+
+PRICE_COLUMNS = ["player_id", "price"]
+
+
+# =====================
+# Detection
+# =====================
+def detect_changes(curr: pd.DataFrame, last: pd.DataFrame, ts: datetime):
+    """Diff current prices against each player's last known price.
+
+    Returns (ledger_entries, last_prices). Entries hold only the points
+    where a price moved, plus a "listed" entry the first time a player
+    is seen, so the ledger is an exact per-player price history.
+    """
+    curr = snapshot_store.enforce_dtypes(curr[PRICE_COLUMNS])
+
+    merged = curr.merge(
+        last[PRICE_COLUMNS].rename(columns={"price": "previous_price"}),
+        on="player_id",
+        how="left",
+    )
+
+    price = merged["price"].to_numpy()
+    previous = merged["previous_price"].to_numpy()
+
+    listed = np.isnan(previous)
+    moved = ~listed & (price != previous)
+
+    entries = merged[listed | moved].copy()
+    entries["change"] = np.where(
+        listed[listed | moved],
+        "listed",
+        np.where(price[listed | moved] > previous[listed | moved], "rise", "fall"),
+    )
+    entries["timestamp"] = ts.isoformat(timespec="seconds")
+
+    # Only players whose price moved (or who are new) touch the state
+    last = pd.concat(
+        [
+            last[~last["player_id"].isin(entries["player_id"])],
+            entries[["player_id", "price", "timestamp"]],
+        ],
+        ignore_index=True,
+    )
+
+    return entries[LEDGER_COLUMNS], last
+
+
+def to_price_changes(entries: pd.DataFrame) -> pd.DataFrame:
+    moves = entries[entries["change"] != "listed"]
+    out = pd.DataFrame({
+        "player_id": moves["player_id"].to_numpy(),
+        "date": moves["timestamp"].str[:10].to_numpy(),
+        "actual_change": moves["change"].to_numpy(),
+    })
+    # One outcome per player per day, as price_changes.csv has always held
+    return out.drop_duplicates(["player_id", "date"], keep="last")
+
+
+# =====================
+# Persistence
+# =====================
+def empty_last_prices() -> pd.DataFrame:
+    return pd.DataFrame({
+        "player_id": pd.Series(dtype="int32"),
+        "price": pd.Series(dtype="float32"),
+        "timestamp": pd.Series(dtype="str"),
+    })
+
+
+def load_last_prices(before: datetime = None) -> pd.DataFrame:
+    """Last known price per player, rebuilt once from the store if absent.
+
+    `before` excludes the snapshot being processed from the rebuild so
+    its own changes are still reported by the caller.
+    """
+    if LAST_PRICES_PATH.exists():
+        return pd.read_parquet(LAST_PRICES_PATH)
+
+    stamps = snapshot_store.list_snapshots()
+    if before is not None:
+        stamps = [ts for ts in stamps if ts < before]
+
+    last = rebuild(stamps)
+    if not last.empty:
+        print(f"📒 Built price ledger for {len(last)} players")
+    return last
+
+
+def save_last_prices(last: pd.DataFrame):
+    LAST_PRICES_PATH.parent.mkdir(parents=True, exist_ok=True)
+    last.to_parquet(LAST_PRICES_PATH, index=False)
+
+
+def append_entries(entries: pd.DataFrame):
+    if entries.empty:
+        return
+    LEDGER_PATH.parent.mkdir(parents=True, exist_ok=True)
+    entries.to_csv(
+        LEDGER_PATH,
+        mode="a",
+        header=not LEDGER_PATH.exists(),
+        index=False,
+    )
+
+
+def load_ledger(player_id: int = None) -> pd.DataFrame:
+    if not LEDGER_PATH.exists():
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
+    ledger = pd.read_csv(LEDGER_PATH)
+    if player_id is not None:
+        ledger = ledger[ledger["player_id"] == player_id]
+    return ledger
+
+
+def rebuild(stamps=None) -> pd.DataFrame:
+    """Replay stored snapshots into a fresh ledger; returns last prices."""
+    if LEDGER_PATH.exists():
+        LEDGER_PATH.unlink()
+
+    last = empty_last_prices()
+    for ts in stamps if stamps is not None else snapshot_store.list_snapshots():
+        curr = snapshot_store.read_snapshot(ts, PRICE_COLUMNS)
+        if not set(PRICE_COLUMNS).issubset(curr.columns):
+            continue
+        entries, last = detect_changes(curr, last, ts)
+        append_entries(entries)
+
+    if not last.empty:
+        save_last_prices(last)
+    return last
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "show"
+
+    if cmd == "rebuild":
+        last = rebuild()
+        print(f"📒 Price ledger rebuilt for {len(last)} players")
+
+    elif cmd == "show":
+        player_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        ledger = load_ledger(player_id)
+        if player_id is None:
+            ledger = ledger[ledger["change"] != "listed"]
+        print(ledger.to_string(index=False))
+
+    else:
+        print("Usage: price_ledger.py [show [player_id] | rebuild]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import schema
+import players
+import history_store
+import compute_prediction
+import compute_accuracy
+import accuracy_cube
+
+# =====================
+# Paths
+# =====================
+PREDICTIONS_PATH = compute_prediction.OUT_PATH
+ACCURACY_PATH = compute_accuracy.OUT_PATH
+OUTCOMES_PATH = compute_accuracy.OUTCOMES_PATH
+CUBE_PATH = accuracy_cube.CUBE_PATH
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Files are stat'ed at most this often; between checks every request is
+# answered from memory
+RELOAD_INTERVAL = 1.0
+
+TOP_N = 10
+MAX_N = 200
+
+TIMELINE_COLUMNS = [
+    "date",
+    "player_id",
+    "direction",
+    "alert_level",
+    "confidence",
+    "raw_score",
+    "prediction_score",
+]
+
+ACCURACY_WINDOWS = [7, 30]
+
+
+# =====================
+# Helpers
+# =====================
+def mtime(path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def records(df: pd.DataFrame) -> list:
+    """JSON-ready rows: native types, NaN as None, floats rounded."""
+    return json.loads(df.to_json(orient="records", double_precision=4))
+
+
+class Source:
+    """One in-memory index over files on disk, rebuilt when their
+    fingerprint changes. The fingerprint is checked at most every
+    RELOAD_INTERVAL; while one thread rebuilds, the others keep
+    serving the previous version."""
+
+    def __init__(self, name: str, fingerprint, build):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.build = build
+        self.value = None
+        self.key = None
+        self.checked = 0.0
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self.value is not None and now - self.checked < RELOAD_INTERVAL:
+            return self.value
+
+        if not self.lock.acquire(blocking=self.value is None):
+            return self.value
+        try:
+            self.checked = now
+            key = self.fingerprint()
+            if self.value is None or key != self.key:
+                t0 = time.perf_counter()
+                self.value = self.build()
+                self.key = key
+                self.loaded_at = time.time()
+                print(f"🔄 {self.name} index built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+            return self.value
+        finally:
+            self.lock.release()
+
+
+# =====================
+# Indexes
+# =====================
+def build_today() -> dict:
+    """Latest predictions by player, and per direction by confidence."""
+    df = compute_prediction.safe_read_csv(PREDICTIONS_PATH)
+    if df.empty:
+        return {"date": None, "rows": [], "by_player": {}, "top": {}}
+
+    df = schema.enforce(df, schema.PREDICTION_DTYPES)
+    df = df.sort_values(["confidence", "player_id"], ascending=[False, True])
+    rows = records(df)
+
+    top = {}
+    for row in rows:
+        top.setdefault(row["direction"], []).append(row)
+
+    return {
+        "date": str(df["date"].max()),
+        "rows": rows,
+        "by_player": {row["player_id"]: row for row in rows},
+        "top": top,
+    }
+
+
+def build_timelines() -> dict:
+    """Every stored prediction, sorted by player then date, with where
+    each player's run starts: a timeline is one slice."""
+    df = history_store.read_all(TIMELINE_COLUMNS)
+    if df.empty:
+        return {"players": np.empty(0, dtype=np.int64), "offsets": np.zeros(1, dtype=np.int64), "rows": []}
+
+    df = df.sort_values(["player_id", "date"], kind="stable")
+    ids = df["player_id"].to_numpy(dtype=np.int64)
+    found, starts = np.unique(ids, return_index=True)
+    return {
+        "players": found,
+        "offsets": np.append(starts, len(ids)),
+        "rows": records(df.drop(columns="player_id")),
+    }
+
+
+def build_outcomes() -> dict:
+    """player_id → its recorded price moves, oldest first."""
+    df = compute_accuracy.load_outcomes()
+    if df.empty:
+        return {}
+
+    df = df[["date", "player_id", "actual_change"]].sort_values("date", kind="stable")
+    out = {}
+    for pid, day, change in zip(
+        df["player_id"].tolist(), df["date"].astype(str).tolist(),
+        df["actual_change"].astype(str).tolist(),
+    ):
+        out.setdefault(pid, []).append({"date": day, "change": change})
+    return out
+
+
+def build_accuracy() -> dict:
+    daily = compute_accuracy.safe_read_csv(ACCURACY_PATH)
+    summary = {}
+    if not daily.empty:
+        daily = daily.sort_values("date_pred")
+        for window in [*ACCURACY_WINDOWS, None]:
+            part = daily if window is None else daily.tail(window)
+            predicted, correct = int(part["predicted"].sum()), int(part["correct"].sum())
+            summary[f"last_{window}_days" if window else "all"] = {
+                "days": len(part),
+                "predicted": predicted,
+                "correct": correct,
+                "accuracy": round(correct / predicted, 4) if predicted else None,
+            }
+
+    cube = accuracy_cube.load_cube()
+    horizons = {}
+    if not cube.empty:
+        for window in [*ACCURACY_WINDOWS, None]:
+            key = f"last_{window}_days" if window else "all"
+            horizons[key] = records(accuracy_cube.rollup(cube, ["horizon"], days=window))
+
+    return {
+        "summary": summary,
+        "horizons": horizons,
+        "daily": records(daily) if not daily.empty else [],
+    }
+
+
+SOURCES = {
+    "players": Source("players", lambda: mtime(players.PLAYERS_PATH), players.load),
+    "today": Source("today", lambda: mtime(PREDICTIONS_PATH), build_today),
+    "timelines": Source(
+        "timelines",
+        lambda: (tuple(history_store.list_dates()),
+                 max((mtime(p) for p in history_store.HISTORY_DIR.glob("date=*/*")), default=0)),
+        build_timelines,
+    ),
+    "outcomes": Source("outcomes", lambda: mtime(OUTCOMES_PATH), build_outcomes),
+    "accuracy": Source(
+        "accuracy", lambda: (mtime(ACCURACY_PATH), mtime(CUBE_PATH)), build_accuracy
+    ),
+}
+
+
+# =====================
+# Queries
+# =====================
+class BadRequest(Exception):
+    pass
+
+
+class NotFound(Exception):
+    pass
+
+
+def arg(query: dict, name: str, default=None):
+    return query.get(name, [default])[0]
+
+
+def int_arg(query: dict, name: str, default: int, high: int = MAX_N) -> int:
+    try:
+        return max(0, min(int(arg(query, name, default)), high))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+def get_predictions(query: dict) -> dict:
+    today = SOURCES["today"].get()
+    rows = today["rows"]
+    for field in ("direction", "alert_level"):
+        value = arg(query, field)
+        if value:
+            rows = [r for r in rows if r[field] == value]
+    limit = int_arg(query, "limit", len(rows), high=len(rows))
+    return {"date": today["date"], "count": len(rows), "predictions": rows[:limit]}
+
+
+def get_top(query: dict) -> dict:
+    today = SOURCES["today"].get()
+    n = int_arg(query, "n", TOP_N)
+    directions = [arg(query, "direction")] if arg(query, "direction") else ["rise", "fall"]
+    return {
+        "date": today["date"],
+        **{d: today["top"].get(d, [])[:n] for d in directions},
+    }
+
+
+def get_player(player_id: int) -> dict:
+    index = SOURCES["players"].get()
+    if player_id not in index.players.index:
+        raise NotFound(f"no player {player_id}")
+
+    t = SOURCES["timelines"].get()
+    i = np.searchsorted(t["players"], player_id)
+    timeline = []
+    if i < len(t["players"]) and t["players"][i] == player_id:
+        timeline = t["rows"][t["offsets"][i]:t["offsets"][i + 1]]
+
+    info = index.players.loc[player_id]
+    return {
+        "player_id": player_id,
+        "web_name": str(info["web_name"]),
+        "name": str(info["name"]),
+        "team": str(info["team"]),
+        "status": str(info["status"]),
+        "ownership": round(float(info["ownership"]), 2),
+        "today": SOURCES["today"].get()["by_player"].get(player_id),
+        "timeline": timeline,
+        "price_changes": SOURCES["outcomes"].get().get(player_id, []),
+    }
+
+
+def find_players(query: dict) -> dict:
+    q = arg(query, "q")
+    if not q:
+        raise BadRequest("q is required")
+    index = SOURCES["players"].get()
+    return {"query": q, "players": [
+        {"player_id": int(pid), "web_name": index.web_name(pid)}
+        for pid in index.lookup(q)
+    ]}
+
+
+def get_accuracy(query: dict) -> dict:
+    acc = SOURCES["accuracy"].get()
+    days = int_arg(query, "days", len(acc["daily"]), high=len(acc["daily"]))
+    return {
+        "summary": acc["summary"],
+        "horizons": acc["horizons"],
+        "daily": acc["daily"][len(acc["daily"]) - days:],
+    }
+
+
+def get_health(query: dict) -> dict:
+    return {name: {
+        "loaded_at": s.loaded_at,
+        "fingerprint": str(s.key) if s.key is not None else None,
+    } for name, s in SOURCES.items()}
+
+
+ROUTES = {
+    "/predictions": get_predictions,
+    "/top": get_top,
+    "/players": find_players,
+    "/accuracy": get_accuracy,
+    "/health": get_health,
+}
+
+
+def route(path: str, query: dict) -> dict:
+    if path.startswith("/players/"):
+        try:
+            return get_player(int(path[len("/players/"):]))
+        except ValueError:
+            raise BadRequest("player id must be an integer")
+    if path not in ROUTES:
+        raise NotFound(f"no route {path}")
+    return ROUTES[path](query)
+
+
+# =====================
+# HTTP
+# =====================
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code: int, body: dict):
+        data = json.dumps(body, separators=(",", ":")).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            self.reply(200, route(url.path.rstrip("/") or "/", parse_qs(url.query)))
+        except BadRequest as e:
+            self.reply(400, {"error": str(e)})
+        except NotFound as e:
+            self.reply(404, {"error": str(e)})
+        except Exception as e:
+            print(f"❌ {self.path}: {e}")
+            self.reply(500, {"error": "internal error"})
+
+    def do_POST(self):
+        self.reply(405, {"error": "read-only service"})
+
+
+def serve(host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+    # Build every index up front, so the first requests don't pay for it
+    for source in SOURCES.values():
+        source.get()
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Read-only JSON API over predictions, history and accuracy"
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port)
+    print(f"🌐 Serving on http://{args.host}:{args.port} ({', '.join(ROUTES)}, /players/<id>)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Query service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,115 +1,73 @@
 from pathlib import Path
 import pandas as pd
-from datetime import datetime
 
-SNAPSHOT_DIR = Path("data/snapshots")
+import snapshot_store
+import price_ledger
+import metrics
+
 OUT_PATH = Path("data/price_changes.csv")
 
 
-def main():
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
-    if len(snapshots) < 2:
-        print("ℹ️ Not enough snapshots to detect price changes")
-        return
+def safe_read_csv(path: Path) -> pd.DataFrame:
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame()
+    return pd.read_csv(path)
 
-    # ---------------------
-    # Load latest snapshot
-    # ---------------------
-    curr_path = snapshots[-1]
-    curr = pd.read_csv(curr_path)
 
-    if {"player_id", "price"}.issubset(curr.columns) is False:
-        print("⚠️ Latest snapshot missing required columns")
-        return
+# =====================
+# Detect price changes
+# =====================
+def record_changes(curr: pd.DataFrame, last: pd.DataFrame, ts):
+    """Returns (ledger_entries, new price_changes rows, last_prices)."""
+    entries, last = price_ledger.detect_changes(curr, last, ts)
+    return entries, price_ledger.to_price_changes(entries), last
 
-    # ---------------------
-    # Find previous snapshot with DIFFERENT prices
-    # ---------------------
-    prev = None
-    prev_path = None
-
-    for path in reversed(snapshots[:-1]):
-        temp = pd.read_csv(path)
-        merged = curr.merge(
-            temp[["player_id", "price"]],
-            on="player_id",
-            suffixes=("", "_prev"),
-            how="inner",
-        )
-
-        if (merged["price"] != merged["price_prev"]).any():
-            prev = temp
-            prev_path = path
-            break
-
-    if prev is None:
-        print("ℹ️ No previous snapshot with price differences found")
-        return
 
-    # ---------------------
-    # Detect price changes
-    # ---------------------
-    merged = curr.merge(
-        prev[["player_id", "price"]],
-        on="player_id",
-        suffixes=("", "_prev"),
-        how="inner",
+def append_price_changes(out: pd.DataFrame):
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    out.to_csv(
+        OUT_PATH,
+        mode="a",
+        header=not OUT_PATH.exists(),
+        index=False,
     )
 
-    changed = merged[merged["price"] != merged["price_prev"]].copy()
 
-    if changed.empty:
-        print("ℹ️ No price changes detected")
+@metrics.timed("record_price_changes")
+def main():
+    snapshots = snapshot_store.latest()
+    if not snapshots:
+        print("ℹ️ Not enough snapshots to detect price changes")
         return
 
-    changed["actual_change"] = changed.apply(
-        lambda r: "rise" if r["price"] > r["price_prev"] else "fall",
-        axis=1,
-    )
-
     # ---------------------
-    # Date from CURRENT snapshot filename
+    # Load latest snapshot
     # ---------------------
-    date = datetime.strptime(
-        curr_path.stem.replace("snapshot_", ""),
-        "%Y-%m-%d_%H-%M-%S",
-    ).date()
-
-    changed["date"] = date
+    curr_ts = snapshots[-1]
+    curr = snapshot_store.read_snapshot(curr_ts, price_ledger.PRICE_COLUMNS)
 
-    out = changed[["player_id", "date", "actual_change"]]
-
-    # ---------------------
-    # De-duplicate (player_id + date)
-    # ---------------------
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    if {"player_id", "price"}.issubset(curr.columns) is False:
+        print("⚠️ Latest snapshot missing required columns")
+        return
 
-    if OUT_PATH.exists():
-        existing = pd.read_csv(OUT_PATH)
+    last = price_ledger.load_last_prices(before=curr_ts)
+    if last.empty:
+        print("ℹ️ No earlier prices to compare against")
 
-        out = out.merge(
-            existing[["player_id", "date"]],
-            on=["player_id", "date"],
-            how="left",
-            indicator=True,
-        )
+    entries, out, last = record_changes(curr, last, curr_ts)
+    metrics.rows(len(curr), len(entries))
 
-        out = out[out["_merge"] == "left_only"].drop(columns=["_merge"])
+    price_ledger.append_entries(entries)
+    price_ledger.save_last_prices(last)
 
     if out.empty:
-        print("ℹ️ Price changes already recorded")
+        print("ℹ️ No price changes detected")
         return
 
-    # ---------------------
-    # Append
-    # ---------------------
-    if OUT_PATH.exists():
-        out.to_csv(OUT_PATH, mode="a", header=False, index=False)
-    else:
-        out.to_csv(OUT_PATH, index=False)
+    append_price_changes(out)
 
     print(f"💾 Recorded {len(out)} real price changes")
-    print(f"🔍 Compared: {prev_path.name} → {curr_path.name}")
+    print(f"📒 Ledger: {len(entries)} new entries")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+from pathlib import Path
+from datetime import date
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import history_store
+
+# =====================
+# Paths
+# =====================
+STATE_PATH = history_store.DATA_DIR / "store" / "rolling_state.parquet"
+META_KEY = b"fpl_rolling"
+
+# Days of raw scores kept for the exact window (days_ago 0 .. 14 covers
+# every rolling_days tune_params searches); widened if the config asks
+RING_DAYS = 15
+
+HISTORY_COLUMNS = ["date", "player_id", "raw_score"]
+
+
+def days_between(start: str, end: str) -> int:
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days
+
+
+# =====================
+# Per-player rolling state
+# =====================
+class RollingState:
+    """Rolling-score memory carried forward run to run, instead of being
+    re-read and re-weighted from the prediction history each time.
+
+    ring holds each of the last `width` days' raw_score per player (the
+    day's last run, as the history store keeps it), which gives the exact
+    rolling_days window. decayed is the unbounded closed form: the sum of
+    raw × decay^(as_of - day) over every day up to as_of, moved forward by
+    one multiply. The newest day only joins it once a later day arrives,
+    since later runs that day replace it.
+    """
+
+    def __init__(self, decay: float, width: int = RING_DAYS, ring=None,
+                 decayed=None, as_of: str = None, synced=None):
+        self.decay = float(decay)
+        self.width = int(width)
+        self.ring = ring if ring is not None else pd.DataFrame(
+            index=pd.Index([], dtype="int64", name="player_id")
+        )
+        self.decayed = decayed if decayed is not None else pd.Series(
+            0.0, index=self.ring.index
+        )
+        self.as_of = as_of
+        self.synced = synced  # [day, mtime_ns] of the partition last pushed
+
+    @property
+    def days(self) -> list:
+        return sorted(self.ring.columns)
+
+    # ---------------------
+    # Updates, O(players)
+    # ---------------------
+    def push(self, day, raw: pd.Series):
+        """Record a run's raw_score (indexed by player_id) for day; pushing
+        the newest day again replaces it, as write_partition() does."""
+        day = history_store.as_day(day)
+        days = self.days
+
+        if days and day < days[-1]:
+            print(f"⚠️ Ignoring out-of-order rolling update for {day}")
+            return
+
+        if days and day > days[-1]:
+            self._fold(days[-1])
+
+        raw = raw[raw.notna()].groupby(level=0).sum()
+        players = self.ring.index.union(raw.index.astype("int64")).rename("player_id")
+        self.ring = self.ring.reindex(players, fill_value=0.0)
+        self.decayed = self.decayed.reindex(players, fill_value=0.0)
+        self.ring[day] = raw.reindex(players, fill_value=0.0).astype(float)
+
+        expired = [d for d in self.days if days_between(d, day) >= self.width]
+        self.ring = self.ring.drop(columns=expired)
+
+    def _fold(self, day: str):
+        if self.as_of is not None:
+            self.decayed = self.decayed * self.decay ** days_between(self.as_of, day)
+        self.decayed = self.decayed + self.ring[day]
+        self.as_of = day
+
+    # ---------------------
+    # Reads
+    # ---------------------
+    def score(self, today, decay: float, rolling_days) -> pd.Series:
+        """compute_prediction's rolling score per player_id at today:
+        over days_ago 0 .. rolling_days, or every day when it is None."""
+        today = history_store.as_day(today)
+        if rolling_days is None:
+            return self.unbounded(today, decay)
+
+        if rolling_days >= self.width:
+            raise ValueError(
+                f"rolling_days={rolling_days} needs a ring wider than {self.width}"
+            )
+
+        # Oldest first, the order the history rows were summed in
+        out = np.zeros(len(self.ring))
+        for day in self.days:
+            age = days_between(day, today)
+            if 0 <= age <= rolling_days:
+                out += self.ring[day].to_numpy() * decay ** age
+        return pd.Series(out, index=self.ring.index)
+
+    def unbounded(self, today: str, decay: float) -> pd.Series:
+        if decay != self.decay:
+            raise ValueError(f"state decays by {self.decay}, not {decay}")
+
+        out = np.zeros(len(self.ring))
+        if self.as_of is not None:
+            out += self.decayed.to_numpy() * decay ** days_between(self.as_of, today)
+        for day in self.days:
+            if self.as_of is None or day > self.as_of:
+                out += self.ring[day].to_numpy() * decay ** days_between(day, today)
+        return pd.Series(out, index=self.ring.index)
+
+    # ---------------------
+    # Persistence
+    # ---------------------
+    @classmethod
+    def load(cls):
+        """The saved state, or None when there is none."""
+        if not STATE_PATH.exists():
+            return None
+
+        table = pq.read_table(STATE_PATH)
+        meta = json.loads(table.schema.metadata[META_KEY])
+        df = table.to_pandas().set_index("player_id")
+
+        return cls(
+            meta["decay"],
+            meta["width"],
+            ring=df.drop(columns="decayed"),
+            decayed=df["decayed"],
+            as_of=meta["as_of"],
+            synced=meta["synced"],
+        )
+
+    def save(self, partition: Path = None) -> Path:
+        """Write atomically; partition is the history file this state now
+        matches, so a run that skipped the state can be detected."""
+        if partition is not None:
+            self.synced = [partition.parent.name.replace("date=", ""),
+                           partition.stat().st_mtime_ns]
+
+        df = self.ring.copy()
+        df.insert(0, "decayed", self.decayed)
+        table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            META_KEY: json.dumps({
+                "decay": self.decay,
+                "width": self.width,
+                "as_of": self.as_of,
+                "synced": self.synced,
+            }).encode(),
+        })
+
+        STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATE_PATH.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(STATE_PATH)
+        return STATE_PATH
+
+    @classmethod
+    def rebuild(cls, decay: float, width: int = RING_DAYS):
+        """Replay every stored partition; O(history), so only on first use
+        or when the state can't be carried forward."""
+        state = cls(decay, width)
+        history = history_store.read_all(HISTORY_COLUMNS)
+        if history.empty:
+            return state
+
+        for day, rows in history.groupby("date", sort=True):
+            state.push(day, rows.set_index("player_id")["raw_score"])
+
+        newest = history_store.partition_path(state.days[-1])
+        state.synced = [state.days[-1], newest.stat().st_mtime_ns]
+        return state
+
+    def stale(self, decay: float, rolling_days) -> str:
+        """Why this state can't serve these params, or "" if it can."""
+        if decay != self.decay:
+            return f"decay {self.decay} → {decay}"
+        if rolling_days is not None and rolling_days >= self.width:
+            return f"window of {rolling_days} days"
+
+        dates = history_store.list_dates()
+        if not dates:
+            return "" if self.synced is None else "history store emptied"
+        newest = history_store.partition_path(dates[-1])
+        if self.synced != [dates[-1], newest.stat().st_mtime_ns]:
+            return "history store changed since last update"
+        return ""
+
+
+def load(params: dict) -> RollingState:
+    """The saved state, rebuilt from the history store when it is missing
+    or out of step with it."""
+    decay, rolling_days = params["decay"], params["rolling_days"]
+
+    state = RollingState.load()
+    reason = "no saved state" if state is None else state.stale(decay, rolling_days)
+    if not reason:
+        return state
+
+    width = max(RING_DAYS, (rolling_days or 0) + 1)
+    print(f"🔁 Rebuilding rolling state ({reason})")
+    return RollingState.rebuild(decay, width)
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    state = RollingState.load()
+    if state is None:
+        print(f"ℹ️ No rolling state yet in {STATE_PATH}")
+        return
+
+    days = state.days or ["-"]
+    print(
+        f"🧮 {len(state.ring)} players, ring {days[0]} → {days[-1]} "
+        f"({state.width} days), decay {state.decay} folded through {state.as_of}"
+    )
+    print(f"   In step with the history store: {state.stale(state.decay, None) or 'yes'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+import argparse
+import time as clock
+
+import metrics
+import pipeline
+
+# =====================
+# Price update window
+# =====================
+# FPL prices move once a day around 01:30 UK time; transfers in the hours
+# before it are what the predictor needs at fine resolution.
+UK = ZoneInfo("Europe/London")
+PRICE_UPDATE = time(1, 30)
+WINDOW_BEFORE = timedelta(hours=3)
+WINDOW_AFTER = timedelta(minutes=30)
+
+# Features span fixed hours (timeseries.DELTA_HOURS), so ticking faster
+# refreshes them without changing their scale
+FAST_INTERVAL = timedelta(minutes=5)
+SLOW_INTERVAL = timedelta(hours=1)
+
+# Not worth re-running every few minutes: thresholds only move when new
+# outcomes land, once a day
+FAST_SKIP = {"tune_threshold"}
+
+
+# =====================
+# Timing
+# =====================
+def next_price_update(now: datetime) -> datetime:
+    """The price update that now's window belongs to (aware, UK time)."""
+    local = now.astimezone(UK)
+    update = datetime.combine(local.date(), PRICE_UPDATE, tzinfo=UK)
+    if local > update + WINDOW_AFTER:
+        update = datetime.combine(
+            local.date() + timedelta(days=1), PRICE_UPDATE, tzinfo=UK
+        )
+    return update
+
+
+def in_window(now: datetime) -> bool:
+    update = next_price_update(now)
+    return update - WINDOW_BEFORE <= now <= update + WINDOW_AFTER
+
+
+def align(now: datetime, interval: timedelta) -> datetime:
+    """Next multiple of interval after now, so ticks land on round minutes."""
+    step = interval.total_seconds()
+    epoch = (now.timestamp() // step + 1) * step
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def next_tick(now: datetime) -> datetime:
+    if in_window(now):
+        return align(now, FAST_INTERVAL)
+
+    window_start = next_price_update(now) - WINDOW_BEFORE
+    return min(align(now, SLOW_INTERVAL), window_start)
+
+
+# =====================
+# One tick
+# =====================
+def tick(fast: bool):
+    """One incremental pipeline run; the snapshot is stored as a delta."""
+    metrics.RUN_ID = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    stages = [
+        stage for stage in pipeline.STAGES
+        if not (fast and stage.name in FAST_SKIP)
+    ]
+
+    try:
+        pipeline.run(stages)
+    except SystemExit:
+        # Fetch failures exit the one-shot pipeline; here, try next tick
+        print("⚠️ Tick aborted")
+    except Exception as e:
+        print(f"❌ Tick failed: {e}")
+
+
+# =====================
+# Main
+# =====================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Poll FPL densely before the daily price update"
+    )
+    parser.add_argument("--once", action="store_true",
+                        help="run a single tick now and exit")
+    parser.add_argument("--ticks", type=int,
+                        help="stop after this many ticks")
+    args = parser.parse_args()
+
+    if args.once:
+        tick(in_window(datetime.now(timezone.utc)))
+        return
+
+    done = 0
+    while args.ticks is None or done < args.ticks:
+        now = datetime.now(timezone.utc)
+        at = next_tick(now)
+        fast = in_window(at)
+
+        print(
+            f"💤 Next tick {at.astimezone(UK):%H:%M} UK "
+            f"({'fast' if fast else 'slow'})"
+        )
+        clock.sleep(max((at - now).total_seconds(), 0))
+
+        tick(fast)
+        done += 1
+
+
+if __name__ == "__main__":
+    main()
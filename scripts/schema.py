@@ -0,0 +1,153 @@
+import sys
+
+import pandas as pd
+
+# =====================
+# Shared categories
+# =====================
+# direction and actual_change share one dtype, so comparing them (as
+# accuracy scoring does) needs no cast
+MOVE = pd.CategoricalDtype(["rise", "fall", "none"])
+ALERT_LEVEL = pd.CategoricalDtype(["imminent", "none"])
+MARKET_BIAS = pd.CategoricalDtype(["neutral", "bullish", "bearish"])
+OWNERSHIP_BUCKET = pd.CategoricalDtype(
+    ["0-2%", "2-5%", "5-10%", "10-20%", "20%+"], ordered=True
+)
+
+# =====================
+# Snapshots
+# =====================
+SNAPSHOT_DTYPES = {
+    "player_id": "int32",
+    "name": "string",
+    "web_name": "string",
+    "team": "category",
+    "price": "float32",
+    "ownership": "float32",
+    "transfers_in_event": "int32",
+    "transfers_out_event": "int32",
+    "form": "float32",
+    "minutes": "int32",
+    "status": "category",
+    "snapshot_date": "string",
+
+    # derived by the pipeline
+    "net_transfers_delta": "float32",
+    "net_transfers_window": "float32",
+    "price_change": "float32",
+    "velocity": "float32",
+    "trend_score": "float32",
+}
+
+# =====================
+# Player dimension (players.py)
+# =====================
+PLAYER_DTYPES = {
+    "player_id": "int32",
+    "web_name": "string",
+    "name": "string",
+    "team": "category",
+    "status": "category",
+    "ownership": "float32",
+    "key": "string",
+    "full_key": "string",
+}
+
+# =====================
+# Predictions (history store, predictions.csv)
+# =====================
+PREDICTION_COLUMNS = [
+    "date",
+    "player_id",
+    "web_name",
+    "direction",
+    "alert_level",
+    "confidence",
+    "raw_score",
+    "prediction_score",
+    "velocity",
+    "net_transfers_delta",
+    "transfer_pressure",
+    "ownership",
+    "ownership_bucket",
+    "market_bias",
+    "rise_threshold",
+    "fall_threshold",
+]
+
+PREDICTION_DTYPES = {
+    "player_id": "int32",
+    "web_name": "string",
+    "direction": MOVE,
+    "alert_level": ALERT_LEVEL,
+    "confidence": "float32",
+    "raw_score": "float32",
+    "prediction_score": "float32",
+    "velocity": "float32",
+    "net_transfers_delta": "float32",
+    "transfer_pressure": "float32",
+    "ownership": "float32",
+    "ownership_bucket": OWNERSHIP_BUCKET,
+    "market_bias": MARKET_BIAS,
+    "rise_threshold": "float32",
+    "fall_threshold": "float32",
+}
+
+# =====================
+# Price changes and protection
+# =====================
+PRICE_CHANGE_DTYPES = {
+    "player_id": "int32",
+    "actual_change": MOVE,
+}
+
+PROTECTION_DTYPES = {
+    "player_id": "int32",
+}
+
+
+# =====================
+# Enforcement
+# =====================
+def enforce(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """df with each column it has cast to its canonical dtype.
+
+    Columns already in that dtype are left alone, so enforcing twice
+    (on write and again on read) costs next to nothing the second time.
+    """
+    cast = {
+        col: dtype
+        for col, dtype in dtypes.items()
+        if col in df.columns and df[col].dtype != dtype
+    }
+    return df.astype(cast)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+# =====================
+# CLI: what the schema saves on a table
+# =====================
+SCHEMAS = {
+    "snapshot": SNAPSHOT_DTYPES,
+    "player": PLAYER_DTYPES,
+    "prediction": PREDICTION_DTYPES,
+    "price_change": PRICE_CHANGE_DTYPES,
+}
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in SCHEMAS:
+        print(f"Usage: schema.py {{{','.join(SCHEMAS)}}} <file.csv|file.parquet>")
+        return
+
+    path = sys.argv[2]
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    typed = enforce(df, SCHEMAS[sys.argv[1]])
+    print(f"📦 {len(df)} rows: {memory_mb(df):.2f} MB → {memory_mb(typed):.2f} MB typed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,18 @@
 from pathlib import Path
 import pandas as pd
-import requests
-import os
+
+import accuracy_cube
+import telegram_queue
 
 # =====================
-# Paths & Telegram
+# Paths
 # =====================
 ACCURACY_PATH = Path("data/accuracy.csv")
-
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+HORIZON_DAYS = 7
 
 
 def main():
-    if not BOT_TOKEN or not CHAT_ID:
+    if not telegram_queue.TOKEN or not telegram_queue.CHAT_ID:
         print("⚠️ Telegram credentials missing")
         return
 
@@ -67,18 +66,23 @@ def main():
         f"📈 Accuracy: `{accuracy_pct:.1f}%`"
     )
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": CHAT_ID,
-        "text": msg,
-        "parse_mode": "Markdown",
-    }
-
-    r = requests.post(url, json=payload, timeout=15)
-
-    if r.status_code != 200:
-        print("❌ Telegram send failed:", r.text)
-    else:
+    # ---------------------
+    # Longer horizons, from the accuracy cube
+    # ---------------------
+    horizons = accuracy_cube.rollup(
+        accuracy_cube.load_cube(),
+        ["horizon"],
+        days=HORIZON_DAYS,
+        alert_level="imminent",
+    )
+    if not horizons.empty:
+        parts = [
+            f"D+{int(h.horizon)} `{h.accuracy * 100:.0f}%`"
+            for h in horizons.itertuples()
+        ]
+        msg += f"\n🔭 Last {HORIZON_DAYS} days: " + " · ".join(parts)
+
+    if telegram_queue.send(msg):
         print("📬 Accuracy report sent to Telegram")
 
 
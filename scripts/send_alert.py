@@ -1,67 +1,59 @@
 from pathlib import Path
-import os
+import numpy as np
 import pandas as pd
-import requests
 from datetime import datetime
 
+import schema
+import players
+import telegram_watchlist
+import telegram_queue
+import alert_ledger
+
 # =====================
 # Paths
 # =====================
 PREDICTIONS_PATH = Path("data/predictions.csv")
-WATCHLIST_PATH = Path("data/watchlist.csv")
-SNAPSHOT_PATH = Path("data/bootstrap_static.csv")
+WATCHLIST_PATH = telegram_watchlist.WATCHLIST_PATH
 
 # =====================
-# Telegram config
+# Alert text
 # =====================
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+def alert_text(row, player_name: str) -> str:
+    emoji = "📈" if row.direction == "rise" else "📉"
 
-# =====================
-# Telegram sender
-# =====================
-def send_telegram(message: str):
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
-        print("ℹ️ Telegram credentials not set — skipping alerts")
-        return
-
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown",
-    }
+    title = (
+        "Imminent Riser" if row.direction == "rise" and row.alert_level == "imminent"
+        else "Imminent Faller" if row.direction == "fall" and row.alert_level == "imminent"
+        else "Price Move Building"
+    )
 
-    try:
-        requests.post(url, json=payload, timeout=10).raise_for_status()
-        print("📨 Telegram alert sent")
-    except Exception as e:
-        print(f"⚠️ Telegram send failed: {e}")
+    return (
+        f"{emoji} *{title}*\n"
+        f"{player_name}\n"
+        f"Score: {getattr(row, 'prediction_score', 0):.2f}\n"
+        f"Confidence: {row.confidence:.2f}"
+    )
 
 # =====================
 # Main
 # =====================
 def main():
-    for path in [PREDICTIONS_PATH, WATCHLIST_PATH, SNAPSHOT_PATH]:
+    for path in [PREDICTIONS_PATH, WATCHLIST_PATH]:
         if not path.exists():
             print(f"ℹ️ Missing {path} — skipping alerts")
             return
 
-    predictions = pd.read_csv(PREDICTIONS_PATH)
-    watchlist = pd.read_csv(WATCHLIST_PATH)
-    snapshot = pd.read_csv(SNAPSHOT_PATH)
-
-    if "name" not in watchlist.columns:
-        print("⚠️ watchlist.csv must contain a 'name' column")
+    if not telegram_queue.TOKEN:
+        print("ℹ️ Telegram credentials not set — skipping alerts")
         return
 
-    # =====================================================
-    # VALID FPL PLAYERS (TODAY)
-    # =====================================================
-    valid_players = snapshot[
-        (snapshot["status"] == "a") &
-        (snapshot["selected_by_percent"].astype(float) > 0)
-    ][["id", "web_name"]].rename(columns={"id": "player_id"})
+    predictions = schema.enforce(pd.read_csv(PREDICTIONS_PATH), schema.PREDICTION_DTYPES)
+    index = players.load()
+    subs = telegram_watchlist.subscriptions(index)
+
+    if len(index) == 0:
+        print("ℹ️ No player table yet — skipping alerts")
+        return
 
     # =====================================================
     # TODAY ONLY
@@ -74,13 +66,9 @@ def main():
         return
 
     # =====================================================
-    # FILTER TO VALID FPL PLAYERS
+    # FILTER TO VALID FPL PLAYERS (TODAY)
     # =====================================================
-    predictions = predictions.merge(
-        valid_players,
-        on="player_id",
-        how="inner"
-    )
+    predictions = predictions[predictions["player_id"].isin(index.available())]
 
     if predictions.empty:
         print("ℹ️ No valid FPL players after snapshot filtering")
@@ -105,67 +93,64 @@ def main():
         return
 
     # =====================================================
-    # NAME RESOLUTION (TRUST SNAPSHOT)
+    # ALERT LEVEL (RECOMPUTED)
     # =====================================================
-    predictions["player_name"] = predictions["web_name"].astype(str)
+    confidence = predictions["confidence"].to_numpy()
+    predictions = predictions.assign(alert_level=np.select(
+        [confidence >= 4, confidence >= 2.5], ["imminent", "warming"], default=""
+    ))
+    predictions = predictions[predictions["alert_level"] != ""]
+
+    if predictions.empty:
+        print("ℹ️ No alert-worthy players")
+        return
+
+    # Rendered once per player, however many chats watch them
+    predictions = predictions.assign(text=[
+        alert_text(row, index.web_name(row.player_id))
+        for row in predictions.itertuples(index=False)
+    ])
 
     # =====================================================
-    # WATCHLIST FILTER (NAME-BASED, SAFE NOW)
+    # SUBSCRIBED CHATS (INVERTED INDEX)
     # =====================================================
-    watch_names = set(watchlist["name"].astype(str).str.lower())
-    df = predictions[
-        predictions["player_name"].str.lower().isin(watch_names)
-    ]
+    row, chat_ids = subs.pairs(predictions["player_id"])
+    df = predictions.iloc[row].assign(chat_id=chat_ids)
 
     if df.empty:
         print("ℹ️ No watchlist players matched")
         return
 
     # =====================================================
-    # ALERT LEVEL (RECOMPUTED)
+    # ONLY WHAT CHANGED SINCE EACH CHAT'S LAST ALERT
     # =====================================================
-    def classify_alert(row):
-        if row["confidence"] >= 4:
-            return "imminent"
-        if row["confidence"] >= 2.5:
-            return "warming"
-        return None
-
-    df["alert_level"] = df.apply(classify_alert, axis=1)
-    df = df[df["alert_level"].notna()]
+    ledger = alert_ledger.load()
+    df = alert_ledger.diff(df, ledger, today)
 
     if df.empty:
-        print("ℹ️ No alert-worthy watchlist players")
+        print("ℹ️ Nothing new since the last alerts")
         return
 
     # =====================================================
-    # BUILD ALERTS
+    # BUILD ALERTS (ONE MESSAGE PER CHAT)
     # =====================================================
-    alerts = []
-
-    for _, row in df.iterrows():
-        emoji = "📈" if row["direction"] == "rise" else "📉"
-
-        title = (
-            "Imminent Riser" if row["direction"] == "rise" and row["alert_level"] == "imminent"
-            else "Imminent Faller" if row["direction"] == "fall" and row["alert_level"] == "imminent"
-            else "Price Move Building"
-        )
+    was = df["last_confidence"].map(lambda c: f" (was {c:.2f})")
+    df = df.assign(text=df["text"] + was.where(df["reason"] == "confidence", ""))
 
-        alerts.append(
-            f"{emoji} *{title}*\n"
-            f"{row['player_name']}\n"
-            f"Score: {row.get('prediction_score', 0):.2f}\n"
-            f"Confidence: {row['confidence']:.2f}"
-        )
+    box = telegram_queue.outbox()
+    for chat_id, texts in df.groupby("chat_id", sort=False)["text"]:
+        box.send(chat_id, "🚨 *FPL Price Prediction Alerts*\n\n" + "\n\n".join(texts))
+    if not box.flush(telegram_queue.FLUSH_TIMEOUT):
+        print("⚠️ Telegram queue still busy; unsent chats will be retried next run")
 
-    if not alerts:
-        print("ℹ️ Nothing to alert")
-        return
-
-    send_telegram(
-        "🚨 *FPL Price Prediction Alerts*\n\n" + "\n\n".join(alerts)
+    # Only what actually went out holds back the next run
+    delivered = df[~df["chat_id"].astype(str).isin(box.failed_chats)]
+    alert_ledger.save(alert_ledger.record(ledger, delivered, today))
+    print(
+        f"📨 Sent {len(delivered)} alerts to "
+        f"{delivered['chat_id'].nunique()} chats"
     )
 
+
 if __name__ == "__main__":
     main()
@@ -1,31 +1,23 @@
 from pathlib import Path
-import requests
 import pandas as pd
 from datetime import datetime
 import sys
 
-FPL_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+import snapshot_store
+import fpl_fetch
+import metrics
 
 DATA_DIR = Path("data")
-SNAPSHOT_DIR = DATA_DIR / "snapshots"
 LATEST_PATH = DATA_DIR / "latest.csv"
 
-SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
+def fetch_bootstrap() -> fpl_fetch.Payload:
+    return fpl_fetch.fetch(fpl_fetch.BOOTSTRAP)
 
-def main():
-    try:
-        r = requests.get(FPL_URL, timeout=30)
-        r.raise_for_status()
-    except Exception as e:
-        print(f"❌ FPL fetch failed: {e}")
-        sys.exit(1)
 
-    data = r.json()
+def build_snapshot(data: dict, snapshot_date: str) -> pd.DataFrame:
     teams = {t["id"]: t["name"] for t in data["teams"]}
 
-    snapshot_date = datetime.utcnow().date().isoformat()
-
     rows = []
     for p in data["elements"]:
         rows.append({
@@ -45,15 +37,30 @@ def main():
             "snapshot_date": snapshot_date,
         })
 
-    df = pd.DataFrame(rows)
+    return pd.DataFrame(rows)
+
+
+@metrics.timed("snapshot")
+def main():
+    try:
+        payload = fetch_bootstrap()
+    except Exception as e:
+        print(f"❌ FPL fetch failed: {e}")
+        sys.exit(1)
+
+    if not payload.changed and "--force" not in sys.argv:
+        print("⏸️ bootstrap-static unchanged since last snapshot")
+        return
 
-    ts = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-    snapshot_path = SNAPSHOT_DIR / f"snapshot_{ts}.csv"
+    now = datetime.utcnow()
+    df = build_snapshot(payload.data, now.date().isoformat())
 
-    df.to_csv(snapshot_path, index=False)
+    path = snapshot_store.write_snapshot(df, now)
     df.to_csv(LATEST_PATH, index=False)
+    metrics.rows(rows_out=len(df))
+    fpl_fetch.commit(payload)
 
-    print(f"📸 Snapshot saved: {snapshot_path}")
+    print(f"📸 Snapshot saved: {path}")
     print(f"🆕 latest.csv updated ({len(df)} players)")
 
 
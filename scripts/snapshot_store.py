@@ -0,0 +1,554 @@
+from pathlib import Path
+from datetime import datetime
+import hashlib
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import schema
+
+# =====================
+# Paths
+# =====================
+DATA_DIR = Path("data")
+STORE_DIR = DATA_DIR / "store" / "snapshots"
+MANIFEST_PATH = STORE_DIR / "manifest.csv"
+LEGACY_DIR = DATA_DIR / "snapshots"
+EXPORT_DIR = DATA_DIR / "exports"
+
+TS_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# =====================
+# Keyframes and deltas
+# =====================
+# The first snapshot of each day is stored in full (a keyframe); later
+# ones keep only the cells that changed since the snapshot before them
+# (their base). Chains are capped so a read never replays more than
+# this many files.
+MAX_CHAIN = 48
+BASE_KEY = b"fpl_base"
+COLUMNS_KEY = b"fpl_columns"
+CHANGED_COLUMN = "_changed"
+COMPRESSION = "zstd"
+
+# =====================
+# Helpers
+# =====================
+def snapshot_name(ts: datetime) -> str:
+    return f"snapshot_{ts.strftime(TS_FORMAT)}"
+
+
+def parse_ts(stem: str) -> datetime:
+    return datetime.strptime(stem.replace("snapshot_", ""), TS_FORMAT)
+
+
+def partition_path(ts: datetime) -> Path:
+    return (
+        STORE_DIR
+        / f"date={ts.date().isoformat()}"
+        / f"{snapshot_name(ts)}.parquet"
+    )
+
+
+def enforce_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    return schema.enforce(df, schema.SNAPSHOT_DTYPES)
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def price_fingerprint(df: pd.DataFrame) -> str:
+    prices = df[["player_id", "price"]].sort_values("player_id")
+    return frame_hash(enforce_dtypes(prices))
+
+
+# =====================
+# Manifest
+# =====================
+# One row per stored snapshot, so "latest", "previous" and "last with
+# different prices" are lookups instead of directory globs and reads.
+# rows / content_hash describe the full snapshot; stored_rows is what is
+# on disk, and base names the snapshot a delta is stored against.
+MANIFEST_COLUMNS = [
+    "snapshot",
+    "date",
+    "rows",
+    "content_hash",
+    "price_fingerprint",
+    "stored_rows",
+    "base",
+]
+
+_manifest = None
+
+# Recently written / rebuilt full frames, so delta chains are not replayed
+# from disk on every read
+_frames = {}
+FRAME_CACHE_SIZE = 4
+
+
+def load_manifest() -> pd.DataFrame:
+    global _manifest
+    if _manifest is None:
+        if MANIFEST_PATH.exists():
+            _manifest = pd.read_csv(
+                MANIFEST_PATH, dtype={"date": str, "base": str}
+            )
+            # Manifests written before deltas existed
+            if "stored_rows" not in _manifest.columns:
+                _manifest["stored_rows"] = _manifest["rows"]
+            _manifest["base"] = _manifest.get("base", pd.Series(dtype=str))
+            _manifest["base"] = _manifest["base"].fillna("")
+        else:
+            _manifest = rebuild_manifest()
+    return _manifest
+
+
+def save_manifest(manifest: pd.DataFrame):
+    global _manifest
+    _manifest = manifest.sort_values("snapshot", ignore_index=True)
+
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    _manifest.to_csv(tmp, index=False)
+    tmp.replace(MANIFEST_PATH)
+
+
+def manifest_entry(df: pd.DataFrame, ts: datetime) -> dict:
+    return {
+        "snapshot": snapshot_name(ts),
+        "date": ts.date().isoformat(),
+        "rows": len(df),
+        "content_hash": frame_hash(df),
+        "price_fingerprint": (
+            price_fingerprint(df) if "price" in df.columns else ""
+        ),
+        "stored_rows": len(df),
+        "base": "",
+    }
+
+
+def record_entry(entry: dict):
+    manifest = load_manifest()
+    manifest = manifest[manifest["snapshot"] != entry["snapshot"]]
+    save_manifest(pd.concat(
+        [manifest, pd.DataFrame([entry], columns=MANIFEST_COLUMNS)],
+        ignore_index=True,
+    ))
+
+
+def rebuild_manifest() -> pd.DataFrame:
+    """Index snapshots already on disk (one-off, e.g. before a manifest existed)."""
+    global _manifest
+
+    paths = sorted(
+        STORE_DIR.glob("date=*/snapshot_*.parquet"), key=lambda p: p.stem
+    )
+
+    # Bases first, so deltas can be rebuilt while hashing
+    _manifest = pd.DataFrame({
+        "snapshot": [p.stem for p in paths],
+        "base": [stored_base(p) for p in paths],
+    })
+
+    entries = []
+    for path, base in zip(paths, _manifest["base"]):
+        ts = parse_ts(path.stem)
+        entry = manifest_entry(read_snapshot(ts), ts)
+        entry["stored_rows"] = pq.read_metadata(path).num_rows
+        entry["base"] = base
+        entries.append(entry)
+
+    manifest = pd.DataFrame(entries, columns=MANIFEST_COLUMNS)
+    _manifest = None
+    if entries:
+        save_manifest(manifest)
+    return manifest
+
+
+# =====================
+# Keyframes and deltas
+# =====================
+def stored_base(path: Path) -> str:
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(BASE_KEY, b"").decode()
+
+
+def base_of(ts: datetime) -> str:
+    manifest = load_manifest()
+    match = manifest.loc[manifest["snapshot"] == snapshot_name(ts), "base"]
+    return match.iloc[0] if len(match) else ""
+
+
+def chain_length(ts: datetime) -> int:
+    """Number of delta files read to rebuild ts (0 for a keyframe)."""
+    n = 0
+    base = base_of(ts)
+    while base:
+        n += 1
+        base = base_of(parse_ts(base))
+    return n
+
+
+def keyframe_due(ts: datetime, base: datetime, chain: int) -> bool:
+    """A new day, or a chain at its cap, starts with a full keyframe."""
+    return base is None or base.date() != ts.date() or chain >= MAX_CHAIN - 1
+
+
+def encode_delta(curr: pd.DataFrame, prev: pd.DataFrame) -> pd.DataFrame:
+    """Changed cells of curr relative to prev.
+
+    One row per new, changed or removed player. CHANGED_COLUMN is a
+    bitmask over curr's columns telling which cells are real values;
+    the rest are stored as nulls. Columns that changed for nobody are
+    left out, and a mask of 0 marks a player no longer present.
+    """
+    columns = list(curr.columns)
+    ids = curr["player_id"].to_numpy()
+
+    before = prev.set_index("player_id").reindex(ids)
+    known = np.isin(ids, prev["player_id"].to_numpy())
+
+    mask = np.zeros(len(curr), dtype=np.int64)
+    changed = {}
+    for bit, col in enumerate(columns):
+        if col == "player_id":
+            continue
+
+        now = curr[col].to_numpy(dtype=object)
+        if col in before.columns:
+            was = before[col].to_numpy(dtype=object)
+            same = (now == was) | (pd.isna(now) & pd.isna(was))
+            diff = ~same | ~known
+        else:
+            diff = np.ones(len(curr), dtype=bool)
+
+        if diff.any():
+            changed[col] = diff
+            mask |= diff.astype(np.int64) << bit
+
+    rows = mask != 0
+    delta = pd.DataFrame({
+        "player_id": ids[rows],
+        CHANGED_COLUMN: mask[rows],
+    })
+    for col, diff in changed.items():
+        values = curr[col].reset_index(drop=True)[rows].reset_index(drop=True)
+        if pd.api.types.is_integer_dtype(values.dtype):
+            values = values.astype(f"Int{values.dtype.itemsize * 8}")
+        delta[col] = values.where(diff[rows])
+
+    removed = prev.loc[~prev["player_id"].isin(ids), "player_id"].to_numpy()
+    if len(removed):
+        delta = pd.concat(
+            [delta, pd.DataFrame({"player_id": removed, CHANGED_COLUMN: 0})],
+            ignore_index=True,
+        )
+
+    return delta
+
+
+def decode_delta(base: pd.DataFrame, delta: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Apply an encode_delta() frame to base; columns is the snapshot's layout."""
+    mask = delta[CHANGED_COLUMN].to_numpy()
+    delta_ids = delta["player_id"].to_numpy()
+
+    removed = delta_ids[mask == 0]
+    ids = np.union1d(
+        base.loc[~base["player_id"].isin(removed), "player_id"].to_numpy(),
+        delta_ids[mask != 0],
+    )
+    before = base.set_index("player_id").reindex(ids)
+    pos = np.searchsorted(ids, delta_ids)
+
+    out = {"player_id": ids}
+    for bit, col in enumerate(columns):
+        if col == "player_id":
+            continue
+
+        if col in before.columns:
+            values = before[col].to_numpy(dtype=object)
+        else:
+            values = np.full(len(ids), np.nan, dtype=object)
+
+        if col in delta.columns:
+            hit = (mask >> bit) & 1 == 1
+            values[pos[hit]] = delta[col].to_numpy(dtype=object)[hit]
+
+        out[col] = pd.Series(values).infer_objects()
+
+    return enforce_dtypes(pd.DataFrame(out))
+
+
+def write_frame(df: pd.DataFrame, ts: datetime, base=None, base_df=None) -> int:
+    """Write df for ts, as a delta against base_df when a base is given.
+
+    Returns the number of rows stored. Does not touch the manifest.
+    """
+    path = partition_path(ts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    stored = df if base is None else encode_delta(df, base_df)
+
+    table = pa.Table.from_pandas(stored, preserve_index=False)
+    if base is not None:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            BASE_KEY: snapshot_name(base).encode(),
+            COLUMNS_KEY: json.dumps(list(df.columns)).encode(),
+        })
+    pq.write_table(table, path, compression=COMPRESSION)
+    return len(stored)
+
+
+def cache_frame(name: str, df: pd.DataFrame):
+    _frames.pop(name, None)
+    _frames[name] = df
+    while len(_frames) > FRAME_CACHE_SIZE:
+        _frames.pop(next(iter(_frames)))
+
+
+def rebuild_frame(ts: datetime) -> pd.DataFrame:
+    name = snapshot_name(ts)
+    if name in _frames:
+        return _frames[name]
+
+    path = partition_path(ts)
+    base = base_of(ts)
+    stored = pd.read_parquet(path)
+
+    if base:
+        columns = json.loads(pq.read_schema(path).metadata[COLUMNS_KEY])
+        df = decode_delta(rebuild_frame(parse_ts(base)), stored, columns)
+    else:
+        df = stored
+
+    cache_frame(name, df)
+    return df
+
+
+# =====================
+# Store API
+# =====================
+def list_snapshots() -> list:
+    return [parse_ts(name) for name in load_manifest()["snapshot"]]
+
+
+def latest(n: int = 1) -> list:
+    return [parse_ts(name) for name in load_manifest()["snapshot"].iloc[-n:]]
+
+
+def previous(ts: datetime):
+    names = load_manifest()["snapshot"]
+    earlier = names[names < snapshot_name(ts)]
+    return parse_ts(earlier.iloc[-1]) if len(earlier) else None
+
+
+def changed_price_candidates(fingerprint: str, before: datetime = None) -> list:
+    """Snapshots (newest first) whose prices differ from the given fingerprint."""
+    manifest = load_manifest()
+    if before is not None:
+        manifest = manifest[manifest["snapshot"] < snapshot_name(before)]
+
+    differs = manifest[manifest["price_fingerprint"] != fingerprint]
+    return [parse_ts(name) for name in differs["snapshot"].iloc[::-1]]
+
+
+def dependents(ts: datetime) -> list:
+    """Snapshots stored (directly or down the chain) as deltas against ts."""
+    manifest = load_manifest()
+    out = []
+    name = snapshot_name(ts)
+    while True:
+        children = manifest.loc[manifest["base"] == name, "snapshot"]
+        if children.empty:
+            return out
+        name = children.iloc[0]
+        out.append(parse_ts(name))
+
+
+def write_snapshot(df: pd.DataFrame, ts: datetime, keyframe: bool = False) -> Path:
+    """Store a snapshot, as a delta against the previous one unless a keyframe is due."""
+    # Sorted, so a snapshot rebuilt from deltas hashes the same
+    df = enforce_dtypes(df).sort_values("player_id", ignore_index=True)
+    entry = manifest_entry(df, ts)
+
+    base = previous(ts)
+    if keyframe or keyframe_due(ts, base, chain_length(base) if base else 0):
+        base = None
+
+    # Deltas stored against the old content of ts must be re-encoded
+    children = [(child, rebuild_frame(child)) for child in dependents(ts)]
+
+    entry["base"] = snapshot_name(base) if base else ""
+    entry["stored_rows"] = write_frame(
+        df, ts, base, rebuild_frame(base) if base else None
+    )
+    record_entry(entry)
+    cache_frame(entry["snapshot"], df)
+
+    if children:
+        manifest = load_manifest().copy()
+        parent, parent_df = ts, df
+        for child, child_df in children:
+            rows = write_frame(child_df, child, parent, parent_df)
+            manifest.loc[manifest["snapshot"] == snapshot_name(child), "stored_rows"] = rows
+            parent, parent_df = child, child_df
+        save_manifest(manifest)
+
+    return partition_path(ts)
+
+
+def read_snapshot(ts: datetime, columns=None) -> pd.DataFrame:
+    path = partition_path(ts)
+    if not path.exists():
+        return pd.DataFrame()
+
+    if snapshot_name(ts) in _frames or base_of(ts):
+        df = rebuild_frame(ts)
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df.copy()
+
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+
+    return pd.read_parquet(path, columns=columns)
+
+
+def snapshot_at(when: datetime):
+    """The newest snapshot taken at or before when, or None."""
+    names = load_manifest()["snapshot"]
+    earlier = names[names <= snapshot_name(when)]
+    return parse_ts(earlier.iloc[-1]) if len(earlier) else None
+
+
+def read_at(when: datetime, columns=None) -> pd.DataFrame:
+    """The player table as it stood at any moment of the stored history."""
+    ts = snapshot_at(when)
+    return pd.DataFrame() if ts is None else read_snapshot(ts, columns)
+
+
+def update_snapshot(ts: datetime, updates: pd.DataFrame) -> Path:
+    """Set (or replace) columns of an existing snapshot, aligned on player_id."""
+    df = read_snapshot(ts)
+    new_cols = [c for c in updates.columns if c != "player_id"]
+
+    df = df.drop(columns=new_cols, errors="ignore").merge(
+        updates[["player_id", *new_cols]],
+        on="player_id",
+        how="left",
+    )
+    return write_snapshot(df, ts, keyframe=not base_of(ts))
+
+
+def compact() -> tuple:
+    """Re-encode every stored snapshot as keyframes plus deltas.
+
+    Returns (bytes before, bytes after).
+    """
+    manifest = load_manifest().copy()
+    before = sum(partition_path(ts).stat().st_size for ts in list_snapshots())
+
+    base = base_df = None
+    chain = 0
+    for i, ts in enumerate(list_snapshots()):
+        df = enforce_dtypes(rebuild_frame(ts)).sort_values(
+            "player_id", ignore_index=True
+        )
+        if keyframe_due(ts, base, chain):
+            base = base_df = None
+
+        rows = write_frame(df, ts, base, base_df)
+        manifest.loc[i, ["stored_rows", "base"]] = [
+            rows, snapshot_name(base) if base else ""
+        ]
+
+        chain = chain + 1 if base else 0
+        base, base_df = ts, df
+
+    save_manifest(manifest)
+    _frames.clear()
+
+    after = sum(partition_path(ts).stat().st_size for ts in list_snapshots())
+    return before, after
+
+
+# =====================
+# Legacy CSV migration / export
+# =====================
+def migrate_legacy() -> int:
+    migrated = 0
+    for path in sorted(LEGACY_DIR.glob("snapshot_*.csv")):
+        if path.stat().st_size > 0:
+            write_snapshot(pd.read_csv(path), parse_ts(path.stem))
+            migrated += 1
+        path.unlink()
+    return migrated
+
+
+def export_csv(ts: datetime, out_dir: Path = EXPORT_DIR) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = out_dir / f"{snapshot_name(ts)}.csv"
+    read_snapshot(ts).to_csv(out, index=False)
+    return out
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if cmd == "migrate":
+        n = migrate_legacy()
+        print(f"📦 Migrated {n} legacy CSV snapshots into {STORE_DIR}")
+
+    elif cmd == "export":
+        stamps = list_snapshots()
+        if len(sys.argv) > 2:
+            stamps = [parse_ts(sys.argv[2])]
+        elif stamps:
+            stamps = stamps[-1:]
+
+        for ts in stamps:
+            print(f"📝 Exported {export_csv(ts)}")
+
+    elif cmd == "list":
+        print(load_manifest().to_string(index=False))
+
+    elif cmd == "reindex":
+        manifest = rebuild_manifest()
+        print(f"🗂️ Manifest rebuilt: {len(manifest)} snapshots")
+
+    elif cmd == "compact":
+        before, after = compact()
+        print(f"🗜️ Snapshots compacted: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+
+    elif cmd == "at":
+        when = datetime.fromisoformat(sys.argv[2])
+        ts = snapshot_at(when)
+        if ts is None:
+            print(f"ℹ️ No snapshot at or before {when}")
+            return
+        print(f"📸 {snapshot_name(ts)}")
+        print(read_snapshot(ts).to_string(index=False))
+
+    else:
+        print(
+            "Usage: snapshot_store.py "
+            "[list | migrate | reindex | compact | at <iso time> | "
+            "export [snapshot_<ts>]]"
+        )
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@ from pathlib import Path
 import pandas as pd
 from datetime import datetime
 
+import history_store
+
 PREDICTIONS_PATH = Path("data/predictions.csv")
-HISTORY_PATH = Path("data/predictions_history.csv")
 
 REQUIRED_COLUMNS = {
     "player_id",
@@ -25,18 +26,10 @@ def main():
     if missing:
         raise RuntimeError(f"❌ predictions.csv missing columns: {missing}")
 
-    preds = preds.copy()
-    preds["date"] = datetime.utcnow().date().isoformat()
-
-    HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    if HISTORY_PATH.exists():
-        history = pd.read_csv(HISTORY_PATH)
-        combined = pd.concat([history, preds], ignore_index=True)
-    else:
-        combined = preds
+    today = datetime.utcnow().date().isoformat()
 
-    combined.to_csv(HISTORY_PATH, index=False)
+    # Only today's partition is rewritten
+    history_store.write_partition(preds, today)
 
     print(f"🧠 Stored {len(preds)} predictions")
 
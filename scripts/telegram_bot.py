@@ -0,0 +1,193 @@
+from pathlib import Path
+import argparse
+import asyncio
+import os
+
+import requests
+
+import telegram_queue
+import telegram_watchlist
+import update_telegram
+
+# =====================
+# Paths
+# =====================
+OFFSET_PATH = Path("data/telegram_offset.txt")
+
+# =====================
+# Telegram config
+# =====================
+TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+OWNER_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+API_BASE = telegram_queue.API_BASE
+
+# Telegram holds a long poll open this long when nothing arrives, and
+# hands back at most BATCH_LIMIT updates per call
+POLL_TIMEOUT = 50
+BATCH_LIMIT = 100
+HTTP_TIMEOUT = 10
+
+# Back-off after a failed poll, doubling up to the max
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+
+# =====================
+# Dispatch table (chat, args → reply text)
+# =====================
+COMMANDS = {
+    "/start": telegram_watchlist.help_text,
+    "/help": telegram_watchlist.help_text,
+    "/add": telegram_watchlist.add,
+    "/remove": telegram_watchlist.remove,
+    "/list": telegram_watchlist.show,
+    "/reset": update_telegram.request_reset,
+    "/confirm_reset": update_telegram.confirm_reset,
+    "/cancel_reset": update_telegram.cancel_reset,
+}
+
+# Any chat can keep a watchlist; only the owner can wipe the data
+OWNER_ONLY = {"/reset", "/confirm_reset", "/cancel_reset"}
+
+
+# =====================
+# Offset
+# =====================
+def load_offset():
+    try:
+        return int(OFFSET_PATH.read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_offset(offset: int):
+    OFFSET_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = OFFSET_PATH.with_suffix(".tmp")
+    tmp.write_text(str(offset))
+    tmp.replace(OFFSET_PATH)
+
+
+# =====================
+# Bot
+# =====================
+def parse_command(text: str):
+    """("/add", ["salah", "saka"]) from "/add@fpl_bot salah saka"."""
+    words = text.strip().split()
+    if not words or not words[0].startswith("/"):
+        return None, []
+    return words[0].split("@")[0].lower(), words[1:]
+
+
+class Bot:
+    """Long-polls getUpdates and answers every chat's commands.
+
+    Polls run on a worker thread and replies go through the shared
+    rate-limited outbox, so the next poll never waits on a send.
+    Handlers touch the watchlist and reset files, so they run one at a
+    time under a lock, in the order the updates arrived. The offset is
+    saved only after a batch is handled: a crash replays that batch
+    rather than losing it.
+    """
+
+    def __init__(self, token: str, owner: str, api_base: str = API_BASE):
+        self.url = f"{api_base.rstrip('/')}/bot{token}"
+        self.owner = str(owner)
+        self.session = requests.Session()
+        self.outbox = telegram_queue.Outbox(token, api_base)
+        self.offset = load_offset()
+        self.lock = asyncio.Lock()
+
+    async def call(self, method: str, payload: dict, timeout: float):
+        r = await asyncio.to_thread(
+            self.session.post, f"{self.url}/{method}", json=payload, timeout=timeout
+        )
+        r.raise_for_status()
+        body = r.json()
+        if not body.get("ok"):
+            raise RuntimeError(body.get("description", f"{method} failed"))
+        return body["result"]
+
+    async def get_updates(self, timeout: int) -> list:
+        payload = {"timeout": timeout, "limit": BATCH_LIMIT, "allowed_updates": ["message"]}
+        if self.offset is not None:
+            payload["offset"] = self.offset
+        return await self.call("getUpdates", payload, timeout + HTTP_TIMEOUT)
+
+    async def handle(self, update: dict):
+        msg = update.get("message") or {}
+        chat_id = str(msg.get("chat", {}).get("id"))
+
+        command, args = parse_command(msg.get("text") or "")
+        handler = COMMANDS.get(command)
+        if handler is None:
+            return
+
+        # 🔒 Owner only
+        if command in OWNER_ONLY and chat_id != self.owner:
+            return
+
+        async with self.lock:
+            try:
+                reply = await asyncio.to_thread(handler, chat_id, args)
+            except Exception as e:
+                reply = f"⚠️ {command} failed: {e}"
+
+        print(f"🤖 {command} {' '.join(args)}".rstrip())
+        if reply:
+            self.outbox.send(chat_id, reply)
+
+    async def poll(self, timeout: int = POLL_TIMEOUT) -> int:
+        """Fetch and handle one batch; the number of updates in it."""
+        updates = await self.get_updates(timeout)
+        if not updates:
+            return 0
+
+        await asyncio.gather(*(self.handle(u) for u in updates))
+
+        self.offset = updates[-1]["update_id"] + 1
+        save_offset(self.offset)
+        return len(updates)
+
+    async def run(self, once: bool = False):
+        """Poll until cancelled; with once, drain what is waiting and stop."""
+        delay = RETRY_DELAY
+        while True:
+            try:
+                handled = await self.poll(0 if once else POLL_TIMEOUT)
+            except (requests.RequestException, RuntimeError, ValueError) as e:
+                if once:
+                    print(f"⚠️ Telegram error: {e}")
+                    return
+                print(f"⚠️ Telegram poll failed ({e}); retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+
+            delay = RETRY_DELAY
+            if once and not handled:
+                await asyncio.to_thread(self.outbox.flush, telegram_queue.FLUSH_TIMEOUT)
+                return
+
+
+# =====================
+# Main
+# =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Telegram command bot")
+    parser.add_argument("--once", action="store_true",
+                        help="handle pending commands and exit (for CI)")
+    args = parser.parse_args(argv)
+
+    if not TOKEN or not OWNER_CHAT_ID:
+        print("ℹ️ Telegram credentials missing")
+        return
+
+    bot = Bot(TOKEN, OWNER_CHAT_ID)
+    print(f"🤖 Telegram bot {'draining' if args.once else 'polling'} (offset {bot.offset})")
+    try:
+        asyncio.run(bot.run(once=args.once))
+    except KeyboardInterrupt:
+        print("👋 Telegram bot stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+from collections import deque
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# =====================
+# Telegram config
+# =====================
+TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Point at a local fake Bot API to test without Telegram
+API_BASE = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# =====================
+# Limits
+# =====================
+# Telegram rejects longer texts outright
+MAX_MESSAGE_CHARS = 4096
+
+# Bot API guidance: about 30 messages a second overall, and no more than
+# one a second to a single chat beyond a short burst
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+
+WORKERS = 8
+SEND_TIMEOUT = 15
+
+# Network errors and 5xx back off exponentially; a 429 waits exactly
+# the retry_after Telegram asks for
+MAX_RETRIES = 5
+RETRY_DELAY = 0.5
+
+# Scripts stop waiting on the queue after this long, so a stuck send
+# can't hang a CI job; whatever is still queued counts as failed
+FLUSH_TIMEOUT = 600
+
+
+# =====================
+# Chunking
+# =====================
+def chunk_text(text: str, limit: int = MAX_MESSAGE_CHARS) -> list:
+    """text in pieces of at most limit characters, split between
+    paragraphs, then lines, then words, so Markdown entities (which
+    never span a line in our messages) stay whole."""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit + 1]
+        for sep in ("\n\n", "\n", " "):
+            cut = window.rfind(sep)
+            if cut > 0:
+                chunks.append(text[:cut])
+                text = text[cut + len(sep):]
+                break
+        else:
+            chunks.append(text[:limit])
+            text = text[limit:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+# =====================
+# Rate limiting
+# =====================
+class TokenBucket:
+    """rate tokens a second, up to burst banked. take() reserves a token
+    and returns how long to wait for it, so callers sleep unlocked."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+
+# =====================
+# Outbound queue
+# =====================
+class Outbox:
+    """Queued sendMessage calls over one pooled session.
+
+    Each chat has its own FIFO and is served by one worker at a time,
+    so chunks arrive in order while different chats go out in
+    parallel. Every send takes a token from the global bucket and one
+    from the chat's; a 429 holds every worker for its retry_after.
+    """
+
+    def __init__(self, token: str = TOKEN, api_base: str = API_BASE,
+                 workers: int = WORKERS, rate: float = GLOBAL_RATE,
+                 chat_rate: float = CHAT_RATE):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.bucket = TokenBucket(rate, GLOBAL_BURST)
+        self.chat_rate = chat_rate
+        self.chat_buckets = {}
+        self.hold_until = 0.0
+
+        self.pending = {}       # chat_id → deque of payloads
+        self.ready = deque()    # chats with pending messages and no worker
+        self.outstanding = 0
+        self.cond = threading.Condition()
+
+        self.workers = workers
+        self.threads = []
+        self.stats = {"sent": 0, "failed": 0, "retried": 0, "rate_limited": 0}
+        self.failed_chats = set()
+
+    # ---------------------
+    # Producer side
+    # ---------------------
+    def send(self, chat_id, text: str, parse_mode: str = "Markdown", **options) -> int:
+        """Queue text for chat_id, split to fit; the number of messages.
+        options are extra sendMessage fields (disable_web_page_preview)."""
+        chat_id = str(chat_id)
+        chunks = chunk_text(text)
+        with self.cond:
+            if chat_id not in self.chat_buckets:
+                self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, CHAT_BURST)
+            queue = self.pending.setdefault(chat_id, deque())
+            if not queue:
+                self.ready.append(chat_id)
+            for chunk in chunks:
+                payload = {"chat_id": chat_id, "text": chunk, **options}
+                if parse_mode:
+                    payload["parse_mode"] = parse_mode
+                queue.append(payload)
+            self.outstanding += len(chunks)
+            self.cond.notify_all()
+        self._start()
+        return len(chunks)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far has been sent or given up;
+        False if timeout ran out first, with the chats still queued
+        added to failed_chats."""
+        with self.cond:
+            done = self.cond.wait_for(lambda: self.outstanding == 0, timeout)
+            if not done:
+                self.failed_chats.update(c for c, q in self.pending.items() if q)
+            return done
+
+    # ---------------------
+    # Workers
+    # ---------------------
+    def _start(self):
+        with self.cond:
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.ready)
+                chat_id = self.ready.popleft()
+                payload = self.pending[chat_id][0]
+
+            # Whatever happens in delivery, the payload leaves the queue
+            # and is counted, or flush() would wait on it forever
+            ok = False
+            try:
+                ok = self._deliver(payload)
+            except Exception as e:
+                print(f"❌ Telegram send crashed: {e}")
+            finally:
+                with self.cond:
+                    queue = self.pending[chat_id]
+                    queue.popleft()
+                    if queue:
+                        self.ready.append(chat_id)
+                    self.outstanding -= 1
+                    self.stats["sent" if ok else "failed"] += 1
+                    if not ok:
+                        self.failed_chats.add(chat_id)
+                    self.cond.notify_all()
+
+    def _count(self, key: str):
+        with self.cond:
+            self.stats[key] += 1
+
+    def _wait_turn(self, chat_id: str):
+        delay = max(self.bucket.take(), self.chat_buckets[chat_id].take())
+        delay = max(delay, self.hold_until - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+
+    def _deliver(self, payload: dict) -> bool:
+        delay = RETRY_DELAY
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                self._count("retried")
+            self._wait_turn(payload["chat_id"])
+
+            try:
+                r = self.session.post(self.url, json=payload, timeout=SEND_TIMEOUT)
+            except requests.RequestException as e:
+                print(f"⚠️ Telegram send failed: {e}")
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+            if r.status_code == 200:
+                return True
+
+            if r.status_code == 429:
+                self._count("rate_limited")
+                try:
+                    retry_after = r.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    # A proxy's 429 page rather than Telegram's JSON
+                    retry_after = 1
+                self.hold_until = max(self.hold_until, time.monotonic() + retry_after)
+                continue
+
+            if r.status_code == 400 and "parse_mode" in payload and "parse" in r.text:
+                # A chunk whose Markdown Telegram can't parse still goes out, plain
+                payload = {k: v for k, v in payload.items() if k != "parse_mode"}
+                continue
+
+            if r.status_code < 500:
+                print(f"❌ Telegram rejected message: {r.text}")
+                return False
+
+            time.sleep(delay)
+            delay *= 2
+
+        print(f"❌ Telegram send gave up after {MAX_RETRIES} retries")
+        return False
+
+
+# =====================
+# Shared outbox for scripts
+# =====================
+_outbox = None
+
+
+def outbox(api_base: str = None) -> Outbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox(TOKEN, api_base or API_BASE)
+    return _outbox
+
+
+def send(text: str, chat_id=None, **options) -> bool:
+    """Send text to chat_id (the owner chat by default) and wait for it:
+    True if every chunk was delivered."""
+    chat_id = chat_id or CHAT_ID
+    if not TOKEN or not chat_id:
+        print("ℹ️ Telegram credentials not set — skipping message")
+        return False
+
+    box = outbox()
+    failed = box.stats["failed"]
+    box.send(chat_id, text, **options)
+    done = box.flush(FLUSH_TIMEOUT)
+    return done and box.stats["failed"] == failed
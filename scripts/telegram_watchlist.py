@@ -1,240 +1,206 @@
 from pathlib import Path
-import os
-import time
-import shutil
-import requests
+import numpy as np
 import pandas as pd
-from requests.exceptions import ReadTimeout
+
+import players
+import telegram_queue
 
 # =====================
 # Paths
 # =====================
 DATA_DIR = Path("data")
 WATCHLIST_PATH = DATA_DIR / "watchlist.csv"
-OFFSET_PATH = DATA_DIR / "telegram_offset.txt"
-RESET_FLAG = DATA_DIR / ".reset_pending"
-
-SNAPSHOTS_DIR = DATA_DIR / "snapshots"
-DELTAS_DIR = DATA_DIR / "deltas"
 
-FILES_TO_DELETE = [
-    DATA_DIR / "velocity.csv",
-    DATA_DIR / "trends.csv",
-    DATA_DIR / "predictions.csv",
-]
+WATCHLIST_COLUMNS = ["chat_id", "player_id", "name"]
+WATCHLIST_DTYPES = {"chat_id": "int64", "player_id": "int32"}
 
-# =====================
-# Telegram config
-# =====================
-TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-OWNER_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-API_URL = f"https://api.telegram.org/bot{TOKEN}"
+# Before watchlists were per chat, the one list belonged to the owner
+OWNER_CHAT_ID = telegram_queue.CHAT_ID
 
-# ⏱️ 1 HOUR confirmation window
-RESET_TIMEOUT = 60 * 60  # seconds
 
 # =====================
-# Telegram helpers
+# File helpers
 # =====================
-def get_updates(offset=None):
-    params = {"timeout": 5, "limit": 10}
-    if offset is not None:
-        params["offset"] = offset
-
-    return requests.get(
-        f"{API_URL}/getUpdates",
-        params=params,
-        timeout=10
-    ).json().get("result", [])
-
-
-def send_message(text):
-    requests.post(
-        f"{API_URL}/sendMessage",
-        json={
-            "chat_id": OWNER_CHAT_ID,
-            "text": text,
-            "parse_mode": "Markdown",
-        },
-        timeout=10,
+def load_watchlist(index: players.PlayerIndex = None) -> pd.DataFrame:
+    """Every chat's watched players, one row per (chat_id, player_id).
+
+    Older files are upgraded on read: name-only rows are resolved to
+    player_ids once, and rows without a chat go to the owner chat.
+    """
+    if not WATCHLIST_PATH.exists() or WATCHLIST_PATH.stat().st_size == 0:
+        return pd.DataFrame(columns=WATCHLIST_COLUMNS).astype(WATCHLIST_DTYPES)
+
+    df = pd.read_csv(WATCHLIST_PATH)
+    if "player_id" not in df.columns:
+        index = index or players.load()
+        df["player_id"] = df["name"].astype(str).map(index.resolve)
+        unmatched = df.loc[df["player_id"].isna(), "name"].tolist()
+        if unmatched:
+            print(f"⚠️ Watchlist names with no player: {', '.join(unmatched)}")
+        df = df.dropna(subset=["player_id"])
+        df["name"] = df["player_id"].map(index.web_name)
+
+    if "chat_id" not in df.columns:
+        if not OWNER_CHAT_ID:
+            print("⚠️ Watchlist has no chat ids and TELEGRAM_CHAT_ID is not set")
+            df = df.iloc[0:0]
+        df["chat_id"] = int(OWNER_CHAT_ID or 0)
+
+    return (
+        df[WATCHLIST_COLUMNS]
+        .astype(WATCHLIST_DTYPES)
+        .drop_duplicates(["chat_id", "player_id"])
+        .reset_index(drop=True)
     )
 
-# =====================
-# File helpers
-# =====================
-def load_offset():
-    if OFFSET_PATH.exists():
-        return int(OFFSET_PATH.read_text().strip())
-    return None
 
+def save_watchlist(df):
+    WATCHLIST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = WATCHLIST_PATH.with_suffix(".tmp")
+    (
+        df[WATCHLIST_COLUMNS]
+        .drop_duplicates(["chat_id", "player_id"])
+        .sort_values(["chat_id", "player_id"])
+        .to_csv(tmp, index=False)
+    )
+    tmp.replace(WATCHLIST_PATH)
 
-def save_offset(offset):
-    OFFSET_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OFFSET_PATH.write_text(str(offset))
 
+def load_watched(index: players.PlayerIndex, chat_id) -> dict:
+    """player_id → name of every player chat_id watches."""
+    watchlist = load_watchlist(index)
+    mine = watchlist[watchlist["chat_id"] == int(chat_id)]
+    return dict(zip(mine["player_id"].tolist(), mine["name"].tolist()))
 
-def load_watchlist():
-    if WATCHLIST_PATH.exists():
-        return pd.read_csv(WATCHLIST_PATH)
-    return pd.DataFrame(columns=["name"])
 
+def save_watched(chat_id, watched: dict):
+    """Replace chat_id's rows, leaving every other chat's alone."""
+    watchlist = load_watchlist()
+    others = watchlist[watchlist["chat_id"] != int(chat_id)]
+    mine = pd.DataFrame({
+        "chat_id": int(chat_id),
+        "player_id": list(watched),
+        "name": list(watched.values()),
+    }, columns=WATCHLIST_COLUMNS)
+    frames = [df for df in (others, mine) if not df.empty]
+    save_watchlist(
+        pd.concat(frames, ignore_index=True) if frames
+        else pd.DataFrame(columns=WATCHLIST_COLUMNS)
+    )
 
-def save_watchlist(df):
-    WATCHLIST_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df.drop_duplicates().to_csv(WATCHLIST_PATH, index=False)
 
 # =====================
-# Reset helpers
+# Inverted index
 # =====================
-def mark_reset_pending():
-    RESET_FLAG.write_text(str(int(time.time())))
+class Subscriptions:
+    """player_id → subscribed chat_ids, in CSR form: the watchlist
+    sorted by player, and where each player's run of chats starts.
 
+    Looking up the day's actionable players costs a binary search each
+    plus the subscriptions they actually have, however many chats
+    there are.
+    """
 
-def reset_pending_valid():
-    if not RESET_FLAG.exists():
-        return False
-    ts = int(RESET_FLAG.read_text())
-    return (time.time() - ts) <= RESET_TIMEOUT
+    def __init__(self, watchlist: pd.DataFrame):
+        w = watchlist.sort_values(["player_id", "chat_id"])
+        ids = w["player_id"].to_numpy(dtype=np.int64)
+        self.players, starts = np.unique(ids, return_index=True)
+        self.offsets = np.append(starts, len(ids))
+        self.chats = w["chat_id"].to_numpy(dtype=np.int64)
 
+    def __len__(self):
+        return len(self.chats)
 
-def clear_reset_flag():
-    if RESET_FLAG.exists():
-        RESET_FLAG.unlink()
+    def chats_for(self, player_id: int) -> np.ndarray:
+        i = np.searchsorted(self.players, player_id)
+        if i == len(self.players) or self.players[i] != player_id:
+            return self.chats[:0]
+        return self.chats[self.offsets[i]:self.offsets[i + 1]]
 
+    def pairs(self, player_ids) -> tuple:
+        """(row, chat_id) arrays: row indexes player_ids, once per
+        chat subscribed to that player."""
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        if not len(self.players) or not len(player_ids):
+            return np.empty(0, dtype=np.int64), self.chats[:0]
 
-def perform_reset():
-    if SNAPSHOTS_DIR.exists():
-        shutil.rmtree(SNAPSHOTS_DIR)
+        pos = np.minimum(np.searchsorted(self.players, player_ids), len(self.players) - 1)
+        found = self.players[pos] == player_ids
+        start = np.where(found, self.offsets[pos], 0)
+        count = np.where(found, self.offsets[pos + 1] - self.offsets[pos], 0)
 
-    if DELTAS_DIR.exists():
-        shutil.rmtree(DELTAS_DIR)
+        row = np.repeat(np.arange(len(player_ids)), count)
+        # Position of each pair within its player's run of chats
+        within = np.arange(len(row)) - np.repeat(np.cumsum(count) - count, count)
+        return row, self.chats[np.repeat(start, count) + within]
 
-    for f in FILES_TO_DELETE:
-        if f.exists():
-            f.unlink()
 
-    if OFFSET_PATH.exists():
-        OFFSET_PATH.unlink()
+def subscriptions(index: players.PlayerIndex = None) -> Subscriptions:
+    return Subscriptions(load_watchlist(index))
 
-    clear_reset_flag()
 
 # =====================
-# Main
+# Bot commands (chat, args → reply)
 # =====================
-def main():
-    if not TOKEN or not OWNER_CHAT_ID:
-        print("ℹ️ Telegram credentials missing")
-        return
+def help_text(chat_id, args: list) -> str:
+    return (
+        "👋 *FPL price alerts*\n\n"
+        "/add <player> … — watch players\n"
+        "/remove <player> … — stop watching\n"
+        "/list — your watchlist"
+    )
 
-    # 🧹 Auto-clean expired reset request
-    if RESET_FLAG.exists() and not reset_pending_valid():
-        clear_reset_flag()
 
-    offset = load_offset()
+def show(chat_id, args: list) -> str:
+    watched = load_watched(players.load(), chat_id)
+    if not watched:
+        return "📭 *Your watchlist is empty*"
+    return "📋 *Your Watchlist*\n" + "\n".join(
+        f"• {n}" for n in sorted(watched.values())
+    )
 
-    try:
-        updates = get_updates(offset)
-    except ReadTimeout:
-        print("ℹ️ Telegram timeout — no messages")
-        return
-    except Exception as e:
-        print(f"⚠️ Telegram error: {e}")
-        return
 
-    if not updates:
-        print("ℹ️ No new Telegram commands")
-        return
+def add(chat_id, args: list) -> str:
+    index = players.load()
+    watched = load_watched(index, chat_id)
+    added, unknown = [], []
 
-    watchlist = load_watchlist()
-    watch_names = set(watchlist["name"].str.lower())
-
-    latest_offset = None
-    changed = False
-
-    for update in updates:
-        latest_offset = update["update_id"] + 1
-
-        msg = update.get("message", {})
-        text = msg.get("text", "").strip()
-        chat_id = str(msg.get("chat", {}).get("id"))
-
-        # 🔒 Owner only
-        if chat_id != OWNER_CHAT_ID:
-            continue
-
-        # ---------- WATCHLIST ----------
-        if text == "/list":
-            if watch_names:
-                send_message(
-                    "📋 *Your Watchlist*\n" +
-                    "\n".join(f"• {n}" for n in sorted(watch_names))
-                )
-            else:
-                send_message("📭 *Your watchlist is empty*")
-
-        elif text.startswith("/add "):
-            names = text.replace("/add ", "").lower().split()
-            added = []
-
-            for name in names:
-                if name not in watch_names:
-                    watchlist.loc[len(watchlist)] = {"name": name}
-                    watch_names.add(name)
-                    added.append(name)
-
-            if added:
-                changed = True
-                send_message(f"➕ Added: {', '.join(added)}")
-            else:
-                send_message("ℹ️ No new players added")
-
-        elif text.startswith("/remove "):
-            names = text.replace("/remove ", "").lower().split()
-            removed = []
-
-            for name in names:
-                if name in watch_names:
-                    watchlist = watchlist[watchlist["name"].str.lower() != name]
-                    watch_names.remove(name)
-                    removed.append(name)
-
-            if removed:
-                changed = True
-                send_message(f"➖ Removed: {', '.join(removed)}")
-            else:
-                send_message("ℹ️ No matching players found")
-
-        # ---------- RESET ----------
-        elif text == "/reset":
-            mark_reset_pending()
-            send_message(
-                "⚠️ *Pre-season reset requested*\n\n"
-                "This will delete:\n"
-                "• snapshots\n"
-                "• deltas\n"
-                "• velocity / trends / predictions\n"
-                "• telegram offset\n\n"
-                f"⏱️ You have *1 hour* to confirm.\n"
-                "Send `/confirm_reset` to proceed."
-            )
-
-        elif text == "/confirm_reset":
-            if reset_pending_valid():
-                perform_reset()
-                send_message(
-                    "✅ *Pre-season reset completed.*\n"
-                    "System will rebuild automatically."
-                )
-            else:
-                send_message("❌ Reset expired or not requested.")
-
-    if latest_offset:
-        save_offset(latest_offset)
-
-    if changed:
-        save_watchlist(watchlist)
-
-    print("✅ Telegram watchlist processed")
+    for name in args:
+        pid = index.resolve(name)
+        if pid is None:
+            unknown.append(name)
+        elif pid not in watched:
+            watched[pid] = index.web_name(pid)
+            added.append(watched[pid])
+
+    if added:
+        save_watched(chat_id, watched)
+    reply = f"➕ Added: {', '.join(added)}" if added else "ℹ️ No new players added"
+    if unknown:
+        reply += f"\n❓ No player found for: {', '.join(unknown)}"
+    return reply
+
+
+def remove(chat_id, args: list) -> str:
+    index = players.load()
+    watched = load_watched(index, chat_id)
+    removed = []
+
+    for name in args:
+        pid = next((i for i in index.lookup(name) if i in watched), None)
+        if pid is not None:
+            removed.append(watched.pop(pid))
+
+    if not removed:
+        return "ℹ️ No matching players found"
+    save_watched(chat_id, watched)
+    return f"➖ Removed: {', '.join(removed)}"
+
+
+def main():
+    # Commands are handled by the bot; this drains them once, as before
+    import telegram_bot
+    telegram_bot.main(["--once"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+from pathlib import Path
+from dataclasses import dataclass
+import json
+import sys
+
+import numpy as np
+
+# =====================
+# Paths
+# =====================
+THRESHOLD_PATH = Path("data/thresholds.json")
+
+# =====================
+# Top-k fallback
+# =====================
+MIN_ALERTS_PER_SIDE = 5
+MAX_ALERTS_PER_SIDE = 25
+
+# Tuned cutoffs fitted on fewer resolved predictions than this are noise
+MIN_TUNED_SAMPLES = 30
+
+# (mtime_ns, parsed file) per path, so a long-running scheduler only
+# re-reads thresholds.json after the tuner rewrites it
+_cache = {}
+
+
+@dataclass
+class Thresholds:
+    rise: float
+    fall: float
+    policy: str  # "tuned" or "top_k"
+    reason: str
+
+
+# =====================
+# Tuned cutoffs
+# =====================
+def load(path: Path = THRESHOLD_PATH) -> dict:
+    """Parsed thresholds file, or {} when there is none."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        tuned = json.loads(path.read_text())
+    except (OSError, ValueError):
+        tuned = {}
+
+    _cache[path] = (mtime, tuned)
+    return tuned
+
+
+def usable(tuned: dict) -> str:
+    """Why tuned cutoffs can't be used, or "" if they can."""
+    if not tuned:
+        return "no tuned thresholds"
+    if "rise_cutoff" not in tuned or "fall_cutoff" not in tuned:
+        # Files from before the tuner wrote score cutoffs only hold
+        # quantiles, which don't carry over to the whole market
+        return "tuned thresholds incomplete"
+    if tuned.get("samples", 0) < MIN_TUNED_SAMPLES:
+        return f"only {tuned.get('samples', 0)} tuned samples"
+    return ""
+
+
+# =====================
+# Selection
+# =====================
+def resolve(scores, tuned: dict = None) -> Thresholds:
+    """Rise and fall cutoffs for today's active scores.
+
+    Both policies only need a handful of order statistics, so every
+    index either side needs is selected with one np.partition call
+    instead of sorting the scores.
+    """
+    tuned = load() if tuned is None else tuned
+
+    s = np.asarray(scores, dtype=float)
+    s = s[np.isfinite(s)]
+    n = len(s)
+
+    reason = usable(tuned)
+    if n == 0:
+        return Thresholds(np.inf, -np.inf, "top_k" if reason else "tuned",
+                          "no active scores")
+
+    if not reason:
+        return tuned_cutoffs(s, tuned["rise_cutoff"], tuned["fall_cutoff"],
+                             tuned["samples"])
+    return top_k_cutoffs(s, reason)
+
+
+def tuned_cutoffs(s, rise_cut: float, fall_cut: float, samples: int) -> Thresholds:
+    # The cutoffs were fitted on resolved imminent predictions, which
+    # never numbered more than MAX_ALERTS_PER_SIDE a side a day: past
+    # that many, today's scores are outside what was fitted, so the
+    # MAX_ALERTS_PER_SIDE-th largest positive (smallest negative) bounds
+    # each cutoff
+    n = len(s)
+    positives = int(np.count_nonzero(s > 0))
+    negatives = int(np.count_nonzero(s < 0))
+
+    kth = []
+    if positives > MAX_ALERTS_PER_SIDE:
+        kth.append(n - MAX_ALERTS_PER_SIDE)
+    if negatives > MAX_ALERTS_PER_SIDE:
+        kth.append(MAX_ALERTS_PER_SIDE - 1)
+    part = np.partition(s, kth) if kth else s
+
+    # A cutoff on the wrong side of zero would flag the whole market
+    rise = rise_cut if rise_cut > 0 else np.inf
+    fall = fall_cut if fall_cut < 0 else -np.inf
+    if positives > MAX_ALERTS_PER_SIDE:
+        rise = max(rise, part[n - MAX_ALERTS_PER_SIDE])
+    if negatives > MAX_ALERTS_PER_SIDE:
+        fall = min(fall, part[MAX_ALERTS_PER_SIDE - 1])
+
+    return Thresholds(
+        float(rise), float(fall), "tuned",
+        f"cutoffs {rise_cut:g}/{fall_cut:g} from {samples} samples",
+    )
+
+
+def top_k_cutoffs(s, reason: str) -> Thresholds:
+    # k-th largest positive and k-th smallest negative score: in ascending
+    # order those sit at fixed indices once the signs are counted
+    n = len(s)
+    positives = int(np.count_nonzero(s > 0))
+    negatives = int(np.count_nonzero(s < 0))
+
+    k_rise = min(MAX_ALERTS_PER_SIDE, positives)
+    k_fall = min(MAX_ALERTS_PER_SIDE, negatives)
+
+    kth = []
+    if positives >= MIN_ALERTS_PER_SIDE:
+        kth.append(n - k_rise)
+    if negatives >= MIN_ALERTS_PER_SIDE:
+        kth.append(k_fall - 1)
+
+    part = np.partition(s, kth) if kth else s
+    rise = part[n - k_rise] if positives >= MIN_ALERTS_PER_SIDE else np.inf
+    fall = part[k_fall - 1] if negatives >= MIN_ALERTS_PER_SIDE else -np.inf
+
+    return Thresholds(float(rise), float(fall), "top_k", reason)
+
+
+# =====================
+# CLI
+# =====================
+def main():
+    tuned = load(Path(sys.argv[1]) if len(sys.argv) > 1 else THRESHOLD_PATH)
+    reason = usable(tuned)
+
+    if reason:
+        print(f"🎯 Policy: top_k ({reason})")
+    else:
+        print(
+            f"🎯 Policy: tuned (rise >= {tuned['rise_cutoff']}, "
+            f"fall <= {tuned['fall_cutoff']}, {tuned['samples']} samples)"
+        )
+
+
+if __name__ == "__main__":
+    main()
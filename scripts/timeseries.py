@@ -0,0 +1,320 @@
+from datetime import datetime, timedelta
+import bisect
+import json
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import snapshot_store
+
+# =====================
+# Paths
+# =====================
+SERIES_DIR = snapshot_store.DATA_DIR / "store" / "series"
+MATRIX_PATH = SERIES_DIR / "net_transfers_delta.f32"
+INDEX_PATH = SERIES_DIR / "index.json"
+
+# =====================
+# Windows (in hours of wall-clock time, not snapshots)
+# =====================
+# Fixed spans keep the features on one scale however densely snapshots
+# are taken; 6 h is the cron cadence the weights and cutoffs were fitted at
+DELTA_HOURS = 6
+VELOCITY_HOURS = 3 * DELTA_HOURS
+
+# trend_score averages velocity at now, now - 6 h, ... now - 24 h
+TREND_POINTS = 5
+
+# A snapshot this close past a span's edge counts as on it, so a late
+# cron run doesn't push a whole step out of a window
+SLACK = timedelta(minutes=30)
+
+# History needed to compute every window for the newest snapshot
+TAIL = timedelta(hours=VELOCITY_HOURS + (TREND_POINTS - 1) * DELTA_HOURS)
+
+DTYPE = np.float32
+ITEM_SIZE = np.dtype(DTYPE).itemsize
+
+FEATURE_COLUMNS = ["player_id", "net_transfers_window", "velocity", "trend_score"]
+
+
+# =====================
+# Vectorized windows over time
+# =====================
+def seconds(stamps) -> np.ndarray:
+    """Snapshot stamps as seconds; they are naive UTC, like the store's."""
+    times = [snapshot_store.parse_ts(s) for s in stamps]
+    return np.array(times, dtype="datetime64[s]").astype(np.int64)
+
+
+def span_rates(m: np.ndarray, times: np.ndarray, ends: np.ndarray,
+               hours: float) -> np.ndarray:
+    """Net transfers per DELTA_HOURS over the `hours` up to each row in
+    ends, one row per end.
+
+    Each row of m is the increment since the row before, so it covers
+    that gap in time; the first row covers DELTA_HOURS, as the cron's
+    first delta did. A player's NaN rows count neither transfers nor
+    time, which keeps the rate a mean over what was seen (pandas
+    min_periods=1).
+    """
+    gaps = np.diff(times, prepend=times[0] - DELTA_HOURS * 3600)
+    valid = ~np.isnan(m)
+
+    zero = np.zeros((1, m.shape[1]))
+    total = np.vstack([zero, np.cumsum(np.where(valid, m, 0.0), axis=0)])
+    covered = np.vstack([zero, np.cumsum(valid * gaps[:, None], axis=0)])
+
+    # Rows after the newest one at or before each window's start
+    edge = times[ends] - int(hours * 3600) + int(SLACK.total_seconds())
+    starts = np.searchsorted(times, edge, side="right")
+
+    net = total[ends + 1] - total[starts]
+    span = covered[ends + 1] - covered[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(span > 0, net / span * DELTA_HOURS * 3600, np.nan)
+
+
+def windows(m: np.ndarray, times: np.ndarray):
+    """(net_transfers_window, velocity, trend) for the newest row."""
+    last = len(times) - 1
+    net = span_rates(m, times, np.array([last]), DELTA_HOURS)[0]
+
+    # Newest snapshot at or before each trend point; ones before the
+    # series starts are left out of the mean
+    points = times[last] - np.arange(TREND_POINTS) * DELTA_HOURS * 3600
+    ends = np.searchsorted(
+        times, points + int(SLACK.total_seconds()), side="right"
+    ) - 1
+    ends = ends[ends >= 0]
+
+    velocity = span_rates(m, times, ends, VELOCITY_HOURS)
+    with warnings.catch_warnings():
+        # A player with no rows in any window has an all-NaN column
+        warnings.simplefilter("ignore", RuntimeWarning)
+        trend = np.nanmean(velocity, axis=0)
+
+    return net, velocity[0], trend
+
+
+# =====================
+# (snapshot × player) matrix of net_transfers_delta
+# =====================
+class TransferSeries:
+    """Append-only time series of per-player net_transfers_delta.
+
+    Rows live on disk as raw float32 and are read through a memmap, so
+    only the tail needed for the rolling windows is ever loaded. New rows
+    are held in memory until save().
+    """
+
+    def __init__(self, players=None, stamps=None, disk_width=0):
+        self.players = list(players or [])
+        self.columns = {pid: i for i, pid in enumerate(self.players)}
+        self.stamps = list(stamps or [])
+        self.disk_rows = len(self.stamps)
+        self.disk_width = disk_width
+        self.pending = []
+        self.replace_last = None
+
+    @classmethod
+    def load(cls):
+        if not INDEX_PATH.exists() or not MATRIX_PATH.exists():
+            return cls()
+        index = json.loads(INDEX_PATH.read_text())
+        return cls(index["players"], index["stamps"], len(index["players"]))
+
+    def __len__(self):
+        return len(self.stamps)
+
+    @property
+    def width(self):
+        return len(self.players)
+
+    # ---------------------
+    # Updates
+    # ---------------------
+    def push(self, ts: datetime, deltas: pd.Series):
+        """Add the row for snapshot ts; re-pushing the newest ts replaces it."""
+        stamp = snapshot_store.snapshot_name(ts)
+
+        if self.stamps and stamp < self.stamps[-1]:
+            print(f"⚠️ Ignoring out-of-order snapshot {stamp}")
+            return
+
+        for pid in deltas.index:
+            pid = int(pid)
+            if pid not in self.columns:
+                self.columns[pid] = len(self.players)
+                self.players.append(pid)
+
+        row = np.full(self.width, np.nan, dtype=DTYPE)
+        cols = [self.columns[int(pid)] for pid in deltas.index]
+        row[cols] = deltas.to_numpy(dtype=DTYPE, na_value=np.nan)
+
+        if self.stamps and stamp == self.stamps[-1]:
+            if self.pending:
+                self.pending[-1] = row
+            else:
+                self.replace_last = row
+            return
+
+        self.stamps.append(stamp)
+        self.pending.append(row)
+
+    # ---------------------
+    # Reads
+    # ---------------------
+    def _disk_rows(self, start: int) -> np.ndarray:
+        if self.disk_rows == 0 or start >= self.disk_rows:
+            return np.empty((0, self.width), dtype=DTYPE)
+
+        mm = np.memmap(
+            MATRIX_PATH,
+            dtype=DTYPE,
+            mode="r",
+            shape=(self.disk_rows, self.disk_width),
+        )
+        rows = np.array(mm[start:])
+        del mm
+
+        if self.replace_last is not None:
+            rows[-1, : self.disk_width] = self.replace_last[: self.disk_width]
+
+        if self.disk_width < self.width:
+            pad = np.full((len(rows), self.width - self.disk_width), np.nan, DTYPE)
+            rows = np.hstack([rows, pad])
+            if self.replace_last is not None:
+                rows[-1] = self._padded(self.replace_last)
+
+        return rows
+
+    def _padded(self, row: np.ndarray) -> np.ndarray:
+        if len(row) == self.width:
+            return row
+        out = np.full(self.width, np.nan, dtype=DTYPE)
+        out[: len(row)] = row
+        return out
+
+    def matrix(self, last: int = None) -> np.ndarray:
+        total = len(self.stamps)
+        start = 0 if last is None else max(total - last, 0)
+
+        disk = self._disk_rows(start)
+        pending_start = max(start - self.disk_rows, 0)
+        pending = [self._padded(r) for r in self.pending[pending_start:]]
+
+        if pending:
+            return np.vstack([disk, np.vstack(pending)])
+        return disk
+
+    def features(self) -> pd.DataFrame:
+        """net_transfers_window, velocity and trend_score for the newest
+        snapshot, per player."""
+        if not self.stamps:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+        # Stamps sort by time: only rows from the oldest window's start on
+        newest = snapshot_store.parse_ts(self.stamps[-1])
+        edge = snapshot_store.snapshot_name(newest - TAIL + SLACK)
+        first = max(bisect.bisect_right(self.stamps, edge) - 1, 0)
+
+        m = self.matrix(last=len(self.stamps) - first)
+        net, velocity, trend = windows(m, seconds(self.stamps[first:]))
+
+        return pd.DataFrame({
+            "player_id": np.asarray(self.players, dtype=np.int32),
+            "net_transfers_window": net.astype(DTYPE),
+            "velocity": velocity.astype(DTYPE),
+            "trend_score": trend.astype(DTYPE),
+        })
+
+    # ---------------------
+    # Persistence
+    # ---------------------
+    def save(self):
+        if not self.pending and self.replace_last is None and (
+            self.disk_width == self.width
+        ):
+            return
+
+        SERIES_DIR.mkdir(parents=True, exist_ok=True)
+
+        if self.disk_rows and self.disk_width != self.width:
+            # New players widen the matrix: rare, rewrite once
+            self.matrix().astype(DTYPE).tofile(MATRIX_PATH)
+        else:
+            mode = "r+b" if MATRIX_PATH.exists() else "wb"
+            with open(MATRIX_PATH, mode) as f:
+                if self.replace_last is not None:
+                    f.seek((self.disk_rows - 1) * self.width * ITEM_SIZE)
+                    f.write(self._padded(self.replace_last).tobytes())
+                f.seek(self.disk_rows * self.width * ITEM_SIZE)
+                f.truncate()
+                for row in self.pending:
+                    f.write(self._padded(row).tobytes())
+
+        INDEX_PATH.write_text(json.dumps({
+            "players": self.players,
+            "stamps": self.stamps,
+        }))
+
+        self.disk_rows = len(self.stamps)
+        self.disk_width = self.width
+        self.pending = []
+        self.replace_last = None
+
+
+# =====================
+# Building from the snapshot store
+# =====================
+def build_from_store(stamps=None) -> TransferSeries:
+    series = TransferSeries()
+
+    for ts in stamps if stamps is not None else snapshot_store.list_snapshots():
+        snap = snapshot_store.read_snapshot(
+            ts, ["player_id", "net_transfers_delta"]
+        )
+        if "net_transfers_delta" not in snap.columns:
+            continue
+        series.push(ts, snap.set_index("player_id")["net_transfers_delta"])
+
+    return series
+
+
+def load_series() -> TransferSeries:
+    """Load the persisted series, building it once from the store if absent."""
+    series = TransferSeries.load()
+    if len(series) == 0:
+        series = build_from_store()
+        if len(series):
+            print(f"🧮 Built transfer series from {len(series)} snapshots")
+    return series
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+
+    if cmd == "rebuild":
+        for path in (MATRIX_PATH, INDEX_PATH):
+            if path.exists():
+                path.unlink()
+        series = build_from_store()
+        series.save()
+        print(f"🧮 Rebuilt transfer series: {len(series)} × {series.width}")
+
+    elif cmd == "info":
+        series = TransferSeries.load()
+        print(f"🧮 Transfer series: {len(series)} snapshots × {series.width} players")
+        if len(series):
+            print(f"   {series.stamps[0]} → {series.stamps[-1]}")
+
+    else:
+        print("Usage: timeseries.py [info | rebuild]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import compute_prediction
+import tune_threshold
+import metrics
+
+# =====================
+# Paths
+# =====================
+PARAMS_PATH = compute_prediction.PARAMS_PATH
+ARCHIVE_DIR = compute_prediction.PARAMS_PATH.parent / "store" / "params"
+
+# =====================
+# Search space
+# =====================
+# Every set is scored under the live threshold rule (backtest.thresholds):
+# top-k, where only score ratios matter, or the tuned absolute cutoffs in
+# thresholds.json, against which the scale of every weight and dampening
+# counts too. The three raw-score weights are normalised to sum to 1, as
+# the live config's do, so candidates stay on the scale the cutoffs were
+# fitted at; rolling_weight is 1 - today_weight, and neutral_dampening is
+# left as configured
+SEARCH_SPACE = {
+    "pressure_weight": (0.0, 1.0),
+    "velocity_weight": (0.0, 1.0),
+    "trend_weight": (0.0, 1.0),
+    "today_weight": (0.2, 1.0),
+    "decay": (0.5, 0.99),
+    "rolling_days": (1, 14),
+    "confidence_imminent": (2.0, 4.8),
+    "bias_dampening": (0.1, 1.0),
+}
+NAMES = list(SEARCH_SPACE)
+LOW = np.array([SEARCH_SPACE[n][0] for n in NAMES], dtype=float)
+HIGH = np.array([SEARCH_SPACE[n][1] for n in NAMES], dtype=float)
+
+# Round 1 samples the box uniformly; later rounds resample around the
+# best ELITE_FRACTION so far, with a spread that shrinks each round
+ELITE_FRACTION = 0.02
+SIGMA = 0.15
+SHRINK = 0.5
+
+# The most recent closed days are held out to check the winner
+VALIDATION_FRACTION = 0.25
+MIN_DAYS = 14
+
+CHUNKSIZE = 32
+
+
+# =====================
+# Candidates
+# =====================
+def to_params(unit: np.ndarray, base: dict) -> dict:
+    """One point of the unit cube as a full parameter set."""
+    v = dict(zip(NAMES, (LOW + unit * (HIGH - LOW)).tolist()))
+
+    weights = np.array([v["pressure_weight"], v["velocity_weight"], v["trend_weight"]])
+    weights = weights / weights.sum() if weights.sum() > 0 else np.full(3, 1 / 3)
+
+    return {
+        **base,
+        "pressure_weight": round(float(weights[0]), 4),
+        "velocity_weight": round(float(weights[1]), 4),
+        "trend_weight": round(float(weights[2]), 4),
+        "today_weight": round(v["today_weight"], 4),
+        "rolling_weight": round(1 - v["today_weight"], 4),
+        "decay": round(v["decay"], 4),
+        "rolling_days": int(round(v["rolling_days"])),
+        # Confidence is rounded to 2 decimals, so finer cutoffs are the same
+        "confidence_imminent": round(v["confidence_imminent"], 2),
+        "bias_dampening": round(v["bias_dampening"], 4),
+    }
+
+
+def sample(rng, n: int, unit: np.ndarray, objective: np.ndarray, round_no: int) -> np.ndarray:
+    """n new points: uniform at first, then around the elite so far."""
+    if round_no == 0 or not len(unit):
+        return rng.random((n, len(NAMES)))
+
+    n_elite = max(1, int(len(unit) * ELITE_FRACTION))
+    elite = unit[np.argsort(-objective, kind="stable")[:n_elite]]
+    sigma = SIGMA * SHRINK ** (round_no - 1)
+
+    picks = elite[rng.integers(len(elite), size=n)]
+    return np.clip(picks + rng.normal(0, sigma, picks.shape), 0, 1)
+
+
+# =====================
+# Evaluation
+# =====================
+def score_set(replay: backtest.Replay, params: dict):
+    scored, correct, _ = backtest.day_counts(replay, params)
+    return scored.astype(np.int32), correct.astype(np.int32)
+
+
+def score_in_worker(params: dict):
+    return score_set(backtest._replay, params)
+
+
+def score_all(pool, replay: backtest.Replay, param_sets: list):
+    """(sets x days) scored and correct counts."""
+    if pool is None:
+        results = [score_set(replay, p) for p in param_sets]
+    else:
+        results = list(pool.map(score_in_worker, param_sets, chunksize=CHUNKSIZE))
+    return (
+        np.array([r[0] for r in results]),
+        np.array([r[1] for r in results]),
+    )
+
+
+def lower_bounds(scored: np.ndarray, correct: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Wilson 95% lower bound of accuracy over days, per set: rewards
+    accuracy without letting a handful of lucky alerts win."""
+    n = scored[:, days].sum(axis=1)
+    k = correct[:, days].sum(axis=1)
+    return np.array([tune_threshold.wilson(int(c), int(t))[0] for c, t in zip(k, n)])
+
+
+def summary(scored: np.ndarray, correct: np.ndarray, days: np.ndarray) -> dict:
+    n = int(scored[days].sum())
+    k = int(correct[days].sum())
+    return {
+        "days": int(len(days)),
+        "predicted": n,
+        "correct": k,
+        "accuracy": round(k / n, 4) if n else None,
+        "accuracy_ci95": [round(x, 4) for x in tune_threshold.wilson(k, n)],
+    }
+
+
+def split_days(replay: backtest.Replay):
+    """(train, validation) day indices over the closed days, in time order."""
+    closed = np.flatnonzero(replay.closed)
+    n_valid = max(1, int(len(closed) * VALIDATION_FRACTION))
+    return closed[:-n_valid], closed[-n_valid:]
+
+
+# =====================
+# Search
+# =====================
+def search(replay, base: dict, incumbents: list, evaluations: int, rounds: int,
+           workers: int = None, seed: int = None):
+    """Every evaluated parameter set with its per-day counts.
+
+    The replay is built once and memory-mapped by every worker; each
+    task only carries a parameter dict and returns two short arrays.
+    """
+    rng = np.random.default_rng(seed)
+    train, _ = split_days(replay)
+    workers = workers or os.cpu_count() or 1
+
+    param_sets = list(incumbents)
+    unit = np.empty((0, len(NAMES)))
+    scored = np.empty((0, len(replay.days)), dtype=np.int32)
+    correct = np.empty((0, len(replay.days)), dtype=np.int32)
+    objective = np.empty(0)
+
+    per_round = max(1, evaluations // rounds)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=backtest.init_worker,
+            initargs=backtest.worker_args(replay),
+        )
+
+    try:
+        # Incumbents first, so the baseline is scored on identical days
+        s, c = score_all(pool, replay, param_sets)
+        scored, correct = np.vstack([scored, s]), np.vstack([correct, c])
+
+        for round_no in range(rounds):
+            t0 = time.perf_counter()
+            batch = sample(rng, per_round, unit, objective, round_no)
+            candidates = [to_params(u, base) for u in batch]
+
+            s, c = score_all(pool, replay, candidates)
+            unit = np.vstack([unit, batch])
+            param_sets += candidates
+            scored, correct = np.vstack([scored, s]), np.vstack([correct, c])
+            objective = lower_bounds(scored[len(incumbents):], correct[len(incumbents):], train)
+
+            elapsed = time.perf_counter() - t0
+            print(
+                f"🎲 Round {round_no + 1}/{rounds}: {len(candidates)} sets "
+                f"in {elapsed:.1f}s ({len(candidates) / elapsed:.0f}/s), "
+                f"best lower bound {objective.max():.4f}"
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return param_sets, scored, correct
+
+
+# =====================
+# Versioned config
+# =====================
+def save_params(config: dict) -> Path:
+    """Write the live config atomically, and keep a copy per version."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    (ARCHIVE_DIR / f"v{config['version']:04d}.json").write_text(
+        json.dumps(config, indent=2)
+    )
+
+    tmp = PARAMS_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(config, indent=2))
+    tmp.replace(PARAMS_PATH)
+    return PARAMS_PATH
+
+
+# =====================
+# Main
+# =====================
+@metrics.timed("tune_params")
+def run(evaluations: int, rounds: int, workers: int = None, seed: int = None,
+        dry_run: bool = False, top: int = 10):
+    loaded = backtest.load_replay()
+    if loaded is None:
+        return None
+    _, replay, _ = loaded
+    metrics.rows(rows_in=replay.present.sum())
+    policy = backtest.threshold_policy()
+    print(f"🎯 Thresholds: {policy}")
+
+    train, valid = split_days(replay)
+    if len(train) + len(valid) < MIN_DAYS:
+        print(f"ℹ️ Only {len(train) + len(valid)} closed days; need {MIN_DAYS} to tune")
+        return None
+
+    current = compute_prediction.load_params()
+    live = compute_prediction.resolve_params()
+    incumbents = [live, dict(compute_prediction.DEFAULT_PARAMS)]
+
+    t0 = time.perf_counter()
+    param_sets, scored, correct = search(
+        replay, live, incumbents, evaluations, rounds, workers, seed
+    )
+    elapsed = time.perf_counter() - t0
+    print(f"🧪 Evaluated {len(param_sets)} parameter sets in {elapsed:.1f}s")
+    metrics.rows(rows_out=len(param_sets))
+
+    objective = lower_bounds(scored, correct, train)
+    best = int(np.argmax(objective))  # ties keep the live config
+
+    table = pd.DataFrame(param_sets)
+    table["train_lower"] = objective.round(4)
+    table["valid_lower"] = lower_bounds(scored, correct, valid).round(4)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.sort_values("train_lower", ascending=False).head(top).to_string(index=False))
+
+    # ---------------------
+    # Held-out check against the live config
+    # ---------------------
+    chosen = {
+        "train": summary(scored[best], correct[best], train),
+        "validation": summary(scored[best], correct[best], valid),
+    }
+    baseline = {
+        "version": current.get("version", 0),
+        "train": summary(scored[0], correct[0], train),
+        "validation": summary(scored[0], correct[0], valid),
+    }
+    print(f"📈 Best: {chosen['validation']} held out")
+    print(f"📉 Live (v{baseline['version']}): {baseline['validation']} held out")
+
+    if best == 0:
+        print("ℹ️ The live config is still the best; nothing to write")
+        return None
+    if chosen["validation"]["accuracy_ci95"][0] < baseline["validation"]["accuracy_ci95"][0]:
+        print("🛑 Best set does worse on held-out days; keeping the live config")
+        return None
+
+    config = {
+        "version": baseline["version"] + 1,
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "params": param_sets[best],
+        "objective": "wilson_lower_95",
+        **chosen,
+        "baseline": baseline,
+        "search": {
+            "evaluations": len(param_sets),
+            "rounds": rounds,
+            "seed": seed,
+            "seconds": round(elapsed, 1),
+            "replay": replay.source.name if replay.source else None,
+            "thresholds": policy,
+        },
+    }
+
+    if dry_run:
+        print(f"ℹ️ Dry run: would write v{config['version']}")
+        return config
+
+    print(f"✅ Prediction params v{config['version']} → {save_params(config)}")
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search prediction parameters over the replayed season"
+    )
+    parser.add_argument("--evaluations", type=int, default=10000,
+                        help="parameter sets to evaluate in total")
+    parser.add_argument("--rounds", type=int, default=4,
+                        help="search rounds; each after the first refines the best")
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+    parser.add_argument("--top", type=int, default=10, help="rows to print")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report the best set without writing it")
+    args = parser.parse_args()
+
+    run(args.evaluations, args.rounds, args.workers, args.seed, args.dry_run, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,40 @@
 from pathlib import Path
 import pandas as pd
+import numpy as np
 import json
 
+import history_store
+import threshold_resolver
+import schema
+import metrics
+
 # =====================
 # Paths
 # =====================
-PRED_HISTORY = Path("data/predictions_history.csv")
 PRICE_CHANGES = Path("data/price_changes.csv")
-THRESHOLD_PATH = Path("data/thresholds.json")
+THRESHOLD_PATH = threshold_resolver.THRESHOLD_PATH
 
 MIN_SAMPLES = 4
 
+# =====================
+# Search space: 100 x 100 quantile pairs
+# =====================
+RISE_QUANTILES = np.linspace(0.50, 0.995, 100)
+FALL_QUANTILES = np.linspace(0.005, 0.50, 100)
+
+# Walk-forward folds start once this many days can be trained on
+MIN_TRAIN_DAYS = 3
+
+Z = 1.96  # 95% intervals
+
+HISTORY_COLUMNS = [
+    "date",
+    "player_id",
+    "direction",
+    "alert_level",
+    "prediction_score",
+]
+
 # =====================
 # Helpers
 # =====================
@@ -20,15 +44,148 @@ def safe_read_csv(path: Path) -> pd.DataFrame:
     return pd.read_csv(path)
 
 # =====================
-# Main
+# Vectorized grid search
 # =====================
-def main():
-    preds = safe_read_csv(PRED_HISTORY)
-    actuals = safe_read_csv(PRICE_CHANGES)
+def grid_counts(scores, actual, rise_qs=None, fall_qs=None):
+    """Predicted and correct counts for every (rise_q, fall_q) pair at once.
+
+    With scores sorted, "score >= rise threshold" and "score <= fall
+    threshold" are index ranges, so each pair's counts come from two
+    searchsorted positions and prefix sums of correct labels.
+    """
+    order = np.argsort(scores, kind="stable")
+    actual = actual[order]
+    return sorted_grid_counts(
+        scores[order], actual == "rise", actual == "fall", rise_qs, fall_qs
+    )
+
+
+def sorted_quantile(s, qs):
+    """np.quantile (linear) for an already sorted array, without a partition."""
+    pos = qs * (len(s) - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+
+def sorted_grid_counts(s, rose, fell, rise_qs=None, fall_qs=None):
+    """grid_counts() for ascending scores and boolean outcome arrays."""
+    rise_qs = RISE_QUANTILES if rise_qs is None else np.atleast_1d(rise_qs)
+    fall_qs = FALL_QUANTILES if fall_qs is None else np.atleast_1d(fall_qs)
+    return cutoff_counts(
+        s, rose, fell, sorted_quantile(s, rise_qs), sorted_quantile(s, fall_qs)
+    )
+
+
+def cutoff_counts(s, rose, fell, rise_cuts, fall_cuts):
+    """Predicted and correct counts for every pair of absolute score
+    cutoffs, over ascending scores.
+
+    The grid is bounded to rise cutoffs above zero and fall cutoffs
+    below it: any other pair predicts nothing, so it never qualifies.
+    """
+    rise_cuts = np.atleast_1d(rise_cuts)
+    fall_cuts = np.atleast_1d(fall_cuts)
+    n = len(s)
+
+    rises = np.concatenate([[0], np.cumsum(rose)])
+    falls = np.concatenate([[0], np.cumsum(fell)])
+
+    rise_start = np.searchsorted(s, rise_cuts, "left")[:, None]
+    fall_end = np.searchsorted(s, fall_cuts, "right")[None, :]
+    rise_start = np.maximum(rise_start, fall_end)
+
+    predicted = (n - rise_start) + fall_end
+    correct = (rises[n] - rises[rise_start]) + falls[fall_end]
+
+    sided = (rise_cuts > 0)[:, None] & (fall_cuts < 0)[None, :]
+    return np.where(sided, predicted, 0), np.where(sided, correct, 0)
+
+
+def best_pair(predicted, correct, rise_qs=None, fall_qs=None):
+    """Highest accuracy, then most samples; None if nothing qualifies."""
+    rise_qs = RISE_QUANTILES if rise_qs is None else rise_qs
+    fall_qs = FALL_QUANTILES if fall_qs is None else fall_qs
+
+    valid = predicted >= MIN_SAMPLES
+    if not valid.any():
+        return None
+
+    accuracy = np.where(valid, correct / np.maximum(predicted, 1), -1.0)
+    tied = accuracy == accuracy.max()
+    i, j = np.unravel_index(np.where(tied, predicted, -1).argmax(), accuracy.shape)
+
+    return (
+        float(rise_qs[i]),
+        float(fall_qs[j]),
+        int(predicted[i, j]),
+        int(correct[i, j]),
+    )
+
+
+def walk_forward(merged: pd.DataFrame) -> pd.DataFrame:
+    """Out-of-sample results of refitting on all days before each day."""
+    # Sort by score once; each fold's training set is then a mask over
+    # the sorted arrays rather than a fresh sort
+    order = np.argsort(merged["prediction_score"].to_numpy(dtype=float), kind="stable")
+    scores = merged["prediction_score"].to_numpy(dtype=float)[order]
+    actual = merged["actual_change"].to_numpy()[order]
+    rose = actual == "rise"
+    fell = actual == "fall"
+    unique_days, day = np.unique(merged["date"].to_numpy()[order], return_inverse=True)
+
+    folds = []
+    for k in range(MIN_TRAIN_DAYS, len(unique_days)):
+        train = day < k
+        test = day == k
+
+        pick = best_pair(
+            *sorted_grid_counts(scores[train], rose[train], fell[train])
+        )
+        if pick is None:
+            continue
+
+        # The cutoffs go live as scores, so the test day is scored
+        # against the training scores' quantiles, not its own
+        rise_q, fall_q = pick[:2]
+        predicted, correct = cutoff_counts(
+            scores[test], rose[test], fell[test],
+            *sorted_quantile(scores[train], np.array([rise_q, fall_q])),
+        )
+        folds.append({
+            "date": unique_days[k],
+            "rise_q": rise_q,
+            "fall_q": fall_q,
+            "predicted": int(predicted[0, 0]),
+            "correct": int(correct[0, 0]),
+        })
+
+    return pd.DataFrame(
+        folds, columns=["date", "rise_q", "fall_q", "predicted", "correct"]
+    )
 
+
+def wilson(successes: int, n: int, z: float = Z) -> tuple:
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return float(max(centre - half, 0.0)), float(min(centre + half, 1.0))
+
+
+# =====================
+# Tuning
+# =====================
+def tune_thresholds(preds: pd.DataFrame, actuals: pd.DataFrame):
     if preds.empty or actuals.empty:
         print("ℹ️ Not enough data to tune thresholds")
-        return
+        return None
+
+    preds = preds.copy()
+    actuals = actuals.copy()
 
     preds["date"] = pd.to_datetime(preds["date"])
     actuals["date"] = pd.to_datetime(actuals["date"])
@@ -43,7 +200,7 @@ def main():
 
     if preds.empty:
         print("ℹ️ No imminent predictions to learn from yet")
-        return
+        return None
 
     # ---------------------
     # STRICT D+1 merge
@@ -59,78 +216,103 @@ def main():
 
     if len(merged) < MIN_SAMPLES:
         print("ℹ️ Not enough resolved predictions yet")
-        return
+        return None
+
+    merged = merged.rename(columns={"date_x": "date"})
+
+    scores = merged["prediction_score"].to_numpy(dtype=float)
+    actual = merged["actual_change"].to_numpy()
 
     # ---------------------
-    # Candidate thresholds
+    # In-sample fit over the full grid
     # ---------------------
-    candidates = [
-        (0.90, 0.10),
-        (0.92, 0.08),
-        (0.94, 0.06),
-        (0.95, 0.05),
-        (0.96, 0.04),
-        (0.97, 0.03),
-    ]
+    pick = best_pair(*grid_counts(scores, actual))
+    if pick is None:
+        print("⚠️ No viable threshold configuration yet")
+        return None
 
-    best = {
-        "accuracy": 0,
-        "rise_q": None,
-        "fall_q": None,
-        "samples": 0,
-    }
+    rise_q, fall_q, predicted, correct = pick
+    accuracy = correct / predicted
 
-    for rise_q, fall_q in candidates:
-        rise_thr = merged["prediction_score"].quantile(rise_q)
-        fall_thr = merged["prediction_score"].quantile(fall_q)
+    # The resolver applies these as absolute cutoffs: quantiles of the
+    # resolved imminent scores mean nothing over the whole market
+    rise_cutoff, fall_cutoff = np.quantile(scores, [rise_q, fall_q])
 
-        test = merged.copy()
-        test["predicted"] = "none"
-        test.loc[test["prediction_score"] >= rise_thr, "predicted"] = "rise"
-        test.loc[test["prediction_score"] <= fall_thr, "predicted"] = "fall"
+    # ---------------------
+    # Walk-forward: fit on days before D, score day D
+    # ---------------------
+    folds = walk_forward(merged)
 
-        test = test[test["predicted"] != "none"]
+    # Without folds there is nothing out of sample: the validated fields
+    # stay null rather than repeating the (overfit) in-sample fit
+    validated = {
+        "validated_accuracy": None,
+        "validated_samples": None,
+        "accuracy_ci95": None,
+        "rise_quantile_range": None,
+        "fall_quantile_range": None,
+    }
+    if len(folds):
+        v_predicted = int(folds["predicted"].sum())
+        v_correct = int(folds["correct"].sum())
+        validated = {
+            "validated_accuracy": (
+                round(v_correct / v_predicted, 3) if v_predicted else None
+            ),
+            "validated_samples": v_predicted,
+            "accuracy_ci95": [round(x, 3) for x in wilson(v_correct, v_predicted)],
+            "rise_quantile_range": [
+                round(x, 4) for x in folds["rise_q"].quantile([0.05, 0.95])
+            ],
+            "fall_quantile_range": [
+                round(x, 4) for x in folds["fall_q"].quantile([0.05, 0.95])
+            ],
+        }
 
-        if len(test) < MIN_SAMPLES:
-            continue
+    thresholds = {
+        "rise_quantile": round(rise_q, 4),
+        "fall_quantile": round(fall_q, 4),
+        "rise_cutoff": round(float(rise_cutoff), 4),
+        "fall_cutoff": round(float(fall_cutoff), 4),
+        "accuracy": round(float(accuracy), 3),
+        "samples": int(predicted),
+        "validation": "walk_forward" if len(folds) else "in_sample",
+        "folds": len(folds),
+        **validated,
+        "grid": int(len(RISE_QUANTILES) * len(FALL_QUANTILES)),
+        "scope": "imminent_only",
+        "horizon": "D+1",
+    }
 
-        acc = (test["predicted"] == test["actual_change"]).mean()
+    print("🧠 Thresholds tuned (strict D+1, leak-free)")
+    print(thresholds)
 
-        if acc > best["accuracy"] or (
-            acc == best["accuracy"] and len(test) > best["samples"]
-        ):
-            best = {
-                "accuracy": round(float(acc), 3),
-                "rise_q": rise_q,
-                "fall_q": fall_q,
-                "samples": len(test),
-            }
+    return thresholds
 
-    if best["rise_q"] is None:
-        print("⚠️ No viable threshold configuration yet")
-        return
 
-    # ---------------------
-    # Save thresholds
-    # ---------------------
+def save_thresholds(thresholds: dict):
     THRESHOLD_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(THRESHOLD_PATH, "w") as f:
-        json.dump(
-            {
-                "rise_quantile": best["rise_q"],
-                "fall_quantile": best["fall_q"],
-                "accuracy": best["accuracy"],
-                "samples": best["samples"],
-                "scope": "imminent_only",
-                "horizon": "D+1",
-            },
-            f,
-            indent=2,
-        )
+    # Atomic, so a running scheduler never reads a half-written file
+    tmp = THRESHOLD_PATH.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(thresholds, f, indent=2)
+    tmp.replace(THRESHOLD_PATH)
 
-    print("🧠 Thresholds tuned (strict D+1, leak-free)")
-    print(best)
+
+# =====================
+# Main
+# =====================
+@metrics.timed("tune_threshold")
+def main():
+    preds = history_store.read_all(HISTORY_COLUMNS)
+    actuals = schema.enforce(safe_read_csv(PRICE_CHANGES), schema.PRICE_CHANGE_DTYPES)
+    metrics.rows(rows_in=len(preds) + len(actuals))
+
+    thresholds = tune_thresholds(preds, actuals)
+
+    if thresholds is not None:
+        save_thresholds(thresholds)
 
 if __name__ == "__main__":
     main()
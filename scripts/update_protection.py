@@ -2,29 +2,29 @@ from pathlib import Path
 import pandas as pd
 from datetime import timedelta
 
-SNAPSHOT_DIR = Path("data/snapshots")
-PROTECTION_PATH = Path("data/protection_status.csv")
+import snapshot_store
+import schema
+import metrics
 
-def main():
-    snaps = sorted(SNAPSHOT_DIR.glob("snapshot_*.csv"))
-    if len(snaps) < 2:
-        print("ℹ️ Not enough snapshots for protection tracking")
-        return
+STATUS_COLUMNS = ["player_id", "status"]
 
-    prev = pd.read_csv(snaps[-2])
-    curr = pd.read_csv(snaps[-1])
+PROTECTION_PATH = Path("data/protection_status.csv")
 
-    today = pd.to_datetime(
-        snaps[-1].stem.replace("snapshot_", ""),
-        format="%Y-%m-%d_%H-%M-%S"
-    ).date()
 
+def load_protection() -> pd.DataFrame:
     if PROTECTION_PATH.exists():
-        prot = pd.read_csv(PROTECTION_PATH)
+        prot = schema.enforce(pd.read_csv(PROTECTION_PATH), schema.PROTECTION_DTYPES)
         prot["lock_until"] = pd.to_datetime(prot["lock_until"]).dt.date
-    else:
-        prot = pd.DataFrame(columns=["player_id", "lock_until"])
+        return prot
+    return pd.DataFrame(columns=["player_id", "lock_until"])
+
 
+def update_protection(
+    prev: pd.DataFrame,
+    curr: pd.DataFrame,
+    today,
+    prot: pd.DataFrame,
+) -> pd.DataFrame:
     # 🔑 Recovery detection: red → green
     prev_red = prev[prev["status"].isin(["i", "s"])][["player_id"]]
     curr_green = curr[curr["status"].isin(["a", "d"])][["player_id"]]
@@ -40,8 +40,25 @@ def main():
             .drop_duplicates("player_id", keep="last")
         )
 
-    prot.to_csv(PROTECTION_PATH, index=False)
     print(f"🛡️ Recovery protection active: {len(recovered)} players")
+    return prot
+
+
+@metrics.timed("update_protection")
+def main():
+    snaps = snapshot_store.latest(2)
+    if len(snaps) < 2:
+        print("ℹ️ Not enough snapshots for protection tracking")
+        return
+
+    prev = snapshot_store.read_snapshot(snaps[-2], STATUS_COLUMNS)
+    curr = snapshot_store.read_snapshot(snaps[-1], STATUS_COLUMNS)
+
+    today = snaps[-1].date()
+
+    prot = update_protection(prev, curr, today, load_protection())
+    prot.to_csv(PROTECTION_PATH, index=False)
+    metrics.rows(len(prev) + len(curr), len(prot))
 
 if __name__ == "__main__":
     main()
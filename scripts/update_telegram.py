@@ -1,16 +1,11 @@
 from pathlib import Path
-import requests
 import json
 from datetime import datetime, timedelta
-import os
 import shutil
 
 # =====================
 # CONFIG
 # =====================
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
 DATA_DIR = Path("data")
 RESET_PATH = DATA_DIR / "reset_request.json"
 
@@ -19,6 +14,12 @@ RESET_TTL_MINUTES = 60  # confirmation window
 RESET_TARGETS = [
     # snapshots (contain deltas)
     "snapshots",
+    "deltas",
+    "store",
+
+    # fetch state (cache/state.json ETags) and raw payloads: a stale
+    # ETag would halt the next run as unchanged with no snapshot
+    "cache",
 
     # derived signals
     "velocity.csv",
@@ -29,6 +30,7 @@ RESET_TARGETS = [
     # learning / evaluation
     "outcomes.csv",
     "accuracy.csv",
+    "accuracy_state.json",
     "thresholds.json",
 
     # protection
@@ -40,35 +42,6 @@ RESET_TARGETS = [
     "price_changes.csv",
 ]
 
-# =====================
-# TELEGRAM HELPERS
-# =====================
-def send(msg: str):
-    if not BOT_TOKEN or not CHAT_ID:
-        return
-
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    requests.post(
-        url,
-        json={
-            "chat_id": CHAT_ID,
-            "text": msg,
-            "parse_mode": "Markdown",
-        },
-        timeout=15,
-    )
-
-
-def get_updates(offset=None):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates"
-    params = {"timeout": 10}
-    if offset:
-        params["offset"] = offset
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    return r.json()["result"]
-
-
 # =====================
 # TIME HELPERS
 # =====================
@@ -113,7 +86,7 @@ def reset_expired(reset):
 # =====================
 # RESET EXECUTION
 # =====================
-def execute_seasonal_reset():
+def execute_seasonal_reset() -> list:
     removed = []
 
     for target in RESET_TARGETS:
@@ -126,97 +99,73 @@ def execute_seasonal_reset():
             path.unlink()
             removed.append(target)
 
-    send(
-        "🧹 *Seasonal reset completed*\n\n"
-        "The following were wiped:\n"
-        + "\n".join(f"• `{x}`" for x in removed)
-        + "\n\nFresh season activated."
-    )
+    return removed
 
 
 # =====================
-# COMMAND HANDLER
+# BOT COMMANDS (chat, args → reply; owner only)
 # =====================
-def handle_command(cmd: str):
+def active_reset():
     reset = load_reset()
 
     # auto-clean expired reset
     if reset and reset_expired(reset):
         clear_reset()
-        reset = None
-
-    if cmd == "/reset":
-        if reset:
-            send("⏳ Reset already requested.\nUse /confirm_reset or /cancel_reset.")
-            return
-
-        save_reset({
-            "created_at": utcnow_naive().isoformat(),
-            "status": "pending",
-        })
-
-        send(
-            "⚠️ *Seasonal reset requested*\n\n"
-            "This will wipe ALL derived data and learning.\n\n"
-            "⏳ Confirm within 1 hour:\n"
-            "/confirm_reset\n\n"
-            "Cancel with:\n"
-            "/cancel_reset"
-        )
-        return
-
-    if cmd == "/confirm_reset":
-        if not reset:
-            send("ℹ️ No active reset request.")
-            return
-
-        if reset_expired(reset):
-            clear_reset()
-            send("⌛ Reset request expired. Send /reset again.")
-            return
-
-        execute_seasonal_reset()
-        clear_reset()
-        return
+        return None
+    return reset
 
-    if cmd == "/cancel_reset":
-        if not reset:
-            send("ℹ️ No active reset request.")
-            return
 
-        clear_reset()
-        send("❌ Reset request cancelled.")
-        return
+def request_reset(chat_id, args: list) -> str:
+    if active_reset():
+        return "⏳ Reset already requested.\nUse /confirm_reset or /cancel_reset."
 
+    save_reset({
+        "created_at": utcnow_naive().isoformat(),
+        "status": "pending",
+    })
+
+    return (
+        "⚠️ *Seasonal reset requested*\n\n"
+        "This will wipe ALL derived data and learning.\n\n"
+        "⏳ Confirm within 1 hour:\n"
+        "/confirm_reset\n\n"
+        "Cancel with:\n"
+        "/cancel_reset"
+    )
 
-# =====================
-# MAIN
-# =====================
-def main():
-    if not BOT_TOKEN or not CHAT_ID:
-        return
 
-    updates = get_updates()
-    if not updates:
-        return
+def confirm_reset(chat_id, args: list) -> str:
+    if not load_reset():
+        return "ℹ️ No active reset request."
 
-    last_update_id = None
+    if not active_reset():
+        return "⌛ Reset request expired. Send /reset again."
+
+    removed = execute_seasonal_reset()
+    clear_reset()
+    return (
+        "🧹 *Seasonal reset completed*\n\n"
+        "The following were wiped:\n"
+        + "\n".join(f"• `{x}`" for x in removed)
+        + "\n\nFresh season activated."
+    )
 
-    for u in updates:
-        last_update_id = u["update_id"]
 
-        msg = u.get("message", {})
-        text = msg.get("text", "")
-        chat_id = msg.get("chat", {}).get("id")
+def cancel_reset(chat_id, args: list) -> str:
+    if not active_reset():
+        return "ℹ️ No active reset request."
 
-        if str(chat_id) != str(CHAT_ID):
-            continue
+    clear_reset()
+    return "❌ Reset request cancelled."
 
-        if text.startswith("/"):
-            handle_command(text.strip())
 
-    if last_update_id is not None:
-        get_updates(offset=last_update_id + 1)
+# =====================
+# MAIN
+# =====================
+def main():
+    # Commands are handled by the bot; this drains them once, as before
+    import telegram_bot
+    telegram_bot.main(["--once"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+import hashlib
+import json
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import fpl_fetch
+
+
+# =====================
+# Stub FPL API
+# =====================
+class Stub:
+    """Serves one bootstrap-static payload with an ETag, answering 304
+    to a matching If-None-Match; fail_next queues 5xx responses."""
+
+    def __init__(self):
+        self.payload = {"elements": [{"id": 1, "now_cost": 50}]}
+        self.fail_next = []
+        self.requests = []
+
+    @property
+    def etag(self):
+        return f'"{hashlib.sha1(self.body).hexdigest()}"'
+
+    @property
+    def body(self):
+        return json.dumps(self.payload).encode()
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    state = Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            state.requests.append(self.headers.get("If-None-Match"))
+            if state.fail_next:
+                self.send_response(state.fail_next.pop(0))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == state.etag:
+                self.send_response(304)
+                self.send_header("ETag", state.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", state.etag)
+            self.send_header("Content-Length", str(len(state.body)))
+            self.end_headers()
+            self.wfile.write(state.body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fpl_fetch, "BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(fpl_fetch, "BACKOFF", 0.01)
+    monkeypatch.setattr(fpl_fetch, "_session", None)
+    yield state
+    server.shutdown()
+    fpl_fetch._session = None
+
+
+# =====================
+# Tests
+# =====================
+def test_200_then_304_then_changed(stub):
+    first = fpl_fetch.fetch()
+    assert first.changed
+    assert first.data == stub.payload
+    fpl_fetch.commit(first)
+
+    second = fpl_fetch.fetch()
+    assert stub.requests[-1] == stub.etag
+    assert not second.changed
+    assert second.data == stub.payload
+
+    stub.payload = {"elements": [{"id": 1, "now_cost": 51}]}
+    third = fpl_fetch.fetch()
+    assert third.changed
+    assert third.data == stub.payload
+    assert third.content_hash != first.content_hash
+
+
+def test_uncommitted_payload_is_fetched_again(stub):
+    # Validators are only stored by commit(): a failed run retries in full
+    fpl_fetch.fetch()
+    again = fpl_fetch.fetch()
+    assert stub.requests == [None, None]
+    assert again.changed
+
+
+def test_304_without_cached_payload_refetches(stub):
+    fpl_fetch.commit(fpl_fetch.fetch())
+    for path in fpl_fetch.CACHE_DIR.glob("*.json.gz"):
+        path.unlink()
+
+    payload = fpl_fetch.fetch()
+    assert stub.requests[-2:] == [stub.etag, None]
+    assert not payload.changed
+    assert payload.data == stub.payload
+
+
+def test_retries_5xx(stub):
+    stub.fail_next = [503, 502]
+    payload = fpl_fetch.fetch()
+    assert len(stub.requests) == 3
+    assert payload.data == stub.payload
+
+
+def test_gives_up_after_retries(stub):
+    stub.fail_next = [503] * (fpl_fetch.RETRIES + 1)
+    with pytest.raises(fpl_fetch.requests.HTTPError):
+        fpl_fetch.fetch()
+    assert len(stub.requests) == fpl_fetch.RETRIES + 1
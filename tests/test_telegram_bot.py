@@ -0,0 +1,168 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+import asyncio
+import json
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import players
+import telegram_bot
+import telegram_watchlist
+import update_telegram
+
+OWNER = "42"
+STRANGER = "7"
+
+
+# =====================
+# Stub Bot API
+# =====================
+class Stub:
+    """getUpdates from a list, honouring offset; sendMessage recorded."""
+
+    def __init__(self):
+        self.updates = []
+        self.sent = []
+        self.offsets = []
+        self.next_id = 10
+
+    def push(self, text: str, chat: str = OWNER):
+        self.updates.append({
+            "update_id": self.next_id,
+            "message": {"chat": {"id": int(chat)}, "text": text},
+        })
+        self.next_id += 1
+
+    def get_updates(self, body: dict) -> list:
+        offset = body.get("offset")
+        self.offsets.append(offset)
+        return [u for u in self.updates if offset is None or u["update_id"] >= offset]
+
+    def replies(self, chat: str) -> list:
+        return [p["text"] for p in self.sent if p["chat_id"] == chat]
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    state = Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path.endswith("/getUpdates"):
+                result = state.get_updates(body)
+            else:
+                state.sent.append(body)
+                result = {"message_id": len(state.sent)}
+            data = json.dumps({"ok": True, "result": result}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state.base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(players, "_cache", None)
+    players.save(players.build(pd.DataFrame({
+        "player_id": [1, 2],
+        "web_name": ["Salah", "Saka"],
+        "name": ["Mohamed Salah", "Bukayo Saka"],
+        "team": ["LIV", "ARS"],
+        "status": ["a", "a"],
+        "ownership": [50.0, 30.0],
+    })))
+    yield state
+    server.shutdown()
+
+
+def poll(stub) -> int:
+    """One batch through a fresh Bot, as a new CI run would, with its
+    replies delivered."""
+    bot = telegram_bot.Bot("test", OWNER, stub.base)
+    bot.outbox.chat_rate = 1000.0
+    try:
+        return asyncio.run(bot.poll(timeout=0))
+    finally:
+        assert bot.outbox.flush(5)
+
+
+def watched(chat: str) -> list:
+    return sorted(telegram_watchlist.load_watched(players.load(), chat).values())
+
+
+# =====================
+# Tests
+# =====================
+def test_commands_dispatch_per_chat(stub):
+    stub.push("/add salah")
+    stub.push("/add saka", chat=STRANGER)
+    stub.push("/list", chat=STRANGER)
+    stub.push("hello")
+
+    assert poll(stub) == 4
+    assert watched(OWNER) == ["Salah"]
+    assert watched(STRANGER) == ["Saka"]
+    assert stub.replies(OWNER) == ["➕ Added: Salah"]
+    assert stub.replies(STRANGER)[-1] == "📋 *Your Watchlist*\n• Saka"
+
+
+def test_offset_persists_across_runs(stub):
+    stub.push("/add salah")
+    stub.push("/add saka")
+    poll(stub)
+    assert telegram_bot.load_offset() == 12
+
+    stub.push("/remove salah")
+    assert poll(stub) == 1
+    assert stub.offsets[-1] == 12
+    assert telegram_bot.load_offset() == 13
+    assert watched(OWNER) == ["Saka"]
+
+
+def test_reset_is_owner_only(stub):
+    stub.push("/reset", chat=STRANGER)
+    poll(stub)
+    assert stub.replies(STRANGER) == []
+    assert not update_telegram.RESET_PATH.exists()
+
+    stub.push("/reset")
+    poll(stub)
+    assert update_telegram.RESET_PATH.exists()
+    assert "Seasonal reset requested" in stub.replies(OWNER)[-1]
+
+
+def test_replayed_batch_does_not_double_apply(stub, monkeypatch):
+    stub.push("/add salah")
+    stub.push("/add salah saka", chat=STRANGER)
+
+    # Handled, then the run dies before the offset is saved
+    def crash(offset):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(telegram_bot, "save_offset", crash)
+        with pytest.raises(OSError):
+            poll(stub)
+    assert telegram_bot.load_offset() is None
+
+    # The next run replays the same batch
+    assert poll(stub) == 2
+    assert stub.offsets[-1] is None
+    assert telegram_bot.load_offset() == 12
+
+    rows = telegram_watchlist.load_watchlist()
+    assert not rows.duplicated(["chat_id", "player_id"]).any()
+    assert watched(OWNER) == ["Salah"]
+    assert watched(STRANGER) == ["Saka", "Salah"]
+    assert stub.replies(OWNER)[-1] == "ℹ️ No new players added"
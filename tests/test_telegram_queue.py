@@ -0,0 +1,100 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+import json
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import telegram_queue
+
+
+# =====================
+# Stub sendMessage
+# =====================
+class Stub:
+    """Accepts every sendMessage; replies queues raw (status, body)
+    responses to give first."""
+
+    def __init__(self):
+        self.replies = []
+        self.sent = []
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    state = Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if state.replies:
+                status, body = state.replies.pop(0)
+            else:
+                state.sent.append(payload)
+                status, body = 200, json.dumps({"ok": True, "result": {}})
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(telegram_queue, "RETRY_DELAY", 0.01)
+    state.base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+
+
+def outbox(stub, **kwargs):
+    return telegram_queue.Outbox("test", stub.base, workers=2,
+                                 rate=1000.0, chat_rate=1000.0, **kwargs)
+
+
+# =====================
+# Tests
+# =====================
+def test_429_without_json_is_retried(stub):
+    # Waits the default second a 429 without retry_after asks for
+    stub.replies = [(429, "<html>Too Many Requests</html>")]
+    box = outbox(stub)
+    box.send(1, "hello")
+    assert box.flush(5)
+    assert [p["text"] for p in stub.sent] == ["hello"]
+    assert box.stats["rate_limited"] == 1
+
+
+def test_crash_in_delivery_is_counted_as_failed(stub, monkeypatch):
+    box = outbox(stub)
+
+    def crash(payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(box, "_deliver", crash)
+    box.send(1, "first")
+    box.send(2, "second")
+    assert box.flush(5)
+    assert box.stats["failed"] == 2
+    assert box.failed_chats == {"1", "2"}
+
+    # The workers survived and keep sending
+    monkeypatch.undo()
+    box.send(3, "third")
+    assert box.flush(5)
+    assert [p["text"] for p in stub.sent] == ["third"]
+
+
+def test_flush_times_out_and_marks_queued_chats_failed(stub):
+    box = outbox(stub)
+    box.hold_until = telegram_queue.time.monotonic() + 60
+    box.send(7, "held")
+    assert not box.flush(0.2)
+    assert "7" in box.failed_chats
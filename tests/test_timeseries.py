@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import timeseries
+
+START = datetime(2026, 1, 1)
+PLAYERS = [1, 2]
+
+
+def series_over(stamps, rate: np.ndarray) -> timeseries.TransferSeries:
+    """Each stamp's row is the transfers since the one before, at a steady
+    rate of net transfers an hour per player."""
+    series = timeseries.TransferSeries()
+    prev = stamps[0] - timedelta(hours=timeseries.DELTA_HOURS)
+    for ts in stamps:
+        hours = (ts - prev).total_seconds() / 3600
+        series.push(ts, pd.Series(rate * hours, index=PLAYERS))
+        prev = ts
+    return series
+
+
+def every(step: timedelta, until: datetime, start: datetime = START) -> list:
+    stamps = [start]
+    while stamps[-1] + step <= until:
+        stamps.append(stamps[-1] + step)
+    return stamps
+
+
+# =====================
+# Tests
+# =====================
+def test_six_hourly_matches_snapshot_windows():
+    # The cron's cadence: one row per window step
+    rng = np.random.default_rng(0)
+    stamps = every(timedelta(hours=6), START + timedelta(days=4))
+    rows = rng.normal(0, 500, (len(stamps), len(PLAYERS)))
+
+    series = timeseries.TransferSeries()
+    for ts, row in zip(stamps, rows):
+        series.push(ts, pd.Series(row, index=PLAYERS))
+    features = series.features()
+
+    frame = pd.DataFrame(rows)
+    velocity = frame.rolling(3, min_periods=1).mean()
+    trend = velocity.rolling(5, min_periods=1).mean()
+
+    assert features["net_transfers_window"].to_numpy() == pytest.approx(rows[-1], rel=1e-5)
+    assert features["velocity"].to_numpy() == pytest.approx(velocity.iloc[-1].to_numpy(), rel=1e-5)
+    assert features["trend_score"].to_numpy() == pytest.approx(trend.iloc[-1].to_numpy(), rel=1e-5)
+
+
+def test_denser_sampling_keeps_scale():
+    until = START + timedelta(days=3)
+    rate = np.array([100.0, -40.0])
+
+    sparse = series_over(every(timedelta(hours=6), until), rate).features()
+
+    # Hourly, then every five minutes for the last three hours
+    hourly = every(timedelta(hours=1), until - timedelta(hours=3))
+    fast = every(timedelta(minutes=5), until, start=hourly[-1])
+    dense = series_over(hourly + fast[1:], rate)
+
+    for col in ["net_transfers_window", "velocity", "trend_score"]:
+        assert dense.features()[col].to_numpy() == pytest.approx(
+            sparse[col].to_numpy(), rel=1e-5
+        )
+        assert sparse[col].to_numpy() == pytest.approx([600.0, -240.0])